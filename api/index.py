@@ -1,140 +1,179 @@
 from http.server import BaseHTTPRequestHandler
+import asyncio
 import json
 import os
-import requests
+import sys
+import threading
+import httpx
+
+# Gemeinsame Module aus dem Projektverzeichnis verfügbar machen
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from client_registry import HTTP_POOL_SIZE, ClientRegistry
+from json_extract import JsonExtractionError, extract_json
+from lookup_cache import get_cache
+from prompts import PROMPT_VARIANTS, TokenUsage, build_system, company_message, prompt_variant_default
+from rate_limiter import parse_retry_after
+from resilience import RetryableStatusError, get_circuit_breaker, is_retryable_status, retry_call_async
+from structured_output import COMPANY_INFO_TOOL, COMPANY_INFO_TOOL_CHOICE, STRUCTURED_MAX_TOKENS, structured_output_default, tool_input
+
+# Maximale Anzahl gleichzeitiger Anfragen an die Messages API
+DEFAULT_CONCURRENCY = int(os.environ.get('LOOKUP_CONCURRENCY', 8))
+REQUEST_TIMEOUT = 60.0
+
+SYSTEM_PROMPT = "Du bist ein präziser Recherche-Assistent, der Unternehmensinformationen findet."
+
+_loop = None
+_loop_lock = threading.Lock()
+
+def _event_loop():
+    # Hintergrund-Eventloop, auf dem die gepoolten Async-Clients über Anfragen hinweg leben
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, daemon=True).start()
+        return _loop
+
+def run_async(coro):
+    return asyncio.run_coroutine_threadsafe(coro, _event_loop()).result()
+
+def _create_async_client(api_key):
+    limits = httpx.Limits(max_connections=HTTP_POOL_SIZE, max_keepalive_connections=HTTP_POOL_SIZE)
+    return httpx.AsyncClient(limits=limits, timeout=REQUEST_TIMEOUT)
+
+# Langlebige HTTP-Clients je API-Schlüssel, damit Keep-Alive-Verbindungen wiederverwendet werden
+async_clients = ClientRegistry(
+    _create_async_client,
+    close=lambda client: asyncio.run_coroutine_threadsafe(client.aclose(), _event_loop())
+)
+
+def _is_retryable_async(error):
+    return isinstance(error, (RetryableStatusError, httpx.TransportError))
 
 # Direkte API-Anfrage anstelle der Anthropic-Bibliothek
 class ClaudeClient:
-    def __init__(self, api_key):
+    def __init__(self, api_key, structured_output=None, prompt_variant=None):
         if not api_key:
             raise ValueError("Anthropic API-Schlüssel ist erforderlich")
         
         self.api_key = api_key
+        # Strukturierter Modus: Antwort als Werkzeugaufruf statt als JSON im Freitext
+        self.structured_output = structured_output_default() if structured_output is None else structured_output
+        self.prompt_variant = prompt_variant if prompt_variant in PROMPT_VARIANTS else prompt_variant_default()
+        # Token-Nutzung dieser Anfrage, getrennt nach gecachtem und ungecachtem Input
+        self.usage = TokenUsage()
+        self.cache = get_cache()
     
-    def get_company_info(self, company_name):
-        prompt = f"""
-        Finde die folgenden Informationen für das Unternehmen "{company_name}":
-        1. Telefonnummer (bevorzugt Festnetz, international formatiert mit Ländercode)
-        2. E-Mail-Adresse (bevorzugt allgemeine Kontakt-E-Mail)
-        3. Website-URL (mit https://)
+    async def get_companies_info_async(self, companies, concurrency=DEFAULT_CONCURRENCY):
+        """Fragt alle Unternehmen nebenläufig ab, höchstens `concurrency` Anfragen gleichzeitig"""
+        semaphore = asyncio.Semaphore(concurrency)
 
-        Für Telefonnummern:
-        - Suche nach offiziellen Kontaktseiten oder "Kontakt"-Abschnitten auf der Unternehmenswebsite
-        - Achte besonders auf Telefonnummern im Header oder Footer der Website
-        - Suche nach Nummern, die als "Tel:", "Phone:", "Call us:" oder ähnlich gekennzeichnet sind
-        - Stelle sicher, dass die Nummer vollständig ist (mit Ländervorwahl)
-        - Behalte das originale Format der Nummer bei, z.B. (239) 325-5180 oder +1 877.800.1634
-        - Überprüfe die Nummer sorgfältig - sie ist ein kritisches Element
+        # Client für die ganze Anfrage ausleihen, damit die Registry ihn nicht mittendrin schließt
+        with async_clients.lease(self.api_key) as http_client:
+            async def lookup(company_name):
+                cached = self.cache.get(company_name)
+                if cached is not None:
+                    return cached
+                async with semaphore:
+                    result = await self._query_company_info_async(http_client, company_name)
+                self.cache.set(company_name, result)
+                return result
 
-        Für E-Mail-Adressen:
-        - Suche nach allgemeinen Kontakt-E-Mails wie info@unternehmen.com
-        - Überprüfe die E-Mail-Adresse auf Tippfehler
+            # gather behält die Reihenfolge der Eingabe bei
+            return await asyncio.gather(*(lookup(company) for company in companies))
 
-        Für Website-URLs:
-        - Gib die Haupt-URL des Unternehmens an, nicht Unterseiten
-        - Stelle sicher, dass die URL mit http:// oder https:// beginnt
+    async def _query_company_info_async(self, http_client, company_name):
+        try:
+            headers, data = self._build_request(company_name)
+            # Vorübergehende Fehler mit Backoff wiederholen, bei Ausfall über den Circuit-Breaker sofort abbrechen
+            response = await retry_call_async(lambda: self._post_async(http_client, headers, data), _is_retryable_async)
+            return self._parse_response(company_name, response.status_code, response.text, response.json)
+        except Exception as e:
+            print(f"Fehler bei der Anfrage an Claude für {company_name}: {e}")
+            return self._empty_result(company_name)
 
-        Gib die Informationen im folgenden JSON-Format zurück:
-        {{
-            "name": "Unternehmensname",
-            "phone": "Telefonnummer oder null",
-            "email": "E-Mail-Adresse oder null",
-            "website": "Website-URL oder null"
-        }}
+    async def _post_async(self, http_client, headers, data):
+        response = await http_client.post(
+            "https://api.anthropic.com/v1/messages",
+            headers=headers,
+            json=data
+        )
+        if is_retryable_status(response.status_code):
+            raise RetryableStatusError(response.status_code, response.text, parse_retry_after(response.headers))
+        return response
 
-        Wenn du eine Information nicht finden kannst, setze den Wert auf null.
-        Gib NUR das JSON zurück, keine Erklärungen oder zusätzlichen Text.
-        """
+    def _build_request(self, company_name):
+        # Direkte API-Anfrage mit der neuesten API-Version
+        headers = {
+            "anthropic-version": "2023-06-01",
+            "x-api-key": self.api_key,
+            "content-type": "application/json"
+        }
         
-        try:
-            # Direkte API-Anfrage mit der neuesten API-Version
-            headers = {
-                "anthropic-version": "2023-06-01",
-                "x-api-key": self.api_key,
-                "content-type": "application/json"
-            }
-            
-            data = {
-                "model": "claude-3-haiku-20240307",
-                "max_tokens": 1500,
-                "temperature": 0.2,
-                "system": "Du bist ein präziser Recherche-Assistent, der Unternehmensinformationen findet.",
-                "messages": [
-                    {"role": "user", "content": prompt}
-                ]
-            }
-            
-            response = requests.post(
-                "https://api.anthropic.com/v1/messages",
-                headers=headers,
-                json=data
-            )
-            
-            if response.status_code != 200:
-                print(f"Fehler bei der API-Anfrage: {response.status_code} - {response.text}")
-                return {
-                    "name": company_name,
-                    "phone": None,
-                    "email": None,
-                    "website": None
-                }
-            
-            # Verarbeite die Antwort der neueren API-Version
-            response_data = response.json()
-            content = response_data.get("content", [])
-            
-            if not content or len(content) == 0:
-                return {
-                    "name": company_name,
-                    "phone": None,
-                    "email": None,
-                    "website": None
-                }
-            
+        data = {
+            "model": "claude-3-haiku-20240307",
+            "max_tokens": 1500,
+            "temperature": 0.2,
+            # Die Anweisungen sind für alle Unternehmen gleich und werden als cachebarer Block gesendet
+            "system": build_system(SYSTEM_PROMPT, self.prompt_variant, self.structured_output),
+            "messages": [
+                {"role": "user", "content": company_message(company_name)}
+            ]
+        }
+        
+        # Strukturierter Modus: das Modell muss das Werkzeug aufrufen, die Antwort ist entsprechend kurz
+        if self.structured_output:
+            data["tools"] = [COMPANY_INFO_TOOL]
+            data["tool_choice"] = COMPANY_INFO_TOOL_CHOICE
+            data["max_tokens"] = STRUCTURED_MAX_TOKENS
+        return headers, data
+
+    def _parse_response(self, company_name, status_code, response_text, response_json):
+        if status_code != 200:
+            print(f"Fehler bei der API-Anfrage: {status_code} - {response_text}")
+            return self._empty_result(company_name)
+        
+        # Verarbeite die Antwort der neueren API-Version
+        response_data = response_json()
+        self.usage.add(response_data.get("usage"))
+        content = response_data.get("content", [])
+        
+        if not content or len(content) == 0:
+            return self._empty_result(company_name)
+        
+        if self.structured_output:
+            # Die Argumente des Werkzeugaufrufs sind bereits das Ergebnis
+            result = tool_input(content)
+            if result is None:
+                print(f"Kein Werkzeugaufruf in der Antwort für {company_name}")
+                return self._empty_result(company_name)
+        else:
             # Extrahiere den Text aus dem ersten Content-Element
             text_content = content[0].get("text", "")
             
-            # Bereinige die Antwort, falls sie nicht direkt als JSON formatiert ist
-            if "```json" in text_content:
-                json_str = text_content.split("```json")[1].split("```")[0].strip()
-            elif "```" in text_content:
-                json_str = text_content.split("```")[1].strip()
-            else:
-                # Versuche, JSON direkt aus dem Text zu extrahieren
-                import re
-                json_pattern = r'\{.*\}'
-                match = re.search(json_pattern, text_content, re.DOTALL)
-                if match:
-                    json_str = match.group(0)
-                else:
-                    json_str = text_content.strip()
-            
             # Versuche, das JSON zu parsen
             try:
-                result = json.loads(json_str)
-                # Stelle sicher, dass alle erforderlichen Felder vorhanden sind
-                result["name"] = result.get("name", company_name)
-                result["phone"] = result.get("phone")
-                result["email"] = result.get("email")
-                result["website"] = result.get("website")
-                return result
-            except json.JSONDecodeError:
+                result = extract_json(text_content, dict)
+            except JsonExtractionError as e:
                 # Fallback, wenn das JSON nicht geparst werden kann
-                return {
-                    "name": company_name,
-                    "phone": None,
-                    "email": None,
-                    "website": None
-                }
-                
-        except Exception as e:
-            print(f"Fehler bei der Anfrage an Claude für {company_name}: {e}")
-            return {
-                "name": company_name,
-                "phone": None,
-                "email": None,
-                "website": None
-            }
+                print(f"Antwort für {company_name} nicht lesbar ({e})")
+                return self._empty_result(company_name)
+        
+        # Stelle sicher, dass alle erforderlichen Felder vorhanden sind
+        result["name"] = result.get("name", company_name)
+        result["phone"] = result.get("phone")
+        result["email"] = result.get("email")
+        result["website"] = result.get("website")
+        return result
+
+    def _empty_result(self, company_name):
+        return {
+            "name": company_name,
+            "phone": None,
+            "email": None,
+            "website": None
+        }
 
 def get_html():
     return """
@@ -495,6 +534,17 @@ def get_html():
 
 class handler(BaseHTTPRequestHandler):
     def do_GET(self):
+        if self.path == '/api/stats':
+            self.send_response(200)
+            self.send_header('Content-type', 'application/json')
+            self.end_headers()
+            self.wfile.write(json.dumps({
+                'cache': get_cache().stats(),
+                'circuit_breaker': get_circuit_breaker().stats(),
+                'clients': async_clients.stats()
+            }).encode())
+            return
+
         self.send_response(200)
         self.send_header('Content-type', 'text/html')
         self.end_headers()
@@ -527,7 +577,11 @@ class handler(BaseHTTPRequestHandler):
                 
                 # Claude-Client initialisieren
                 try:
-                    claude = ClaudeClient(api_key=anthropic_key)
+                    claude = ClaudeClient(
+                        api_key=anthropic_key,
+                        structured_output=data.get('structuredOutput'),
+                        prompt_variant=data.get('promptVariant')
+                    )
                 except ValueError as e:
                     self.send_response(400)
                     self.send_header('Content-type', 'application/json')
@@ -541,26 +595,20 @@ class handler(BaseHTTPRequestHandler):
                     self.wfile.write(json.dumps({'error': f'Fehler bei der Initialisierung des Claude-Clients: {str(e)}'}).encode())
                     return
                 
-                # Ergebnisse für jedes Unternehmen abrufen
-                results = []
-                for company in companies:
-                    try:
-                        result = claude.get_company_info(company)
-                        results.append(result)
-                    except Exception as e:
-                        results.append({
-                            'name': company,
-                            'phone': None,
-                            'email': None,
-                            'website': None
-                        })
+                # Ergebnisse für alle Unternehmen nebenläufig abrufen
+                try:
+                    results = run_async(claude.get_companies_info_async(companies))
+                except Exception as e:
+                    print(f"Fehler bei der nebenläufigen Abfrage: {e}")
+                    results = [claude._empty_result(company) for company in companies]
                 
                 self.send_response(200)
                 self.send_header('Content-type', 'application/json')
                 self.end_headers()
                 self.wfile.write(json.dumps({
                     'message': f"{len(results)} Unternehmen erfolgreich verarbeitet",
-                    'data': results
+                    'data': results,
+                    'usage': claude.usage.as_dict()
                 }).encode())
                 return
             except Exception as e:
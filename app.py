@@ -1,10 +1,29 @@
 import os
+import json
 import requests
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, Response, render_template, request, jsonify, stream_with_context
 from bs4 import BeautifulSoup
 import re
-from claude_client import ClaudeClient
+from claude_client import MAX_BATCH_SIZE, ClaudeClient, anthropic_clients
+from company_input import is_xlsx, iter_csv_companies, iter_xlsx_companies
+from company_names import CompanyDeduper, dedupe_companies
+from jobs import JobRunner, get_job_store
+from client_registry import key_hash
+from lookup_cache import get_cache
+from model_cascade import get_model_stats
+from result_export import CSV_MIMETYPE, XLSX_MIMETYPE, export_rows, iter_csv, iter_xlsx
+from rate_limiter import get_rate_limiter
+from resilience import get_circuit_breaker
+from single_flight import get_single_flight
+from site_scraper import get_site_scraper
+from crawler import get_crawler
+from worker_pool import QueueFullError, RequestTooLargeError, get_worker_pool
+import codecs
 import concurrent.futures
+import io
+import itertools
+import shutil
+import tempfile
 from dotenv import load_dotenv
 
 # Laden der Umgebungsvariablen am Anfang der Datei
@@ -15,46 +34,376 @@ app = Flask(__name__)
 # API-Konfiguration
 ANTHROPIC_API_KEY = os.environ.get('ANTHROPIC_API_KEY')
 
+# Blockgröße beim Kopieren hochgeladener Dateien
+UPLOAD_COPY_SIZE = 1024 * 1024
+
+# Ein Worker-Pool für alle Anfragen, statt pro Anfrage neue Threads zu starten
+worker_pool = get_worker_pool()
+
+# Große Listen laufen als Hintergrund-Jobs
+job_runner = JobRunner(get_job_store(), ClaudeClient, pool=worker_pool)
+
+def resume_jobs():
+    """Setzt unfertige Jobs nach einem Neustart fort; nur vom Server beim Start aufzurufen, nicht beim Import.
+
+    Bei mehreren Worker-Prozessen sorgt die Sperre im Job-Speicher dafür, dass nur einer einen Job übernimmt.
+    """
+    job_runner.resume_all(ANTHROPIC_API_KEY)
+
 @app.route('/')
 def index():
     return render_template('index.html')
 
+def _empty_result(company):
+    return {
+        'name': company,
+        'phone': None,
+        'email': None,
+        'website': None
+    }
+
+def _pool_error_response(e):
+    """Antwort, wenn der Worker-Pool eine Anfrage ablehnt: 413 bei zu großen Anfragen, sonst 503 mit Retry-After"""
+    if isinstance(e, RequestTooLargeError):
+        return jsonify({'error': str(e), 'limit': e.limit}), 413
+    response = jsonify({'error': str(e)})
+    response.headers['Retry-After'] = str(e.retry_after)
+    return response, 503
+
+def _start_lookups(data):
+    """Bereitet die Abfragen einer Anfrage vor und reicht sie beim Worker-Pool ein.
+
+    Liefert entweder eine Fehlerantwort oder ein Dict mit den eingereichten Futures.
+    """
+    companies = data.get('companies', [])
+    anthropic_key = data.get('anthropicKey') or os.environ.get('ANTHROPIC_API_KEY')
+    
+    if not companies:
+        return (jsonify({'error': 'Keine Unternehmen angegeben'}), 400), None
+
+    # Optional mehrere Unternehmen pro Modellaufruf abfragen, höchstens so viele, wie in eine Antwort passen
+    try:
+        batch_size = min(max(int(data.get('batchSize') or 1), 1), MAX_BATCH_SIZE)
+    except (TypeError, ValueError):
+        return (jsonify({'error': 'batchSize muss eine ganze Zahl sein'}), 400), None
+    
+    # Claude-Client initialisieren
+    claude = ClaudeClient(
+        api_key=anthropic_key,
+        structured_output=data.get('structuredOutput'),
+        scrape_first=data.get('scrapeFirst'),
+        auto_enrich=data.get('autoEnrich')
+    )
+    
+    # Gleichwertige Namen zusammenfassen, damit jedes Unternehmen nur einmal abgefragt wird
+    unique_companies, mapping = dedupe_companies(companies)
+
+    # Aufrufe vorbereiten: pro Batch oder pro eindeutigem Unternehmen
+    if batch_size > 1:
+        calls = [(claude.get_company_info_batch, unique_companies[start:start + batch_size]) for start in range(0, len(unique_companies), batch_size)]
+        call_indices = [range(start, min(start + batch_size, len(unique_companies))) for start in range(0, len(unique_companies), batch_size)]
+    else:
+        calls = [(claude.get_company_info, company) for company in unique_companies]
+        call_indices = [[i] for i in range(len(unique_companies))]
+    
+    # Über den prozessweiten Worker-Pool ausführen; ist die Warteschlange voll (503) oder die Anfrage zu groß (413), wird sie abgelehnt
+    try:
+        futures = worker_pool.submit_all(calls)
+    except (QueueFullError, RequestTooLargeError) as e:
+        return _pool_error_response(e), None
+    
+    return None, {
+        'claude': claude,
+        'companies': companies,
+        'unique_companies': unique_companies,
+        'mapping': mapping,
+        'batch_size': batch_size,
+        'future_to_indices': dict(zip(futures, call_indices))
+    }
+
+def _completed_results(lookups):
+    """Liefert (Index, Ergebnis) für jedes eindeutige Unternehmen, sobald es fertig ist"""
+    unique_companies = lookups['unique_companies']
+    batch_size = lookups['batch_size']
+    future_to_indices = lookups['future_to_indices']
+    
+    for future in concurrent.futures.as_completed(future_to_indices):
+        indices = future_to_indices[future]
+        try:
+            result = future.result()
+            yield from zip(indices, result if batch_size > 1 else [result])
+        except Exception as e:
+            for i in indices:
+                print(f"Fehler bei {unique_companies[i]}: {e}")
+                yield i, _empty_result(unique_companies[i])
+
 @app.route('/search', methods=['POST'])
 def search():
+    error, lookups = _start_lookups(request.json)
+    if error:
+        return error
+    
+    companies = lookups['companies']
+    unique_companies = lookups['unique_companies']
+    
+    # Ergebnisse für jedes eindeutige Unternehmen parallel abrufen
+    unique_results = [None] * len(unique_companies)
+    for i, result in _completed_results(lookups):
+        unique_results[i] = result
+    
+    # Ergebnisse in der ursprünglichen Reihenfolge auf alle Eingabezeilen verteilen
+    results = [dict(unique_results[i], name=company) for company, i in zip(companies, lookups['mapping'])]
+    
+    return jsonify({
+        'message': f"{len(results)} Unternehmen erfolgreich verarbeitet",
+        'data': results,
+        'saved_calls': len(companies) - len(unique_companies),
+        'model_calls_avoided': lookups['claude'].model_calls_avoided,
+        'enriched': lookups['claude'].enriched
+    })
+
+@app.route('/search/stream', methods=['POST'])
+def search_stream():
+    """Wie /search, liefert aber jedes Ergebnis als NDJSON-Zeile, sobald es fertig ist"""
+    error, lookups = _start_lookups(request.json)
+    if error:
+        return error
+    
+    companies = lookups['companies']
+    
+    # Ergebnisse zusätzlich im Job-Speicher ablegen, damit sie serverseitig exportiert werden können
+    store = job_runner.store
+    job_id = store.create_job(companies, lookups['claude'].api_key, kind='stream')
+    
+    # Eingabezeilen je eindeutigem Unternehmen, um Ergebnisse sofort verteilen zu können
+    lines_by_unique = {}
+    for line, i in enumerate(lookups['mapping']):
+        lines_by_unique.setdefault(i, []).append(line)
+    
+    def generate():
+        completed = False
+        try:
+            yield json.dumps({'job_id': job_id}) + '\n'
+            for i, result in _completed_results(lookups):
+                rows = [(line, dict(result, name=companies[line])) for line in lines_by_unique[i]]
+                store.save_results(job_id, rows)
+                for line, data in rows:
+                    yield json.dumps({'index': line, 'data': data}) + '\n'
+            completed = True
+            store.set_status(job_id, 'done')
+            yield json.dumps({
+                'done': True,
+                'job_id': job_id,
+                'message': f"{len(companies)} Unternehmen erfolgreich verarbeitet",
+                'saved_calls': len(companies) - len(lookups['unique_companies']),
+                'model_calls_avoided': lookups['claude'].model_calls_avoided,
+                'enriched': lookups['claude'].enriched
+            }) + '\n'
+        finally:
+            # Verbindung abgebrochen: der Job wird nicht automatisch fortgesetzt (kostet sonst Kontingent
+            # für eine verlassene Suche), lässt sich aber ausdrücklich über POST /jobs/<id>/resume nachholen
+            if not completed:
+                # Noch nicht gestartete Abfragen verwerfen, niemand wartet mehr auf sie
+                for future in lookups['future_to_indices']:
+                    future.cancel()
+                store.set_status(job_id, 'interrupted')
+    
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+@app.route('/enrich', methods=['POST'])
+def enrich():
+    """Ergänzt teilweise gefüllte Einträge, indem nur die fehlenden Felder nachgefragt werden"""
+    data = request.json
+    records = [record for record in data.get('records', []) if isinstance(record, dict) and record.get('name')]
+    anthropic_key = data.get('anthropicKey') or os.environ.get('ANTHROPIC_API_KEY')
+    
+    if not records:
+        return jsonify({'error': 'Keine Einträge angegeben'}), 400
+    
+    claude = ClaudeClient(api_key=anthropic_key, structured_output=data.get('structuredOutput'))
+    try:
+        futures = worker_pool.submit_all([(claude.enrich_company_info, record) for record in records])
+    except (QueueFullError, RequestTooLargeError) as e:
+        return _pool_error_response(e)
+    
+    results = []
+    for record, future in zip(records, futures):
+        try:
+            results.append(future.result())
+        except Exception as e:
+            print(f"Fehler beim Nachfragen für {record['name']}: {e}")
+            results.append(dict(_empty_result(record['name']), **{field: record.get(field) for field in ('phone', 'email', 'website')}))
+    
+    return jsonify({
+        'message': f"{len(results)} Einträge verarbeitet",
+        'data': results,
+        'enriched': claude.enriched
+    })
+
+def _job_response(job):
+    return {key: value for key, value in job.items() if key != 'key_hash'}
+
+@app.route('/jobs', methods=['POST'])
+def create_job():
     data = request.json
     companies = data.get('companies', [])
     anthropic_key = data.get('anthropicKey') or os.environ.get('ANTHROPIC_API_KEY')
     
     if not companies:
         return jsonify({'error': 'Keine Unternehmen angegeben'}), 400
+    if not anthropic_key:
+        return jsonify({'error': 'Anthropic API-Schlüssel fehlt. Bitte geben Sie einen API-Schlüssel ein.'}), 400
     
-    # Claude-Client initialisieren
-    claude = ClaudeClient(api_key=anthropic_key)
+    job_id = job_runner.submit(companies, anthropic_key)
+    return jsonify(_job_response(job_runner.store.get_job(job_id))), 202
+
+@app.route('/upload', methods=['POST'])
+def upload():
+    """Nimmt eine CSV- oder XLSX-Datei mit Unternehmensnamen entgegen und arbeitet sie als Job ab.
+
+    Die Datei wird in eine eigene temporäre Datei kopiert und im Hintergrund
+    gelesen; geprüft wird vorab nur, ob sich der erste Name lesen lässt. Die
+    Antwort (202 mit Job) kommt also sofort, auch bei sehr großen Dateien.
+    Doppelte Namen werden beim Lesen übersprungen, die übrigen sofort an den
+    Job angehängt, der parallel schon abfragt. Spätere Lesefehler stehen im
+    Feld `error` des Jobs.
+    """
+    upload_file = request.files.get('file')
+    anthropic_key = request.form.get('anthropicKey') or os.environ.get('ANTHROPIC_API_KEY')
+    column = request.form.get('column') or None
+    encoding = request.form.get('encoding') or 'utf-8-sig'
     
-    # Ergebnisse für jedes Unternehmen parallel abrufen
-    results = []
-    with concurrent.futures.ThreadPoolExecutor(max_workers=5) as executor:
-        future_to_company = {executor.submit(claude.get_company_info, company): company for company in companies}
-        for future in concurrent.futures.as_completed(future_to_company):
-            company = future_to_company[future]
-            try:
-                result = future.result()
-                results.append(result)
-            except Exception as e:
-                print(f"Fehler bei {company}: {e}")
-                results.append({
-                    'name': company,
-                    'phone': None,
-                    'email': None,
-                    'website': None
-                })
+    if upload_file is None:
+        return jsonify({'error': 'Keine Datei angegeben'}), 400
+    if not anthropic_key:
+        return jsonify({'error': 'Anthropic API-Schlüssel fehlt. Bitte geben Sie einen API-Schlüssel ein.'}), 400
+    try:
+        codecs.lookup(encoding)
+    except LookupError:
+        return jsonify({'error': f'Unbekannte Zeichenkodierung: {encoding}'}), 400
+    
+    # Werkzeug schließt die hochgeladene Datei mit dem Ende der Anfrage, der Job liest aus einer eigenen Kopie
+    spool = tempfile.TemporaryFile()
+    try:
+        shutil.copyfileobj(upload_file.stream, spool, UPLOAD_COPY_SIZE)
+        spool.seek(0)
+        
+        # Format am Dateianfang erkennen, nicht an der Endung
+        if is_xlsx(spool.read(4)):
+            spool.seek(0)
+            companies = iter_xlsx_companies(spool, column)
+        else:
+            spool.seek(0)
+            companies = iter_csv_companies(io.TextIOWrapper(spool, encoding=encoding, newline=''), column)
+        
+        # Nur den ersten Namen lesen: falsche Spalte oder kaputte Datei fallen so sofort auf, ohne leeren Job
+        first = next(companies, None)
+    except ValueError as e:
+        spool.close()
+        return jsonify({'error': f'Datei nicht lesbar: {e}'}), 400
+    if first is None:
+        spool.close()
+        return jsonify({'error': 'Keine Unternehmen in der Datei gefunden'}), 400
     
+    deduper = CompanyDeduper()
+    
+    def finished(job_id, count, error):
+        spool.close()
+        job_runner.store.set_duplicates(job_id, deduper.duplicates)
+    
+    job_id = job_runner.submit_stream(
+        deduper.filter(itertools.chain([first], companies)), anthropic_key, kind='upload', on_finished=finished
+    )
+    return jsonify(_job_response(job_runner.store.get_job(job_id))), 202
+
+@app.route('/jobs/<job_id>')
+def get_job(job_id):
+    job = job_runner.store.get_job(job_id)
+    if job is None:
+        return jsonify({'error': 'Job nicht gefunden'}), 404
+    
+    # Teilergebnisse seitenweise, damit die Antwort auch bei großen Jobs klein bleibt
+    offset = request.args.get('offset', 0, type=int)
+    limit = request.args.get('limit', 100, type=int)
+    response = _job_response(job)
+    response['data'] = [dict(result, index=i) for i, result in job_runner.store.iter_results(job_id, offset, limit)]
+    return jsonify(response)
+
+@app.route('/jobs/<job_id>/results')
+def get_job_results(job_id):
+    """Streamt alle bisher fertigen Ergebnisse eines Jobs als NDJSON.
+
+    Mit ?since=<seq> nur die danach fertig gewordenen, in der Reihenfolge des
+    Speicherns und höchstens `limit` Stück; jede Zeile trägt ihre `seq` als
+    Zeiger für die nächste Abfrage.
+    """
+    if job_runner.store.get_job(job_id) is None:
+        return jsonify({'error': 'Job nicht gefunden'}), 404
+    
+    since = request.args.get('since', type=int)
+    limit = request.args.get('limit', type=int)
+    
+    def generate():
+        if since is None:
+            for i, result in job_runner.store.iter_results(job_id):
+                yield json.dumps({'index': i, 'data': result}) + '\n'
+            return
+        for seq, i, result in job_runner.store.iter_new_results(job_id, since, limit):
+            yield json.dumps({'index': i, 'data': result, 'seq': seq}) + '\n'
+    
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+@app.route('/jobs/<job_id>/export')
+def export_job(job_id):
+    """Streamt alle fertigen Ergebnisse eines Jobs als CSV (Standard) oder mit ?format=xlsx als Excel-Datei"""
+    if job_runner.store.get_job(job_id) is None:
+        return jsonify({'error': 'Job nicht gefunden'}), 404
+    
+    export_format = request.args.get('format', 'csv')
+    if export_format not in ('csv', 'xlsx'):
+        return jsonify({'error': 'Unbekanntes Format, erlaubt sind csv und xlsx'}), 400
+    
+    # Zeilen werden seitenweise aus dem Job-Speicher gelesen und sofort geschrieben (chunked transfer)
+    rows = export_rows(result for _, result in job_runner.store.iter_results(job_id))
+    body = iter_csv(rows) if export_format == 'csv' else iter_xlsx(rows)
+    response = Response(stream_with_context(body), content_type=CSV_MIMETYPE if export_format == 'csv' else XLSX_MIMETYPE)
+    response.headers['Content-Disposition'] = f'attachment; filename=unternehmensdaten.{export_format}'
+    return response
+
+@app.route('/jobs/<job_id>/resume', methods=['POST'])
+def resume_job(job_id):
+    job = job_runner.store.get_job(job_id)
+    if job is None:
+        return jsonify({'error': 'Job nicht gefunden'}), 404
+    
+    anthropic_key = (request.json or {}).get('anthropicKey') or os.environ.get('ANTHROPIC_API_KEY')
+    if not anthropic_key or key_hash(anthropic_key) != job['key_hash']:
+        return jsonify({'error': 'Der API-Schlüssel passt nicht zu diesem Job'}), 403
+    
+    # Endgültig fehlgeschlagene Einträge bekommen beim manuellen Fortsetzen neue Versuche
+    if job['status'] != 'done' or job['failed']:
+        if not job_runner.start(job_id, anthropic_key, retry_failed=True):
+            return jsonify({'error': 'Der Job wird bereits verarbeitet'}), 409
+    return jsonify(_job_response(job_runner.store.get_job(job_id))), 202
+
+@app.route('/stats')
+def stats():
     return jsonify({
-        'message': f"{len(results)} Unternehmen erfolgreich verarbeitet",
-        'data': results
+        'cache': get_cache().stats(),
+        'workers': worker_pool.stats(),
+        'rate_limit': get_rate_limiter().stats(),
+        'circuit_breaker': get_circuit_breaker().stats(),
+        'clients': anthropic_clients.stats(),
+        'scraper': get_site_scraper().stats(),
+        'crawler': get_crawler().stats(),
+        'models': get_model_stats().stats(),
+        'single_flight': get_single_flight().stats()
     })
 
 # Nur für lokale Entwicklung
 if __name__ == '__main__':
     print(f"ANTHROPIC_API_KEY gefunden: {os.environ.get('ANTHROPIC_API_KEY') is not None}")
+    # Mit Reloader läuft dieser Block auch im überwachenden Elternprozess; Jobs nur im eigentlichen Server fortsetzen
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        resume_jobs()
     app.run(debug=True) 
\ No newline at end of file
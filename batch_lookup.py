@@ -0,0 +1,199 @@
+"""Kommandozeile für große Listen ohne den Umweg über den Flask-Server.
+
+Liest Unternehmensnamen zeilenweise aus einer CSV- oder JSONL-Datei, fragt sie
+über einen eigenen Worker-Pool ab und hängt jedes Ergebnis an die Ausgabedatei
+(JSONL oder CSV) an, sobald es fertig ist. Jede Ausgabezeile trägt die
+Nummer ihres Eingabedatensatzes; bei einem erneuten Aufruf mit derselben
+Ausgabedatei werden bereits vorhandene Nummern übersprungen, ein abgebrochener
+Lauf setzt also dort fort, wo er aufgehört hat, und holt fehlgeschlagene
+Abfragen nach.
+
+    python batch_lookup.py firmen.csv ergebnisse.jsonl [--workers 8] [--column Firma]
+"""
+import argparse
+import concurrent.futures
+import csv
+import json
+import os
+import sys
+import time
+from dotenv import load_dotenv
+from claude_client import ClaudeClient
+from company_input import iter_csv_companies, iter_jsonl_companies
+from worker_pool import DEFAULT_WORKERS, WorkerPool
+
+OUTPUT_FIELDS = ('index', 'name', 'phone', 'email', 'website')
+
+
+def file_format(path, override=None):
+    if override:
+        return override
+    return 'csv' if path.lower().endswith('.csv') else 'jsonl'
+
+
+def read_companies(path, fmt, column=None):
+    """Liefert (Datensatznummer, Name); die Nummer bleibt stabil, auch wenn leere Zeilen übersprungen werden"""
+    # utf-8-sig entfernt das BOM, das Excel beim CSV-Export voranstellt
+    with open(path, encoding='utf-8-sig', newline='') as f:
+        read = iter_csv_companies if fmt == 'csv' else iter_jsonl_companies
+        yield from read(f, column, numbered=True)
+
+
+def completed_indices(path, fmt):
+    """Nummern der Eingabedatensätze, die schon in der Ausgabedatei stehen.
+
+    Eine unvollständige letzte Zeile (Abbruch mitten im Schreiben) wird dabei
+    abgeschnitten, damit neue Ergebnisse auf einer eigenen Zeile beginnen.
+    """
+    if not os.path.exists(path):
+        return set()
+    with open(path, 'rb+') as f:
+        # Nur das Dateiende lesen; eine einzelne Ergebniszeile ist weit kürzer
+        size = f.seek(0, os.SEEK_END)
+        f.seek(max(0, size - 65536))
+        tail = f.read()
+        if tail and not tail.endswith(b'\n'):
+            f.truncate(size - len(tail) + tail.rfind(b'\n') + 1)
+
+    done = set()
+    with open(path, encoding='utf-8', newline='') as f:
+        if fmt == 'csv':
+            for row in csv.DictReader(f):
+                if (row.get('index') or '').isdigit():
+                    done.add(int(row['index']))
+        else:
+            for line in f:
+                try:
+                    done.add(int(json.loads(line)['index']))
+                except (ValueError, KeyError, TypeError):
+                    continue
+    return done
+
+
+class ResultWriter:
+    """Hängt Ergebnisse zeilenweise an die Ausgabedatei an und schreibt sie sofort durch"""
+
+    def __init__(self, path, fmt):
+        new_file = not os.path.exists(path) or os.path.getsize(path) == 0
+        self._file = open(path, 'a', encoding='utf-8', newline='')
+        self._csv = csv.DictWriter(self._file, OUTPUT_FIELDS, extrasaction='ignore') if fmt == 'csv' else None
+        if self._csv and new_file:
+            self._csv.writeheader()
+
+    def write(self, index, result):
+        row = dict(result, index=index)
+        if self._csv:
+            self._csv.writerow(row)
+        else:
+            self._file.write(json.dumps({field: row.get(field) for field in OUTPUT_FIELDS}, ensure_ascii=False) + '\n')
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+def run(companies, client, pool, writer, done, progress_every=1000):
+    """Verarbeitet alle noch offenen (Nummer, Name); liefert (verarbeitet, übersprungen, fehlgeschlagen).
+
+    Fehlgeschlagene Abfragen (der Client wirft dann, statt ein leeres Ergebnis
+    zu liefern) werden nicht geschrieben und beim nächsten Aufruf wiederholt.
+    """
+    # Höchstens so viele Abfragen gleichzeitig einreichen, wie der Pool annimmt; die Eingabe wird dadurch
+    # nur so schnell gelesen, wie Ergebnisse fertig werden, und bleibt nie ganz im Speicher
+    max_in_flight = pool.max_workers + pool.queue_size
+    in_flight = {}
+    processed = skipped = failed = 0
+    start = time.monotonic()
+
+    def collect(futures):
+        nonlocal processed, failed
+        for future in futures:
+            index, company = in_flight.pop(future)
+            try:
+                result = future.result()
+            except Exception as e:
+                print(f"Fehler bei {company}: {e}")
+                failed += 1
+                continue
+            # Wie bei /search steht in der Ausgabe der Name aus der Eingabe
+            writer.write(index, dict(result, name=company))
+            processed += 1
+            if progress_every and processed % progress_every == 0:
+                rate = processed / max(time.monotonic() - start, 1e-9)
+                print(f"{processed} Unternehmen verarbeitet ({rate:.1f}/s)")
+
+    try:
+        for index, company in companies:
+            if index in done:
+                skipped += 1
+                continue
+            while len(in_flight) >= max_in_flight:
+                finished, _ = concurrent.futures.wait(in_flight, return_when=concurrent.futures.FIRST_COMPLETED)
+                collect(finished)
+            future, = pool.submit_all([(client.get_company_info, company)])
+            in_flight[future] = (index, company)
+        collect(concurrent.futures.as_completed(list(in_flight)))
+    except KeyboardInterrupt:
+        # Noch nicht gestartete Abfragen verwerfen; der nächste Aufruf setzt bei ihnen fort
+        for future in in_flight:
+            future.cancel()
+        raise
+    return processed, skipped, failed
+
+
+def main(argv=None):
+    load_dotenv()
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('input', help='CSV- oder JSONL-Datei mit Unternehmensnamen')
+    parser.add_argument('output', help='Ausgabedatei (.csv oder .jsonl); vorhandene Ergebnisse werden übersprungen')
+    parser.add_argument('--input-format', choices=('csv', 'jsonl'))
+    parser.add_argument('--output-format', choices=('csv', 'jsonl'))
+    parser.add_argument('--column', help='Spalte bzw. Feld mit dem Unternehmensnamen (sonst automatisch erkannt)')
+    parser.add_argument('--workers', type=int, default=int(os.environ.get('LOOKUP_WORKERS', DEFAULT_WORKERS)))
+    parser.add_argument('--api-key', default=os.environ.get('ANTHROPIC_API_KEY'))
+    parser.add_argument('--structured-output', action=argparse.BooleanOptionalAction, default=None)
+    parser.add_argument('--scrape-first', action=argparse.BooleanOptionalAction, default=None)
+    parser.add_argument('--auto-enrich', action=argparse.BooleanOptionalAction, default=None)
+    parser.add_argument('--progress', type=int, default=1000, help='Fortschritt alle N Ergebnisse ausgeben (0 = nie)')
+    args = parser.parse_args(argv)
+
+    if not args.api_key:
+        parser.error('Anthropic API-Schlüssel fehlt (--api-key oder ANTHROPIC_API_KEY)')
+
+    input_format = file_format(args.input, args.input_format)
+    output_format = file_format(args.output, args.output_format)
+    client = ClaudeClient(
+        api_key=args.api_key,
+        structured_output=args.structured_output,
+        scrape_first=args.scrape_first,
+        auto_enrich=args.auto_enrich
+    )
+    pool = WorkerPool(max_workers=args.workers, queue_size=args.workers)
+    done = completed_indices(args.output, output_format)
+    if done:
+        print(f"{len(done)} Ergebnisse aus {args.output} werden übersprungen")
+
+    writer = ResultWriter(args.output, output_format)
+    start = time.monotonic()
+    try:
+        companies = read_companies(args.input, input_format, args.column)
+        processed, skipped, failed = run(companies, client, pool, writer, done, args.progress)
+    except KeyboardInterrupt:
+        print(f"Abgebrochen; ein erneuter Aufruf mit {args.output} setzt fort")
+        return 130
+    except ValueError as e:
+        print(f"Eingabe nicht lesbar: {e}")
+        return 1
+    finally:
+        writer.close()
+
+    print(f"{processed} Unternehmen in {time.monotonic() - start:.1f} s verarbeitet, {skipped} übersprungen, "
+          f"{client.model_calls_avoided} Modellaufrufe durch Website-Scan vermieden")
+    if failed:
+        print(f"{failed} Abfragen fehlgeschlagen; ein erneuter Aufruf wiederholt sie")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,104 @@
+"""Micro-Benchmark: Kontaktdaten aus HTML-Seiten.
+
+Vergleicht contact_extract (Byte-Scan mit frühem Abbruch) mit dem bisherigen
+BeautifulSoup-Extraktor auf den Seiten in contact_pages/. Jede Seite wird mit
+Fülltext auf eine realistische Größe gebracht, der Kontaktblock bleibt am Ende.
+
+    python benchmarks/contact_extract_bench.py [--rounds N] [--padding-kb K]
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import timeit
+from urllib.parse import unquote
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bs4 import BeautifulSoup
+from contact_extract import extract_contacts
+
+PAGES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'contact_pages')
+
+CONTACT_BLOCK_PATTERN = re.compile(r'footer|contact|kontakt|impressum', re.IGNORECASE)
+PHONE_PATTERN = re.compile(r'(?:tel(?:efon)?|phone|fon)\.?\s*:?\s*(\+?\(?\d[\d\s()./-]{6,}\d)', re.IGNORECASE)
+EMAIL_PATTERN = re.compile(r'[\w.+-]+@[\w-]+(?:\.[\w-]+)*\.[a-z]{2,}', re.IGNORECASE)
+
+FILLER = '<div class="teaser"><h3>Neuigkeiten</h3><p>{}</p><a href="/news/{}">Weiterlesen</a></div>\n'
+
+
+def soup_extract(html, base_url):
+    # Bisheriger Ablauf aus site_scraper.extract_contacts
+    soup = BeautifulSoup(html, 'html.parser')
+    phone = None
+    email = None
+    tel_link = soup.select_one('a[href^="tel:"]')
+    if tel_link:
+        phone = unquote(tel_link['href'][4:]).strip() or None
+    mail_link = soup.select_one('a[href^="mailto:"]')
+    if mail_link:
+        email = unquote(mail_link['href'][7:]).split('?')[0].strip() or None
+    if not phone or not email:
+        blocks = soup.find_all(['footer', 'address'])
+        blocks += soup.find_all(attrs={'id': CONTACT_BLOCK_PATTERN})
+        blocks += soup.find_all(attrs={'class': CONTACT_BLOCK_PATTERN})
+        for block in blocks:
+            text = block.get_text(' ', strip=True)
+            if not phone:
+                match = PHONE_PATTERN.search(text)
+                phone = match.group(1).strip() if match else None
+            if not email:
+                match = EMAIL_PATTERN.search(text)
+                email = match.group(0) if match else None
+            if phone and email:
+                break
+    soup.get_text(' ', strip=True)
+    return {'phone': phone, 'email': email}
+
+
+def load_pages(padding_kb):
+    with open(os.path.join(PAGES_DIR, 'expected.json'), encoding='utf-8') as f:
+        expected = json.load(f)
+    filler = ''
+    while len(filler) < padding_kb * 1024:
+        filler += FILLER.format('Lorem ipsum dolor sit amet, consectetur adipiscing elit. ' * 4, len(filler))
+    pages = []
+    for name, fields in expected.items():
+        with open(os.path.join(PAGES_DIR, name), encoding='utf-8') as f:
+            html = f.read()
+        # Fülltext vor den Footer, wo Kontaktdaten üblicherweise stehen
+        position = html.find('<footer') if '<footer' in html else html.find('</body>')
+        pages.append((name, html[:position] + filler + html[position:], fields))
+    return pages
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rounds', type=int, default=20)
+    parser.add_argument('--padding-kb', type=int, default=100)
+    args = parser.parse_args()
+
+    pages = load_pages(args.padding_kb)
+    base_url = 'https://www.example.com/'
+
+    extractors = (
+        ('beautifulsoup', lambda html, name: soup_extract(html, base_url)),
+        ('contact_extract', lambda html, name: extract_contacts(html, base_url, name))
+    )
+    for label, extract in extractors:
+        correct = 0
+        for name, html, fields in pages:
+            found = extract(html, fields['name'])
+            correct += (found['phone'] == fields['phone']) + (found['email'] == fields['email'])
+        seconds = timeit.timeit(lambda: [extract(html, fields['name']) for _, html, fields in pages], number=args.rounds)
+        per_page = seconds / (args.rounds * len(pages)) * 1e3
+        print(f"{label:<16} {correct:>3}/{2 * len(pages)} Felder richtig   {per_page:8.2f} ms pro Seite")
+
+    for name, html, fields in pages:
+        found = extract_contacts(html, base_url, fields['name'])
+        print(f"  {name:<16} phone={found['phone']!r:<28} email={found['email']!r}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,134 @@
+"""Micro-Benchmark: unscharfe Cache-Suche über den MinHash-LSH-Index.
+
+Füllt einen LookupCache in einer temporären Datei mit synthetischen
+Unternehmensnamen (direkt per SQL, das Befüllen über `set` würde bei einer
+Million Einträgen zu lange dauern) und misst die Latenz von `fuzzy_lookup`
+für Tippfehler-Varianten bekannter Namen und für unbekannte Namen.
+
+    python benchmarks/fuzzy_index_bench.py [--names N] [--queries N] [--threshold T] [--db PATH]
+
+Mit --db wird eine schon befüllte Datei wiederverwendet.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from company_names import normalize_company_name
+from fuzzy_index import MAX_BUCKET_SIZE, best_match, buckets
+from lookup_cache import LookupCache
+
+CONSONANTS = ['b', 'ch', 'd', 'f', 'g', 'h', 'k', 'l', 'm', 'n', 'p', 'r', 's', 'sch', 't', 'v', 'w', 'z']
+VOWELS = ['a', 'e', 'i', 'o', 'u', 'ü', 'ei', 'au']
+ENDINGS = ['', '', 'n', 'r', 'x', 'tec', 'line', 'ko']
+WORDS = ['systems', 'technik', 'solutions', 'maschinenbau', 'consulting', 'logistik', 'software', 'bau',
+         'energie', 'medical', 'holding', 'handel', 'digital', 'services', 'immobilien', 'automotive',
+         'elektro', 'design', 'media', 'partner', 'verwaltung', 'werkzeugbau', 'pharma', 'foods']
+LEGAL = ['GmbH', 'AG', 'Inc.', 'Ltd', 'SE', 'KG', 'GmbH & Co. KG', '']
+
+
+def stem(rng):
+    syllables = ''.join(rng.choice(CONSONANTS) + rng.choice(VOWELS) for _ in range(rng.randint(2, 3)))
+    return (syllables + rng.choice(ENDINGS)).capitalize()
+
+
+def company_name(rng):
+    # Markenartiger Stamm, manchmal ein zweiter (z.B. "Müller & Partner"), dazu Branchenwörter und Rechtsform
+    words = [stem(rng)] + ([rng.choice(['&', 'und']), stem(rng)] if rng.random() < 0.1 else [])
+    words += rng.sample(WORDS, rng.randint(0, 2)) + [rng.choice(LEGAL)]
+    return ' '.join(word for word in words if word)
+
+
+def typo(rng, key):
+    position = rng.randrange(len(key))
+    action = rng.choice(('swap', 'drop', 'insert'))
+    if action == 'swap' and position + 1 < len(key):
+        return key[:position] + key[position + 1] + key[position] + key[position + 2:]
+    if action == 'drop':
+        return key[:position] + key[position + 1:]
+    return key[:position] + rng.choice('aeinrst') + key[position:]
+
+
+def percentile(values, fraction):
+    return sorted(values)[int(fraction * (len(values) - 1))]
+
+
+def fill(cache, rng, count):
+    keys = set()
+    now = time.time()
+    batch = []
+    # Wie LookupCache._insert_buckets: höchstens MAX_BUCKET_SIZE + 1 Namen je Bucket
+    bucket_sizes = {}
+    while len(keys) < count:
+        key = normalize_company_name(company_name(rng))
+        if key in keys:
+            continue
+        keys.add(key)
+        batch.append(key)
+        if len(batch) == 10000 or len(keys) == count:
+            # Der gespeicherte Name ist der Schlüssel, so lässt sich prüfen, ob der richtige Eintrag gefunden wurde
+            cache._conn.executemany(
+                "INSERT INTO lookups (key, result, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+                [(key, json.dumps({'name': key, 'phone': '+49 30 1234567', 'email': None, 'website': None}), now, now)
+                 for key in batch]
+            )
+            rows = []
+            for key in batch:
+                for bucket in buckets(key):
+                    if bucket_sizes.get(bucket, 0) <= MAX_BUCKET_SIZE:
+                        bucket_sizes[bucket] = bucket_sizes.get(bucket, 0) + 1
+                        rows.append((bucket, key))
+            cache._conn.executemany("INSERT OR IGNORE INTO lookup_buckets (bucket, key) VALUES (?, ?)", rows)
+            cache._conn.commit()
+            batch = []
+    return sorted(keys)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--names', type=int, default=1_000_000)
+    parser.add_argument('--queries', type=int, default=2000)
+    parser.add_argument('--threshold', type=float, default=0.6)
+    parser.add_argument('--db')
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    path = args.db or os.path.join(tempfile.mkdtemp(), 'fuzzy_bench.sqlite3')
+    exists = os.path.exists(path)
+    cache = LookupCache(path, max_entries=args.names)
+    start = time.perf_counter()
+    if exists:
+        keys = [row[0] for row in cache._conn.execute("SELECT key FROM lookups")]
+    else:
+        keys = fill(cache, rng, args.names)
+    print(f"Cache mit {len(keys)} Namen in {time.perf_counter() - start:.1f} s bereit ({path})")
+
+    typos = [(typo(rng, source), source) for source in (rng.choice(keys) for _ in range(args.queries))]
+    for label, queries in (
+        ('Tippfehler', typos),
+        ('unbekannt', [(normalize_company_name(company_name(rng)) + ' nord', None) for _ in range(args.queries)])
+    ):
+        timings = []
+        found = 0
+        correct = 0
+        for query, source in queries:
+            start = time.perf_counter()
+            match = cache.fuzzy_lookup(query, args.threshold)
+            timings.append((time.perf_counter() - start) * 1e3)
+            found += match is not None
+            correct += match is not None and match[0]['name'] == source
+        print(f"{label:<11} p50 {percentile(timings, 0.5):.3f} ms   p99 {percentile(timings, 0.99):.3f} ms   "
+              f"Treffer {found}/{len(queries)}" + (f", davon Ausgangsname {correct}" if label == 'Tippfehler' else ''))
+
+    # Obergrenze: bei wie vielen Tippfehlern der Ausgangsname die Schwelle überhaupt erreicht
+    reachable = sum(best_match(query, [source], args.threshold) is not None for query, source in typos)
+    print(f"erreichbar  {reachable}/{len(typos)} Tippfehler liegen über der Schwelle")
+
+
+if __name__ == '__main__':
+    main()
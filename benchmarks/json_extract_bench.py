@@ -0,0 +1,68 @@
+"""Micro-Benchmark: JSON-Extraktion aus Modellantworten.
+
+Vergleicht json_extract.extract_json mit dem bisherigen Parser (split auf
+Codeblöcke plus gieriges \\{.*\\}-Regex) auf dem Korpus aufgezeichneter
+Antworten in model_responses.json.
+
+    python benchmarks/json_extract_bench.py [--rounds N]
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from json_extract import JsonExtractionError, extract_json
+
+CORPUS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'model_responses.json')
+
+
+def legacy_parse(content):
+    # Bisheriger Ablauf aus get_company_info
+    if "```json" in content:
+        json_str = content.split("```json")[1].split("```")[0].strip()
+    elif "```" in content:
+        json_str = content.split("```")[1].strip()
+    else:
+        match = re.search(r'\{.*\}', content, re.DOTALL)
+        json_str = match.group(0) if match else content.strip()
+    try:
+        return json.loads(json_str)
+    except json.JSONDecodeError:
+        return None
+
+
+def new_parse(content):
+    try:
+        return extract_json(content)
+    except JsonExtractionError:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rounds', type=int, default=2000)
+    args = parser.parse_args()
+
+    with open(CORPUS_PATH, encoding='utf-8') as f:
+        corpus = json.load(f)
+
+    for name, parse in (('legacy', legacy_parse), ('extract_json', new_parse)):
+        parsed = sum(1 for content in corpus if parse(content) is not None)
+        seconds = timeit.timeit(lambda: [parse(content) for content in corpus], number=args.rounds)
+        per_response = seconds / (args.rounds * len(corpus)) * 1e6
+        print(f"{name:<14} {parsed:>3}/{len(corpus)} geparst   {per_response:8.2f} µs pro Antwort")
+
+    # Gründe für nicht lesbare Antworten, wie sie im Log erscheinen
+    for content in corpus:
+        try:
+            extract_json(content)
+        except JsonExtractionError as e:
+            print(f"  {e.reason:<16} {content[:60]!r}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,21 +1,266 @@
 import anthropic
-import json
+import concurrent.futures
 import os
+import threading
+import time
+from client_registry import ClientRegistry, key_hash
+from company_names import normalize_company_name
+from enrichment import ENRICH_MAX_TOKENS, auto_enrich_default, enrich_prompt, is_partial, merge_fields, missing_fields
+from fuzzy_index import fuzzy_thresholds_default, hint_prompt
+from json_extract import JsonExtractionError, extract_json, extract_json_items
+from lookup_cache import get_cache, is_empty_result
+from model_cascade import confidence_score, confidence_threshold_default, get_model_stats, model_chain_default
+from rate_limiter import get_rate_limiter, parse_retry_after
+from resilience import is_retryable_status, retry_call
+from single_flight import get_single_flight
+from site_scraper import get_site_scraper, scrape_first_default
+from structured_output import COMPANY_INFO_TOOL, COMPANY_INFO_TOOL_CHOICE, STRUCTURED_MAX_TOKENS, partial_tool, structured_output_default, tool_input
+
+# Wie oft eine gedrosselte Anfrage (429/529) erneut eingereiht wird
+MAX_THROTTLE_RETRIES = 8
+THROTTLE_STATUS_CODES = (429, 529)
+
+# Token-Budget einer Batch-Antwort; mehr Unternehmen pro Anfrage, als hineinpassen, würden das Array abschneiden
+BATCH_MAX_TOKENS = 4096
+BATCH_BASE_TOKENS = 200
+BATCH_TOKENS_PER_COMPANY = 150
+MAX_BATCH_SIZE = (BATCH_MAX_TOKENS - BATCH_BASE_TOKENS) // BATCH_TOKENS_PER_COMPANY
+
+# Eigene kleine Threads für Hintergrund-Aktualisierungen veralteter Cache-Einträge,
+# damit sie nie die Worker der Nutzeranfragen belegen
+_refresh_pool = concurrent.futures.ThreadPoolExecutor(
+    max_workers=int(os.environ.get('LOOKUP_REFRESH_WORKERS', 2)), thread_name_prefix='cache-refresh'
+)
+_refreshing = set()
+_refreshing_lock = threading.Lock()
+
+
+class LookupFailedError(Exception):
+    """Weder Modell noch Website-Scan haben ein Ergebnis geliefert; nichts wurde gecacht"""
+
+    def __init__(self, company_name):
+        super().__init__(f"Keine Antwort für {company_name} erhalten")
+        self.company_name = company_name
+
+
+def is_retryable_error(error):
+    """Verbindungsfehler, Timeouts und vorübergehende Fehlerstatus der Anthropic API"""
+    if isinstance(error, anthropic.APIConnectionError):
+        return True
+    return isinstance(error, anthropic.APIStatusError) and is_retryable_status(error.status_code)
+
+
+def _is_retryable_unthrottled(error):
+    # Drosselung wiederholt schon _send_message über den Rate-Limiter; die Retry-Policy darüber übernimmt
+    # nur die übrigen Fehler, sonst multiplizierten sich die Versuche beider Schichten
+    if isinstance(error, anthropic.APIStatusError) and error.status_code in THROTTLE_STATUS_CODES:
+        return False
+    return is_retryable_error(error)
+
+
+def _create_anthropic_client(api_key):
+    # Der SDK-Client hält selbst einen Keep-Alive-Pool; Wiederholungen übernehmen Rate-Limiter und Retry-Policy
+    return anthropic.Anthropic(api_key=api_key, max_retries=0)
+
+
+anthropic_clients = ClientRegistry(_create_anthropic_client)
+
+
+def anthropic_client(api_key):
+    """Leiht den geteilten Anthropic-Client für den API-Schlüssel aus (als with-Block)"""
+    return anthropic_clients.lease(api_key)
+
 
 class ClaudeClient:
-    def __init__(self, api_key=None):
+    def __init__(self, api_key=None, structured_output=None, scrape_first=None, auto_enrich=None):
         self.api_key = api_key or os.environ.get('ANTHROPIC_API_KEY')
         if not self.api_key:
             raise ValueError("Anthropic API-Schlüssel ist erforderlich")
         
-        self.client = anthropic.Anthropic(api_key=self.api_key)
+        self.cache = get_cache()
+        self.rate_limiter = get_rate_limiter()
+        # Strukturierter Modus: Antwort als Werkzeugaufruf statt als JSON im Freitext
+        self.structured_output = structured_output_default() if structured_output is None else structured_output
+        # Vorab-Scan: Kontaktdaten zuerst direkt auf der Website suchen
+        self.scrape_first = scrape_first_default() if scrape_first is None else scrape_first
+        self.scraper = get_site_scraper()
+        # Nachfragen: teilweise gefüllte Ergebnisse gezielt um die fehlenden Felder ergänzen
+        self.auto_enrich = auto_enrich_default() if auto_enrich is None else auto_enrich
+        # Modellkaskade: günstiges Modell zuerst, nur unsichere Ergebnisse gehen an das nächste
+        self.model_chain = model_chain_default()
+        self.confidence_threshold = confidence_threshold_default()
+        self.model_stats = get_model_stats()
+        # Gleichzeitige Abfragen desselben Unternehmens teilen sich einen Modellaufruf
+        self.single_flight = get_single_flight()
+        # Unscharfe Suche: sehr ähnliche bekannte Namen direkt aus dem Cache, ähnliche als Hinweis an das Modell
+        self.fuzzy_threshold, self.fuzzy_hint_threshold = fuzzy_thresholds_default()
+        self.model_calls_avoided = 0
+        self.enriched = 0
+        self._lock = threading.Lock()
     
     def get_company_info(self, company_name):
+        # Zuerst im Cache nachsehen, erst danach das Modell befragen
+        cached, stale = self.cache.lookup(company_name)
+        if cached is not None:
+            if stale:
+                # Veralteten Eintrag sofort liefern und im Hintergrund erneuern
+                self._refresh_in_background(company_name, cached)
+            return cached
+
+        # Kein exakter Treffer: nach einem bekannten Unternehmen mit ähnlichem Namen suchen
+        hint = None
+        match = self.cache.fuzzy_lookup(company_name, min(self.fuzzy_threshold, self.fuzzy_hint_threshold))
+        if match is not None:
+            record, similarity, typo = match
+            # Direkt ausliefern nur, wenn sich die Namen bloß wie durch einen Tippfehler unterscheiden
+            if similarity >= self.fuzzy_threshold and typo:
+                return dict(record, name=company_name)
+            hint = record
+
+        # Läuft dieselbe Abfrage schon (z.B. aus einer anderen Liste), auf deren Ergebnis warten
+        result = self.single_flight.do(
+            self._flight_key(company_name, hint), lambda: self._resolve_company_info(company_name, hint=hint)
+        )
+        return dict(result)
+
+    def _flight_key(self, company_name, hint=None):
+        # Zusammengefasst wird nur mit gleichem API-Schlüssel und gleichen Optionen; so erhält niemand das
+        # Ergebnis oder den Fehler (z.B. ungültiger Schlüssel) eines anders konfigurierten Aufrufers
+        return (key_hash(self.api_key), self.structured_output, self.scrape_first, self.auto_enrich,
+                hint.get('name') if hint else None, normalize_company_name(company_name))
+
+    def _refresh_in_background(self, company_name, cached):
+        key = normalize_company_name(company_name)
+        with _refreshing_lock:
+            if key in _refreshing:
+                return
+            _refreshing.add(key)
+
+        def refresh():
+            try:
+                self.single_flight.do(self._flight_key(company_name),
+                                      lambda: self._resolve_company_info(company_name, refresh=True, known=cached))
+            except Exception as e:
+                print(f"Aktualisierung für {company_name} fehlgeschlagen: {e}")
+            finally:
+                with _refreshing_lock:
+                    _refreshing.discard(key)
+
+        _refresh_pool.submit(refresh)
+
+    def _resolve_company_info(self, company_name, refresh=False, hint=None, known=None):
+        # Bekannte Websites zuerst scannen: der bisherige Eintrag beim Erneuern, sonst der ähnliche aus dem Hinweis
+        websites = [record["website"] for record in (known, hint) if record and record.get("website")]
+        scraped = self.scraper.scrape(company_name, websites=websites) if self.scrape_first else None
+        if scraped and not missing_fields(scraped):
+            # Alles auf der Website gefunden, kein Modellaufruf nötig
+            with self._lock:
+                self.model_calls_avoided += 1
+            result = scraped
+        elif scraped:
+            # Teilweise gefunden: nur die fehlenden Felder mit dem kurzen Nachfrage-Prompt erfragen statt des vollen
+            # Prompts; die Werte von der Website bleiben dabei unverändert. Schlägt die Nachfrage fehl, bleibt es
+            # beim Teilergebnis der Website.
+            result = self._fill_missing_fields(dict(scraped))
+        else:
+            result = self._query_company_info(company_name, hint=hint)
+            if result is None:
+                # Fehlgeschlagene Anfragen werden nie gecacht, auch nicht negativ; der Aufrufer erfährt
+                # davon, statt ein leeres Ergebnis für endgültig zu halten
+                raise LookupFailedError(company_name)
+            if self.auto_enrich and is_partial(result):
+                result = self._fill_missing_fields(result)
+
+        # Beim Erneuern ersetzt eine leere Antwort keinen vorhandenen Eintrag
+        if not (refresh and is_empty_result(result)):
+            self.cache.set(company_name, result, negative=True)
+        return result
+
+    def enrich_company_info(self, record):
+        """Fragt nur die fehlenden Felder eines teilweise gefüllten Eintrags nach und ergänzt den Cache-Eintrag"""
+        company_name = record.get("name")
+        # Bekannte Werte aus Anfrage und Cache zusammenführen, die Anfrage hat Vorrang
+        cached = self.cache.lookup(company_name)[0] or {}
+        merged = {field: record.get(field) or cached.get(field) for field in ("phone", "email", "website")}
+        merged["name"] = company_name
+        if not missing_fields(merged):
+            return merged
+
+        merged = self._fill_missing_fields(merged)
+        self.cache.set(company_name, merged)
+        return merged
+
+    def _fill_missing_fields(self, record):
+        missing = missing_fields(record)
+        answer = self._query_missing_fields(record, missing)
+        merged = merge_fields(record, answer, missing)
+        if missing_fields(merged) != missing:
+            with self._lock:
+                self.enriched += 1
+        return merged
+
+    def _query_missing_fields(self, record, missing):
+        # Liefert ein Dict nur mit den nachgefragten Feldern, bei Fehlern ein leeres Dict
+        prompt = enrich_prompt(record, missing, self.structured_output)
+        kwargs = {}
+        if self.structured_output:
+            tool = partial_tool(missing)
+            kwargs = {"tools": [tool], "tool_choice": {"type": "tool", "name": tool["name"]}}
+
+        try:
+            response = self._create_message(
+                model=self.model_chain[0],
+                max_tokens=ENRICH_MAX_TOKENS,
+                temperature=0,
+                system="Du bist ein hilfreicher Assistent, der Unternehmensinformationen recherchiert.",
+                messages=[
+                    {"role": "user", "content": prompt}
+                ],
+                **kwargs
+            )
+            if self.structured_output:
+                answer = tool_input(response.content, kwargs["tool_choice"]["name"])
+            else:
+                answer = extract_json(response.content[0].text, dict)
+        except JsonExtractionError as e:
+            print(f"Nachfrage-Antwort für {record.get('name')} nicht lesbar ({e})")
+            return {}
+        except Exception as e:
+            print(f"Fehler bei der Nachfrage an Claude für {record.get('name')}: {e}")
+            return {}
+        return answer or {}
+
+    def _query_company_info(self, company_name, first_tier=0, hint=None):
+        """Fragt die Modelle der Kette nacheinander, bis ein Ergebnis sicher genug ist.
+
+        Liefert das Ergebnis mit dem höchsten Vertrauenswert oder None, wenn
+        keine Stufe eine lesbare Antwort geliefert hat. `hint` ist ein
+        Cache-Eintrag mit ähnlichem Namen, der dem Modell als Anhaltspunkt dient.
+        """
+        best, best_score = None, -1.0
+        for tier in range(first_tier, len(self.model_chain)):
+            model = self.model_chain[tier]
+            if self.structured_output:
+                result = self._query_company_info_structured(company_name, model, hint)
+            else:
+                result = self._query_company_info_model(company_name, model, hint)
+            score = confidence_score(result) if result is not None else -1.0
+            if score > best_score:
+                best, best_score = result, score
+            escalate = best_score < self.confidence_threshold and tier + 1 < len(self.model_chain)
+            self.model_stats.record_outcome(model, escalate)
+            if not escalate:
+                break
+        return best
+
+    def _query_company_info_model(self, company_name, model, hint=None):
+        # Liefert None, wenn die Anfrage fehlschlägt oder die Antwort nicht lesbar ist
         prompt = f"""
         Finde die folgenden Informationen für das Unternehmen "{company_name}":
         1. Telefonnummer (bevorzugt Festnetz, international formatiert)
         2. E-Mail-Adresse (bevorzugt allgemeine Kontakt-E-Mail)
         3. Website-URL (mit https://)
+        {hint_prompt(hint) if hint else ""}
 
         Gib die Informationen im folgenden JSON-Format zurück:
         {{
@@ -30,8 +275,8 @@ class ClaudeClient:
         """
         
         try:
-            response = self.client.messages.create(
-                model="claude-3-haiku-20240307",
+            response = self._create_message(
+                model=model,
                 max_tokens=1000,
                 temperature=0,
                 system="Du bist ein hilfreicher Assistent, der Unternehmensinformationen recherchiert und im JSON-Format zurückgibt.",
@@ -43,37 +288,203 @@ class ClaudeClient:
             # Extrahiere das JSON aus der Antwort
             content = response.content[0].text
             
-            # Bereinige die Antwort, falls sie nicht direkt als JSON formatiert ist
-            if "```json" in content:
-                json_str = content.split("```json")[1].split("```")[0].strip()
-            elif "```" in content:
-                json_str = content.split("```")[1].strip()
-            else:
-                json_str = content.strip()
-            
             # Versuche, das JSON zu parsen
             try:
-                result = json.loads(json_str)
-                # Stelle sicher, dass alle erforderlichen Felder vorhanden sind
-                result["name"] = result.get("name", company_name)
-                result["phone"] = result.get("phone")
-                result["email"] = result.get("email")
-                result["website"] = result.get("website")
-                return result
-            except json.JSONDecodeError:
-                # Fallback, wenn das JSON nicht geparst werden kann
-                return {
-                    "name": company_name,
-                    "phone": None,
-                    "email": None,
-                    "website": None
-                }
+                result = extract_json(content, dict)
+            except JsonExtractionError as e:
+                print(f"Antwort für {company_name} nicht lesbar ({e})")
+                return None
+            
+            # Stelle sicher, dass alle erforderlichen Felder vorhanden sind
+            result["name"] = result.get("name", company_name)
+            result["phone"] = result.get("phone")
+            result["email"] = result.get("email")
+            result["website"] = result.get("website")
+            return result
                 
         except Exception as e:
             print(f"Fehler bei der Anfrage an Claude für {company_name}: {e}")
-            return {
-                "name": company_name,
+            return None
+
+    def _query_company_info_structured(self, company_name, model, hint=None):
+        prompt = f"""
+        Finde die folgenden Informationen für das Unternehmen "{company_name}":
+        1. Telefonnummer (bevorzugt Festnetz, international formatiert)
+        2. E-Mail-Adresse (bevorzugt allgemeine Kontakt-E-Mail)
+        3. Website-URL (mit https://)
+        {hint_prompt(hint) if hint else ""}
+
+        Übergib die Informationen an das Werkzeug {COMPANY_INFO_TOOL["name"]}.
+        Wenn du eine Information nicht finden kannst, setze den Wert auf null.
+        """
+
+        try:
+            response = self._create_message(
+                model=model,
+                max_tokens=STRUCTURED_MAX_TOKENS,
+                temperature=0,
+                system="Du bist ein hilfreicher Assistent, der Unternehmensinformationen recherchiert.",
+                tools=[COMPANY_INFO_TOOL],
+                tool_choice=COMPANY_INFO_TOOL_CHOICE,
+                messages=[
+                    {"role": "user", "content": prompt}
+                ]
+            )
+            result = tool_input(response.content)
+        except Exception as e:
+            print(f"Fehler bei der Anfrage an Claude für {company_name}: {e}")
+            result = None
+
+        if result is None:
+            return None
+        return {
+            "name": result.get("name") or company_name,
+            "phone": result.get("phone"),
+            "email": result.get("email"),
+            "website": result.get("website")
+        }
+
+    def get_company_info_batch(self, company_names, max_retries=2):
+        """Fragt mehrere Unternehmen in einer Nachricht ab; fehlende oder fehlerhafte Einträge werden erneut angefragt.
+
+        Mehr als MAX_BATCH_SIZE Unternehmen werden auf mehrere Nachrichten verteilt.
+        """
+        results = [None] * len(company_names)
+        pending = []
+        for i, company_name in enumerate(company_names):
+            cached, stale = self.cache.lookup(company_name)
+            if cached is not None:
+                if stale:
+                    self._refresh_in_background(company_name, cached)
+                results[i] = cached
+            else:
+                pending.append(i)
+
+        for _ in range(max_retries + 1):
+            if not pending:
+                break
+            answers = {}
+            for start in range(0, len(pending), MAX_BATCH_SIZE):
+                chunk = self._query_company_batch([company_names[i] for i in pending[start:start + MAX_BATCH_SIZE]])
+                answers.update((start + position, result) for position, result in chunk.items())
+            still_pending = []
+            for position, i in enumerate(pending):
+                result = answers.get(position)
+                if result is None:
+                    still_pending.append(i)
+                    continue
+                result["name"] = result.get("name") or company_names[i]
+                # Unsichere Batch-Ergebnisse einzeln an die nächste Stufe der Kette geben
+                escalate = len(self.model_chain) > 1 and confidence_score(result) < self.confidence_threshold
+                self.model_stats.record_outcome(self.model_chain[0], escalate)
+                if escalate:
+                    escalated = self._query_company_info(company_names[i], first_tier=1)
+                    if escalated is not None and confidence_score(escalated) > confidence_score(result):
+                        result = escalated
+                if self.auto_enrich and is_partial(result):
+                    result = self._fill_missing_fields(result)
+                self.cache.set(company_names[i], result, negative=True)
+                results[i] = result
+            pending = still_pending
+
+        for i in pending:
+            print(f"Keine gültige Antwort im Batch für {company_names[i]}")
+            results[i] = {
+                "name": company_names[i],
                 "phone": None,
                 "email": None,
                 "website": None
-            } 
\ No newline at end of file
+            }
+        return results
+
+    def _create_message(self, **kwargs):
+        # Vorübergehende Fehler mit Backoff wiederholen, bei Ausfall über den Circuit-Breaker sofort abbrechen
+        return retry_call(lambda: self._send_message(**kwargs), _is_retryable_unthrottled)
+
+    def _send_message(self, **kwargs):
+        # Grobe Schätzung: etwa 3 Zeichen pro Token plus die maximale Antwortlänge
+        text = kwargs.get("system", "") + "".join(message["content"] for message in kwargs["messages"])
+        reserved = len(text) // 3 + kwargs["max_tokens"]
+
+        for attempt in range(MAX_THROTTLE_RETRIES + 1):
+            self.rate_limiter.acquire(reserved)
+            started = time.monotonic()
+            try:
+                with anthropic_client(self.api_key) as client:
+                    response = client.messages.create(**kwargs)
+            except anthropic.APIStatusError as e:
+                if e.status_code not in THROTTLE_STATUS_CODES or attempt == MAX_THROTTLE_RETRIES:
+                    raise
+                # Gedrosselt: alle Threads bremsen und die Anfrage erneut einreihen
+                self.rate_limiter.throttle(parse_retry_after(e.response.headers))
+                continue
+
+            self.rate_limiter.record_usage(reserved, response.usage.input_tokens + response.usage.output_tokens)
+            self.model_stats.record_call(kwargs["model"], time.monotonic() - started, response.usage)
+            return response
+
+    def _query_company_batch(self, company_names):
+        # Liefert ein Dict {Index: Ergebnis} nur für die gültigen Einträge der Antwort
+        company_list = "\n".join(f"{i}: {name}" for i, name in enumerate(company_names))
+        prompt = f"""
+        Finde für jedes der folgenden Unternehmen (Index: Name) die folgenden Informationen:
+        1. Telefonnummer (bevorzugt Festnetz, international formatiert)
+        2. E-Mail-Adresse (bevorzugt allgemeine Kontakt-E-Mail)
+        3. Website-URL (mit https://)
+
+        {company_list}
+
+        Gib die Informationen als JSON-Array mit genau einem Objekt pro Unternehmen zurück:
+        [
+            {{
+                "index": 0,
+                "name": "Unternehmensname",
+                "phone": "Telefonnummer oder null",
+                "email": "E-Mail-Adresse oder null",
+                "website": "Website-URL oder null"
+            }}
+        ]
+
+        Verwende für "index" den Index aus der Liste oben.
+        Wenn du eine Information nicht finden kannst, setze den Wert auf null.
+        Gib NUR das JSON-Array zurück, keine Erklärungen oder zusätzlichen Text.
+        """
+
+        try:
+            response = self._create_message(
+                model=self.model_chain[0],
+                max_tokens=min(BATCH_MAX_TOKENS, BATCH_BASE_TOKENS + BATCH_TOKENS_PER_COMPANY * len(company_names)),
+                temperature=0,
+                system="Du bist ein hilfreicher Assistent, der Unternehmensinformationen recherchiert und im JSON-Format zurückgibt.",
+                messages=[
+                    {"role": "user", "content": prompt}
+                ]
+            )
+            content = response.content[0].text
+        except Exception as e:
+            print(f"Fehler bei der Batch-Anfrage an Claude ({len(company_names)} Unternehmen): {e}")
+            return {}
+
+        try:
+            # Ist das Array abgeschnitten, zählen die vollständigen Einträge; nur der Rest wird erneut angefragt
+            items = extract_json_items(content)
+        except JsonExtractionError as e:
+            print(f"Batch-Antwort nicht lesbar ({e})")
+            return {}
+
+        answers = {}
+        for item in items:
+            if not isinstance(item, dict):
+                continue
+            index = item.get("index")
+            if not isinstance(index, int) or not 0 <= index < len(company_names):
+                continue
+            if any(not isinstance(item.get(field), (str, type(None))) for field in ("name", "phone", "email", "website")):
+                continue
+            answers[index] = {
+                "name": item.get("name"),
+                "phone": item.get("phone"),
+                "email": item.get("email"),
+                "website": item.get("website")
+            }
+        return answers
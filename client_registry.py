@@ -0,0 +1,108 @@
+import collections
+import contextlib
+import hashlib
+import os
+import threading
+import time
+
+# Standardwerte, überschreibbar über Umgebungsvariablen
+DEFAULT_MAX_CLIENTS = 32
+DEFAULT_IDLE_TIMEOUT = 300.0
+DEFAULT_POOL_SIZE = 10
+
+HTTP_POOL_SIZE = int(os.environ.get('HTTP_POOL_SIZE', DEFAULT_POOL_SIZE))
+
+
+def key_hash(api_key):
+    """Der API-Schlüssel selbst wird nie als Schlüssel gespeichert, nur sein Hash"""
+    return hashlib.sha256(api_key.encode('utf-8')).hexdigest()
+
+
+class _Entry:
+    __slots__ = ('client', 'last_used', 'users', 'retired')
+
+    def __init__(self, client, last_used):
+        self.client = client
+        self.last_used = last_used
+        self.users = 0
+        self.retired = False
+
+
+class ClientRegistry:
+    """Hält langlebige HTTP-Clients je API-Schlüssel, damit Verbindungen wiederverwendet werden.
+
+    Clients werden nur über lease() ausgeliehen. Ein verdrängter Client wird erst
+    geschlossen, wenn ihn niemand mehr benutzt, laufende Anfragen brechen also nie ab.
+    """
+
+    def __init__(self, factory, close=None, max_clients=None, idle_timeout=None):
+        self.factory = factory
+        self.close = close or (lambda client: client.close())
+        self.max_clients = max_clients or int(os.environ.get('CLIENT_REGISTRY_SIZE', DEFAULT_MAX_CLIENTS))
+        self.idle_timeout = idle_timeout or float(os.environ.get('CLIENT_IDLE_TIMEOUT', DEFAULT_IDLE_TIMEOUT))
+        self.created = 0
+        self.reused = 0
+        self.evicted = 0
+        self._clients = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def lease(self, api_key):
+        """Leiht den Client für den Schlüssel für die Dauer des with-Blocks aus und legt ihn bei Bedarf an"""
+        key = key_hash(api_key)
+        now = time.monotonic()
+        expired = []
+
+        with self._lock:
+            entry = self._clients.pop(key, None)
+            if entry is not None:
+                self.reused += 1
+            else:
+                entry = _Entry(self.factory(api_key), now)
+                self.created += 1
+            entry.last_used = now
+            entry.users += 1
+            self._clients[key] = entry
+
+            # Lange ungenutzte und über dem Limit liegende Clients entfernen (älteste zuerst)
+            while self._clients:
+                oldest_key, oldest = next(iter(self._clients.items()))
+                if oldest_key == key or (len(self._clients) <= self.max_clients and now - oldest.last_used < self.idle_timeout):
+                    break
+                del self._clients[oldest_key]
+                self.evicted += 1
+                # Noch ausgeliehene Clients schließt erst der letzte Nutzer
+                oldest.retired = True
+                if not oldest.users:
+                    expired.append(oldest.client)
+
+        self._close_all(expired)
+        try:
+            yield entry.client
+        finally:
+            with self._lock:
+                entry.users -= 1
+                entry.last_used = time.monotonic()
+                close = entry.retired and not entry.users
+            if close:
+                self._close_all([entry.client])
+
+    def _close_all(self, clients):
+        for client in clients:
+            try:
+                self.close(client)
+            except Exception as e:
+                print(f"Fehler beim Schließen eines HTTP-Clients: {e}")
+
+    def stats(self):
+        """Liefert Anzahl und Wiederverwendung der gehaltenen Clients"""
+        with self._lock:
+            return {
+                'clients': len(self._clients),
+                'in_use': sum(entry.users for entry in self._clients.values()),
+                'created': self.created,
+                'reused': self.reused,
+                'evicted': self.evicted,
+                'max_clients': self.max_clients,
+                'idle_timeout': self.idle_timeout
+            }
@@ -0,0 +1,239 @@
+import csv
+import json
+import posixpath
+import re
+import zipfile
+import zlib
+from xml.etree.ElementTree import ParseError, XMLPullParser, fromstring
+
+# Spaltenüberschriften, die als Spalte mit dem Unternehmensnamen erkannt werden (in dieser Reihenfolge)
+NAME_COLUMNS = (
+    'company', 'company name', 'companyname', 'company_name', 'unternehmen', 'unternehmensname',
+    'firma', 'firmenname', 'organisation', 'organization', 'name'
+)
+
+# Trennzeichen, zwischen denen anhand der ersten Zeile gewählt wird (Excel speichert in DE mit ";")
+CSV_DELIMITERS = (',', ';', '\t')
+
+
+def find_name_column(header, column=None):
+    """Index der Namensspalte in einer Kopfzeile oder None, wenn keine erkannt wird"""
+    normalized = [str(cell or '').strip().casefold() for cell in header]
+    for candidate in ([column.strip().casefold()] if column else NAME_COLUMNS):
+        if candidate in normalized:
+            return normalized.index(candidate)
+    return None
+
+
+def sniff_delimiter(line):
+    counts = {delimiter: line.count(delimiter) for delimiter in CSV_DELIMITERS}
+    delimiter = max(counts, key=counts.get)
+    return delimiter if counts[delimiter] else ','
+
+
+def iter_csv_companies(lines, column=None, numbered=False):
+    """Liefert die Unternehmensnamen aus CSV-Zeilen, ohne die Datei ganz einzulesen.
+
+    Wird in der ersten Zeile eine Namensspalte erkannt, gilt sie als Kopfzeile,
+    sonst wird die erste Spalte verwendet. Leere Namen werden übersprungen;
+    mit `numbered` kommt jeder Name als (Datensatznummer, Name), gezählt ab 0
+    ohne Kopfzeile und einschließlich übersprungener Zeilen.
+    """
+    lines = iter(lines)
+    first = next(lines, None)
+    if first is None:
+        return
+    yield from _iter_names(_csv_rows(csv.reader(_prepend(first, lines), delimiter=sniff_delimiter(first))), column, numbered)
+
+
+def _csv_rows(reader):
+    # Fehler des CSV-Moduls (z.B. Feld über dem Größenlimit) als ValueError wie alle anderen Lesefehler
+    try:
+        yield from reader
+    except csv.Error as e:
+        raise ValueError(f"CSV-Zeile {reader.line_num} nicht lesbar ({e})")
+
+
+def _iter_names(rows, column, numbered=False):
+    # Erste Zeile als Kopfzeile, wenn darin eine Namensspalte erkannt wird, sonst erste Spalte
+    rows = iter(rows)
+    first = next(rows, None)
+    if first is None:
+        return
+    index = find_name_column(first, column)
+    if index is None:
+        if column:
+            raise ValueError(f"Spalte '{column}' nicht in der Kopfzeile gefunden")
+        index = 0
+        rows = _prepend(first, rows)
+
+    for number, row in enumerate(rows):
+        name = str(row[index] or '').strip() if index < len(row) else ''
+        if name:
+            yield (number, name) if numbered else name
+
+
+def iter_jsonl_companies(lines, column=None, numbered=False):
+    """Liefert die Unternehmensnamen aus JSONL-Zeilen: je Zeile ein String oder ein Objekt mit Namensfeld.
+
+    Mit `numbered` kommt jeder Name als (Zeilennummer ab 0, Name).
+    """
+    for number, line in enumerate(lines):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            raise ValueError(f"Zeile {number + 1} ist kein gültiges JSON ({e})")
+        if isinstance(row, dict):
+            index = find_name_column(list(row), column)
+            row = list(row.values())[index] if index is not None else None
+        name = row.strip() if isinstance(row, str) else ''
+        if name:
+            yield (number, name) if numbered else name
+
+
+def _prepend(first, lines):
+    yield first
+    yield from lines
+
+
+_SPREADSHEET_NS = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+_RELATIONSHIP_NS = '{http://schemas.openxmlformats.org/officeDocument/2006/relationships}'
+_CELL_REFERENCE = re.compile(r'[A-Z]+')
+# Letzte Spalte einer Excel-Tabelle (XFD); größere Zellreferenzen gelten als beschädigte Datei
+XLSX_MAX_COLUMNS = 16384
+# Obergrenze für die Zeichen aller gemeinsamen Strings, die vollständig im Speicher liegen
+XLSX_MAX_SHARED_CHARS = 32 * 1024 * 1024
+# Bytes, die pro Schritt aus der gepackten Tabelle gelesen werden
+XLSX_READ_SIZE = 64 * 1024
+
+
+def is_xlsx(head):
+    """Prüft anhand der ersten Bytes, ob es sich um eine Zip-Datei (XLSX) handelt"""
+    return head.startswith(b'PK\x03\x04')
+
+
+def _first_sheet_path(archive):
+    # Pfad der ersten Tabelle laut Arbeitsmappe; ältere Exporte nennen sie einfach sheet1.xml
+    try:
+        workbook = fromstring(archive.read('xl/workbook.xml'))
+        relations = fromstring(archive.read('xl/_rels/workbook.xml.rels'))
+        sheet = workbook.find(f'{_SPREADSHEET_NS}sheets/{_SPREADSHEET_NS}sheet')
+        target = next(
+            relation.get('Target') for relation in relations
+            if relation.get('Id') == sheet.get(f'{_RELATIONSHIP_NS}id')
+        )
+    except (KeyError, AttributeError, StopIteration):
+        return 'xl/worksheets/sheet1.xml'
+    except ParseError as e:
+        raise ValueError(f"XLSX-Arbeitsmappe nicht lesbar ({e})")
+    return target.lstrip('/') if target.startswith('/') else posixpath.normpath(posixpath.join('xl', target))
+
+
+def _iter_elements(stream, tag):
+    # Liefert alle Elemente `tag` eines XML-Stroms und gibt sie danach wieder frei, damit der Baum nicht wächst
+    parser = XMLPullParser(('start', 'end'))
+    parents = []
+    while True:
+        data = stream.read(XLSX_READ_SIZE)
+        try:
+            if data:
+                parser.feed(data)
+            else:
+                parser.close()
+            events = list(parser.read_events())
+        except ParseError as e:
+            raise ValueError(f"XLSX-Tabelle nicht lesbar ({e})")
+        for event, element in events:
+            if event == 'start':
+                parents.append(element)
+                continue
+            parents.pop()
+            if element.tag == tag:
+                yield element
+                if parents:
+                    parents[-1].remove(element)
+        if not data:
+            return
+
+
+def _text(element):
+    return ''.join(node.text or '' for node in element.iter(f'{_SPREADSHEET_NS}t'))
+
+
+def _column_index(reference):
+    # None bei fehlender oder ungültiger Zellreferenz, ValueError jenseits von Spalte XFD
+    match = _CELL_REFERENCE.match(reference or '')
+    if match is None:
+        return None
+    index = 0
+    for char in match.group():
+        index = index * 26 + ord(char) - ord('A') + 1
+        if index > XLSX_MAX_COLUMNS:
+            raise ValueError(f"Zellreferenz {reference[:16]} liegt außerhalb der Tabelle")
+    return index - 1
+
+
+def _read_shared_strings(stream):
+    # Die Zellen verweisen per Index beliebig auf die Tabelle, daher liegt sie ganz im Speicher – aber begrenzt
+    shared = []
+    size = 0
+    for item in _iter_elements(stream, f'{_SPREADSHEET_NS}si'):
+        text = _text(item)
+        size += len(text)
+        if size > XLSX_MAX_SHARED_CHARS:
+            raise ValueError("Die gemeinsamen Strings der XLSX-Datei sind zu groß")
+        shared.append(text)
+    return shared
+
+
+def iter_xlsx_rows(file):
+    """Liefert die Zeilen der ersten Tabelle einer XLSX-Datei als Listen von Strings.
+
+    `file` muss durchsuchbar sein (Zip-Verzeichnis am Dateiende). Die Tabelle
+    wird als XML-Strom gelesen; im Speicher liegen nur die aktuelle Zeile und
+    die gemeinsamen Strings der Arbeitsmappe. Diese werden vorab vollständig
+    geladen (auch die anderer Tabellen) und sind auf XLSX_MAX_SHARED_CHARS
+    Zeichen begrenzt. Beschädigte Dateien, Zellreferenzen jenseits von Spalte
+    XFD und größere String-Tabellen ergeben einen ValueError.
+    """
+    try:
+        yield from _iter_xlsx_rows(file)
+    except (zipfile.BadZipFile, zlib.error, EOFError) as e:
+        # Beschädigter oder abgeschnittener Eintrag im Zip-Archiv, auch erst mitten im Lesen
+        raise ValueError(f"Keine gültige XLSX-Datei ({e})")
+
+
+def _iter_xlsx_rows(file):
+    with zipfile.ZipFile(file) as archive:
+        shared = []
+        if 'xl/sharedStrings.xml' in archive.namelist():
+            with archive.open('xl/sharedStrings.xml') as stream:
+                shared = _read_shared_strings(stream)
+
+        try:
+            stream = archive.open(_first_sheet_path(archive))
+        except KeyError:
+            raise ValueError("Die XLSX-Datei enthält keine Tabelle")
+        with stream:
+            for row in _iter_elements(stream, f'{_SPREADSHEET_NS}row'):
+                values = []
+                for position, cell in enumerate(row.iter(f'{_SPREADSHEET_NS}c')):
+                    index = _column_index(cell.get('r'))
+                    if index is None:
+                        index = position
+                    cell_type = cell.get('t')
+                    if cell_type == 'inlineStr':
+                        value = _text(cell)
+                    else:
+                        raw = cell.findtext(f'{_SPREADSHEET_NS}v') or ''
+                        value = shared[int(raw)] if cell_type == 's' and raw.isdigit() and int(raw) < len(shared) else raw
+                    values.extend([''] * (index + 1 - len(values)))
+                    values[index] = value
+                yield values
+
+
+def iter_xlsx_companies(file, column=None):
+    """Liefert die Unternehmensnamen aus der ersten Tabelle einer XLSX-Datei (Kopfzeile wie bei CSV)"""
+    yield from _iter_names(iter_xlsx_rows(file), column)
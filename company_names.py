@@ -0,0 +1,70 @@
+import hashlib
+import re
+import unicodedata
+
+# Rechtsformen, die beim Vergleich von Unternehmensnamen ignoriert werden
+LEGAL_FORMS = {
+    'ab', 'ag', 'as', 'bv', 'co', 'company', 'corp', 'corporation', 'cv', 'eg', 'ev',
+    'gbr', 'gmbh', 'group', 'haftungsbeschrankt', 'inc', 'incorporated', 'kg', 'kgaa',
+    'limited', 'llc', 'llp', 'lp', 'ltd', 'mbh', 'nv', 'ohg', 'oy', 'plc', 'pte', 'pty',
+    'sa', 'sarl', 'sas', 'se', 'spa', 'srl', 'ug'
+}
+
+_PUNCTUATION = re.compile(r'[^\w\s]')
+_WHITESPACE = re.compile(r'\s+')
+
+
+def normalize_company_name(company_name):
+    """Normalisiert einen Unternehmensnamen für Vergleiche (Groß-/Kleinschreibung, Satzzeichen, Rechtsform)"""
+    text = unicodedata.normalize('NFKD', company_name or '')
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    # Punkte in Abkürzungen (z.B. "Co.", "S.A.") zusammenziehen, übrige Satzzeichen trennen
+    text = text.casefold().replace('.', '')
+    text = _PUNCTUATION.sub(' ', text)
+    words = _WHITESPACE.sub(' ', text).strip().split(' ')
+
+    # Rechtsformen am Ende entfernen, aber nie den ganzen Namen
+    while len(words) > 1 and words[-1] in LEGAL_FORMS:
+        words.pop()
+
+    return ' '.join(words)
+
+
+def dedupe_companies(companies):
+    """Fasst gleichwertige Namen zusammen.
+
+    Liefert die Liste der eindeutigen Namen (jeweils das erste Vorkommen) und
+    für jede Eingabezeile den Index des zugehörigen eindeutigen Namens.
+    """
+    unique = []
+    positions = {}
+    mapping = []
+
+    for company in companies:
+        key = normalize_company_name(company)
+        if key not in positions:
+            positions[key] = len(unique)
+            unique.append(company)
+        mapping.append(positions[key])
+
+    return unique, mapping
+
+
+class CompanyDeduper:
+    """Filtert gleichwertige Namen aus einem Strom von Namen heraus; das erste Vorkommen bleibt erhalten"""
+
+    def __init__(self):
+        self._seen = set()
+        self.duplicates = 0
+
+    def filter(self, companies):
+        for company in companies:
+            # Gemerkt werden nur 16 Byte BLAKE2b des normalisierten Namens statt des Namens selbst. Anders als
+            # hash() ist das in jedem Prozess gleich; eine Kollision (und damit ein fälschlich übersprungener
+            # Name) ist bei 128 Bit auch für Millionen Zeilen praktisch ausgeschlossen
+            key = hashlib.blake2b(normalize_company_name(company).encode('utf-8'), digest_size=16).digest()
+            if key in self._seen:
+                self.duplicates += 1
+                continue
+            self._seen.add(key)
+            yield company
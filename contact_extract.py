@@ -0,0 +1,190 @@
+import html
+import re
+from urllib.parse import unquote, urljoin, urlparse
+from company_names import normalize_company_name
+
+# Alle Muster arbeiten direkt auf den Bytes der Antwort, ohne DOM-Baum
+TEL_HREF = re.compile(rb'href\s*=\s*["\']tel:([^"\']+)', re.IGNORECASE)
+MAILTO_HREF = re.compile(rb'href\s*=\s*["\']mailto:([^"\'?]+)', re.IGNORECASE)
+LINK = re.compile(rb'<a\s[^>]*?href\s*=\s*["\']([^"\'#]*)[^>]*>([^<]{0,80})', re.IGNORECASE)
+# Inhalt von Skripten, Styles und Kommentaren ist kein sichtbarer Text; solche Blöcke
+# können über mehrere Blöcke der Antwort reichen, das Ende wird deshalb gesucht
+NON_TEXT_START = re.compile(rb'<(script|style|noscript)\b[^>]*>|<!--', re.IGNORECASE)
+NON_TEXT_END = {
+    b'script': re.compile(rb'</script\s*>', re.IGNORECASE),
+    b'style': re.compile(rb'</style\s*>', re.IGNORECASE),
+    b'noscript': re.compile(rb'</noscript\s*>', re.IGNORECASE),
+    None: re.compile(rb'-->')
+}
+TAG = re.compile(rb'<[^>]*>')
+
+CONTACT_LINK_PATTERN = re.compile(r'kontakt|contact|impressum|imprint', re.IGNORECASE)
+# Telefonnummern: erst Ziffernfolgen finden, dann das Label direkt davor prüfen;
+# das ist deutlich schneller als ein Muster, das an jeder Textposition ein Label probiert
+PHONE_CANDIDATE = re.compile(r'(?<![\w+])\+?\(?\d[\d\s()./-]{6,}\d')
+PHONE_LABEL = re.compile(r'(?:tel(?:efon)?|phone|fon|call us)\.?\s*:?\s*$', re.IGNORECASE)
+EMAIL = re.compile(r'(?<![\w.+-])[\w.+-]+@[\w-]+(?:\.[\w-]+)*\.[a-z]{2,}', re.IGNORECASE)
+# Verschleierte Adressen wie "info [at] firma [dot] de" oder "info(at)firma.de";
+# das volle Muster läuft nur in einem Fenster um die Markierung
+OBFUSCATION_MARKER = re.compile(r'[\[({]\s*(?:at|ät|@)\s*[\])}]', re.IGNORECASE)
+OBFUSCATED_EMAIL = re.compile(
+    r'([\w.+-]+)\s*[\[({]\s*(?:at|ät|@)\s*[\])}]\s*([\w-]+(?:\s*(?:[\[({]\s*(?:dot|punkt)\s*[\])}]|\.)\s*[\w-]+)+)',
+    re.IGNORECASE)
+OBFUSCATED_DOT = re.compile(r'\s*(?:[\[({]\s*(?:dot|punkt)\s*[\])}]|\.)\s*', re.IGNORECASE)
+
+# Ein angefangenes Tag wird höchstens so lange bis zum nächsten Block aufgehoben
+MAX_TAIL_BYTES = 16 * 1024
+MAX_CONTACT_LINKS = 10
+
+# Rangfolge der Fundstellen: Links sind eindeutig, freie Nummern im Text nur ein Hinweis
+STRONG = 2
+WEAK = 1
+
+
+class ContactExtractor:
+    """Sucht Telefonnummer, E-Mail und Kontaktlinks, während die Seite blockweise eintrifft.
+
+    Jeder Block wird nur bis zum letzten vollständigen Tag gescannt, der Rest
+    wartet auf den nächsten Block. `feed` liefert True, sobald beide Felder aus
+    eindeutigen Quellen stammen und (falls angegeben) der Name gefunden wurde;
+    der Aufrufer kann den Download dann abbrechen.
+    """
+
+    def __init__(self, name_token=None):
+        self.name_token = name_token or None
+        self.name_found = self.name_token is None
+        self.phone = None
+        self.email = None
+        self.phone_rank = 0
+        self.email_rank = 0
+        self.links = []
+        self.bytes_scanned = 0
+        self._tail = b''
+        self._encoding = 'utf-8'
+        # Ende des Skript-, Style- oder Kommentarblocks, in dem der letzte Block aufgehört hat
+        self._skip_until = None
+
+    @property
+    def done(self):
+        return self.phone_rank == STRONG and self.email_rank == STRONG and self.name_found
+
+    def feed(self, chunk, encoding=None):
+        if encoding:
+            self._encoding = encoding
+        buffer = self._tail + chunk
+        cut = buffer.rfind(b'>') + 1
+        if cut == 0 and len(buffer) < MAX_TAIL_BYTES:
+            self._tail = buffer
+            return False
+        if cut == 0:
+            cut = len(buffer)
+        self._tail = buffer[cut:]
+        self._scan(buffer[:cut])
+        return self.done
+
+    def close(self):
+        if self._tail:
+            self._scan(self._tail)
+            self._tail = b''
+        return self.done
+
+    def _set_phone(self, value, rank):
+        if value and rank > self.phone_rank:
+            self.phone, self.phone_rank = value, rank
+
+    def _set_email(self, value, rank):
+        if value and rank > self.email_rank:
+            self.email, self.email_rank = value, rank
+
+    def _scan(self, segment):
+        self.bytes_scanned += len(segment)
+        if self.phone_rank < STRONG:
+            match = TEL_HREF.search(segment)
+            if match:
+                self._set_phone(unquote(match.group(1).decode(self._encoding, errors='replace')).strip(), STRONG)
+        if self.email_rank < STRONG:
+            match = MAILTO_HREF.search(segment)
+            if match:
+                self._set_email(unquote(match.group(1).decode(self._encoding, errors='replace')).strip(), STRONG)
+
+        if len(self.links) < MAX_CONTACT_LINKS:
+            for match in LINK.finditer(segment):
+                href = html.unescape(match.group(1).decode(self._encoding, errors='replace')).strip()
+                label = match.group(2).decode(self._encoding, errors='replace')
+                if (CONTACT_LINK_PATTERN.search(href) or CONTACT_LINK_PATTERN.search(label)) and href not in self.links:
+                    self.links.append(href)
+
+        if self.done:
+            return
+        # Sichtbarer Text nur, wenn noch etwas fehlt: Name, freie Nummern, (verschleierte) Adressen
+        text = html.unescape(TAG.sub(b' ', self._visible(segment)).decode(self._encoding, errors='replace'))
+        if not self.name_found:
+            # Reiner ASCII-Text braucht keine Unicode-Normalisierung
+            folded = text.lower().replace('.', '') if text.isascii() else normalize_company_name(text)
+            self.name_found = self.name_token in folded
+        if self.phone_rank < STRONG:
+            for match in PHONE_CANDIDATE.finditer(text):
+                if PHONE_LABEL.search(text, max(0, match.start() - 16), match.start()):
+                    self._set_phone(match.group(0).strip(), STRONG)
+                    break
+                if match.group(0).startswith('+'):
+                    self._set_phone(match.group(0).strip(), WEAK)
+        if self.email_rank < STRONG and '@' in text:
+            match = EMAIL.search(text)
+            if match:
+                self._set_email(match.group(0), STRONG)
+        if self.email_rank < STRONG:
+            marker = OBFUSCATION_MARKER.search(text)
+            if marker:
+                match = OBFUSCATED_EMAIL.search(text, max(0, marker.start() - 64), marker.end() + 128)
+                if match:
+                    self._set_email(f"{match.group(1)}@{OBFUSCATED_DOT.sub('.', match.group(2))}", STRONG)
+
+    def _visible(self, segment):
+        # Entfernt Skripte, Styles und Kommentare; ein offener Block wird im nächsten Segment fortgesetzt
+        parts = []
+        position = 0
+        while True:
+            if self._skip_until is not None:
+                end = self._skip_until.search(segment, position)
+                if not end:
+                    break
+                self._skip_until = None
+                position = end.end()
+            start = NON_TEXT_START.search(segment, position)
+            if not start:
+                parts.append(segment[position:])
+                break
+            parts.append(segment[position:start.start()])
+            self._skip_until = NON_TEXT_END[start.group(1) and start.group(1).lower()]
+            position = start.end()
+        return b' '.join(parts)
+
+    def result(self, base_url):
+        """Gefundene Werte; Kontaktlinks absolut und auf denselben Host beschränkt"""
+        host = urlparse(base_url).netloc
+        contact_links = []
+        for href in self.links:
+            url = urljoin(base_url, href)
+            if urlparse(url).netloc == host and url not in contact_links:
+                contact_links.append(url)
+        return {
+            'phone': self.phone,
+            'email': self.email,
+            'contact_links': contact_links,
+            'name_found': self.name_found,
+            'base_url': base_url
+        }
+
+
+def extract_contacts(page_html, base_url, name_token=None, chunk_size=16384):
+    """Extrahiert Kontaktdaten aus einer vollständigen Seite (str oder bytes), mit frühem Abbruch"""
+    data = page_html.encode('utf-8') if isinstance(page_html, str) else page_html
+    extractor = ContactExtractor(name_token)
+    for start in range(0, len(data), chunk_size):
+        if extractor.feed(data[start:start + chunk_size]):
+            break
+    else:
+        extractor.close()
+    return extractor.result(base_url)
+
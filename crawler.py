@@ -0,0 +1,322 @@
+import asyncio
+import collections
+import concurrent.futures
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+import urllib.robotparser
+from urllib.parse import urljoin, urlparse
+import httpx
+
+# Standardwerte, überschreibbar über Umgebungsvariablen
+DEFAULT_MAX_CONNECTIONS = 10
+DEFAULT_PER_HOST = 2
+DEFAULT_HOST_DELAY = 1.0
+DEFAULT_MAX_BYTES = 512 * 1024
+DEFAULT_TIMEOUT = 8.0
+DEFAULT_CACHE_DIR = os.path.join(tempfile.gettempdir(), 'company_crawler_cache')
+# Höchstzahl gemerkter Hosts (robots.txt, Pausen); die am längsten ungenutzten werden zuerst vergessen
+DEFAULT_MAX_HOSTS = 1024
+# Threads, in denen `on_chunk` die Blöcke auswertet, damit der Eventloop weiter Antworten annimmt
+DEFAULT_PARSE_THREADS = 4
+
+USER_AGENT = 'Company-ContactInfo-Finder'
+# Weiterleitungen folgt der Crawler selbst, damit auch das Ziel robots.txt und Host-Limits unterliegt
+MAX_REDIRECTS = 5
+ROBOTS_TTL = 24 * 60 * 60
+# War robots.txt nicht erreichbar (5xx, Netzwerkfehler), gilt der Host so lange als gesperrt (RFC 9309, 2.3.1.4)
+ROBOTS_ERROR_TTL = 10 * 60
+
+
+class Page:
+    def __init__(self, url, status, text, content_type='', from_cache=False, complete=True):
+        self.url = url
+        self.status = status
+        self.text = text
+        self.content_type = content_type
+        self.from_cache = from_cache
+        self.complete = complete
+
+
+class PageCache:
+    """Seiten auf der Platte, mit ETag/Last-Modified für bedingte Anfragen"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, url):
+        return os.path.join(self.directory, hashlib.sha256(url.encode('utf-8')).hexdigest() + '.json')
+
+    def get(self, url):
+        try:
+            with open(self._path(url), encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def set(self, url, final_url, text, etag, last_modified):
+        entry = {'url': final_url, 'text': text, 'etag': etag, 'last_modified': last_modified, 'fetched_at': time.time()}
+        # Erst in eine temporäre Datei schreiben, damit parallele Leser nie halbe Einträge sehen
+        path = self._path(url)
+        with open(path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(entry, f)
+        os.replace(path + '.tmp', path)
+
+
+class HostState:
+    def __init__(self, concurrency):
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.lock = asyncio.Lock()
+        self.robots_lock = asyncio.Lock()
+        self.last_request = 0.0
+        self.robots = None
+        self.robots_expires_at = 0.0
+        # Laufende Abrufe; nur unbenutzte Hosts werden verdrängt
+        self.users = 0
+
+
+class Crawler:
+    """Höflicher, nebenläufiger Crawler für Kontaktseiten.
+
+    Begrenzt Verbindungen global und je Host, hält zwischen Anfragen an denselben
+    Host eine Pause ein, beachtet robots.txt, kappt Antworten bei `max_bytes` und
+    revalidiert gecachte Seiten mit bedingten GETs.
+    """
+
+    def __init__(self, max_connections=DEFAULT_MAX_CONNECTIONS, per_host=DEFAULT_PER_HOST, host_delay=DEFAULT_HOST_DELAY,
+                 max_bytes=DEFAULT_MAX_BYTES, timeout=DEFAULT_TIMEOUT, cache_dir=DEFAULT_CACHE_DIR,
+                 max_hosts=DEFAULT_MAX_HOSTS, robots_error_ttl=ROBOTS_ERROR_TTL, parse_threads=DEFAULT_PARSE_THREADS):
+        self.max_connections = max_connections
+        self.max_hosts = max_hosts
+        self.robots_error_ttl = robots_error_ttl
+        self.per_host = per_host
+        self.host_delay = host_delay
+        self.max_bytes = max_bytes
+        self.timeout = timeout
+        self.cache = PageCache(cache_dir)
+        self.stats_counters = {'fetched': 0, 'not_modified': 0, 'robots_blocked': 0, 'truncated': 0,
+                               'stopped_early': 0, 'redirects': 0, 'errors': 0}
+        # Nur im Eventloop-Thread benutzt, daher ohne Lock
+        self._hosts = collections.OrderedDict()
+        self._client = None
+        self._connections = None
+        self._parser = concurrent.futures.ThreadPoolExecutor(max_workers=parse_threads, thread_name_prefix='crawler-parse')
+
+    def _ensure_client(self):
+        # Client und Semaphore gehören zum Eventloop, in dem sie zuerst benutzt werden
+        if self._client is None:
+            limits = httpx.Limits(max_connections=self.max_connections, max_keepalive_connections=self.max_connections)
+            self._client = httpx.AsyncClient(limits=limits, timeout=self.timeout, follow_redirects=False,
+                                             headers={'User-Agent': USER_AGENT})
+            self._connections = asyncio.Semaphore(self.max_connections)
+
+    def _host(self, url):
+        host = urlparse(url).netloc
+        state = self._hosts.get(host)
+        if state is None:
+            state = self._hosts[host] = HostState(self.per_host)
+            self._evict_hosts()
+        else:
+            self._hosts.move_to_end(host)
+        return state
+
+    def _evict_hosts(self):
+        # Am längsten ungenutzte Hosts vergessen (der eben angelegte steht am Ende); gerade benutzte
+        # bleiben, auch wenn das Limit dann kurz überschritten ist
+        excess = len(self._hosts) - self.max_hosts
+        for host in list(self._hosts)[:-1]:
+            if excess <= 0:
+                break
+            if not self._hosts[host].users:
+                del self._hosts[host]
+                excess -= 1
+
+    async def _wait_turn(self, state):
+        # Mindestabstand zwischen zwei Anfragen an denselben Host (Crawl-delay aus robots.txt hat Vorrang)
+        async with state.lock:
+            delay = self.host_delay
+            if state.robots is not None:
+                delay = max(delay, state.robots.crawl_delay(USER_AGENT) or 0)
+            wait = state.last_request + delay - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            state.last_request = time.monotonic()
+
+    async def _allowed(self, url, state):
+        # robots.txt wird je Host nur einmal geladen, auch wenn mehrere Abrufe gleichzeitig starten
+        async with state.robots_lock:
+            if state.robots is None or time.time() >= state.robots_expires_at:
+                state.robots, ttl = await self._load_robots(url)
+                state.robots_expires_at = time.time() + ttl
+        return state.robots.can_fetch(USER_AGENT, url)
+
+    async def _load_robots(self, url):
+        # Liefert (Regeln, Gültigkeit in Sekunden)
+        parsed = urlparse(url)
+        robots = urllib.robotparser.RobotFileParser()
+        try:
+            async with self._connections:
+                # Für robots.txt selbst gelten Weiterleitungen (z.B. auf https) ohne eigene Prüfung (RFC 9309, 2.3.1.2)
+                response = await self._client.get(f"{parsed.scheme}://{parsed.netloc}/robots.txt",
+                                                  follow_redirects=True)
+        except httpx.HTTPError:
+            # Nicht erreichbar: wie bei 5xx alles sperren und bald erneut versuchen
+            robots.disallow_all = True
+            return robots, self.robots_error_ttl
+        if response.status_code >= 500:
+            robots.disallow_all = True
+            return robots, self.robots_error_ttl
+        if response.status_code in (401, 403):
+            robots.disallow_all = True
+        elif response.status_code == 200:
+            robots.parse(response.text[:self.max_bytes].splitlines())
+        else:
+            # Übrige 4xx: keine robots.txt vorhanden, alles erlaubt
+            robots.allow_all = True
+        return robots, ROBOTS_TTL
+
+    async def _feed(self, on_chunk, chunk, encoding):
+        # Die Auswertung (Regex über den Block) läuft im Parser-Thread; die Blöcke einer Seite bleiben in Reihenfolge
+        return await asyncio.get_running_loop().run_in_executor(self._parser, on_chunk, chunk, encoding)
+
+    async def fetch(self, url, on_chunk=None):
+        """Lädt eine Seite; liefert Page oder None, wenn robots.txt den Abruf verbietet oder er fehlschlägt.
+
+        Weiterleitungen (höchstens MAX_REDIRECTS) werden wie eigene Abrufe behandelt:
+        das Ziel unterliegt seinem robots.txt, seinem Host-Limit und seiner Pause.
+        `on_chunk(chunk, encoding)` sieht jeden Block einer HTML-Antwort bis
+        `max_bytes`, sobald er eintrifft, und läuft in einem Parser-Thread; liefert
+        er True, wird der Download abgebrochen und die unvollständige Seite nicht gecacht.
+        """
+        self._ensure_client()
+        for _ in range(MAX_REDIRECTS + 1):
+            state = self._host(url)
+            state.users += 1
+            try:
+                page, location = await self._fetch(url, state, on_chunk)
+            finally:
+                state.users -= 1
+            if location is None:
+                return page
+            url = location
+        self.stats_counters['errors'] += 1
+        return None
+
+    async def _fetch(self, url, state, on_chunk):
+        # Liefert (Page oder None, Ziel einer Weiterleitung oder None)
+        async with state.semaphore:
+            if not await self._allowed(url, state):
+                self.stats_counters['robots_blocked'] += 1
+                return None, None
+
+            # Dateizugriffe des Caches nicht im Eventloop
+            cached = await asyncio.to_thread(self.cache.get, url)
+            headers = {}
+            if cached and cached.get('etag'):
+                headers['If-None-Match'] = cached['etag']
+            if cached and cached.get('last_modified'):
+                headers['If-Modified-Since'] = cached['last_modified']
+
+            await self._wait_turn(state)
+            try:
+                async with self._connections:
+                    async with self._client.stream('GET', url, headers=headers) as response:
+                        if response.status_code == 304 and cached:
+                            self.stats_counters['not_modified'] += 1
+                            if on_chunk:
+                                await self._feed(on_chunk, cached['text'].encode('utf-8'), 'utf-8')
+                            return Page(cached['url'], 200, cached['text'], 'text/html', from_cache=True), None
+
+                        location = response.headers.get('Location')
+                        if response.is_redirect and location:
+                            location = urljoin(str(response.url), location)
+                            if urlparse(location).scheme not in ('http', 'https'):
+                                self.stats_counters['errors'] += 1
+                                return None, None
+                            self.stats_counters['redirects'] += 1
+                            return None, location
+
+                        content_type = response.headers.get('Content-Type', '')
+                        etag = response.headers.get('ETag')
+                        last_modified = response.headers.get('Last-Modified')
+                        feed = on_chunk if on_chunk and response.status_code == 200 and 'html' in content_type else None
+                        complete = True
+                        body = bytearray()
+                        async for chunk in response.aiter_bytes():
+                            # Der Block an der Grenze wird gekürzt, aber noch ausgewertet
+                            room = self.max_bytes - len(body)
+                            truncated = len(chunk) >= room
+                            chunk = chunk[:room]
+                            body += chunk
+                            if feed and await self._feed(feed, chunk, response.encoding):
+                                self.stats_counters['stopped_early'] += 1
+                                feed = None
+                                # Revalidierbare Seiten trotzdem ganz laden, damit der nächste Abruf ein 304 wird
+                                if not (etag or last_modified):
+                                    complete = False
+                                    break
+                            if truncated:
+                                # Eine gekappte Seite wird nicht gecacht, sonst lieferte ein späteres 304 sie als vollständig
+                                self.stats_counters['truncated'] += 1
+                                complete = False
+                                break
+                        text = bytes(body).decode(response.encoding or 'utf-8', errors='replace')
+                        final_url = str(response.url)
+                        status = response.status_code
+            except httpx.HTTPError:
+                self.stats_counters['errors'] += 1
+                return None, None
+
+        self.stats_counters['fetched'] += 1
+        if complete and status == 200 and 'html' in content_type and (etag or last_modified):
+            await asyncio.to_thread(self.cache.set, url, final_url, text, etag, last_modified)
+        return Page(final_url, status, text, content_type, complete=complete), None
+
+    def stats(self):
+        return dict(self.stats_counters, hosts=len(self._hosts))
+
+
+class CrawlerService:
+    """Stellt den Crawler für Worker-Threads bereit; er läuft auf einem eigenen Eventloop"""
+
+    def __init__(self, crawler):
+        self.crawler = crawler
+        self._loop = asyncio.new_event_loop()
+        threading.Thread(target=self._loop.run_forever, daemon=True, name='crawler').start()
+
+    def fetch(self, url, timeout=None, on_chunk=None):
+        future = asyncio.run_coroutine_threadsafe(self.crawler.fetch(url, on_chunk), self._loop)
+        try:
+            return future.result(timeout)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            return None
+
+    def stats(self):
+        return self.crawler.stats()
+
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def get_crawler():
+    """Liefert den prozessweit geteilten Crawler, konfiguriert über Umgebungsvariablen"""
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = CrawlerService(Crawler(
+                max_connections=int(os.environ.get('CRAWLER_MAX_CONNECTIONS', DEFAULT_MAX_CONNECTIONS)),
+                per_host=int(os.environ.get('CRAWLER_PER_HOST', DEFAULT_PER_HOST)),
+                host_delay=float(os.environ.get('CRAWLER_HOST_DELAY', DEFAULT_HOST_DELAY)),
+                max_bytes=int(os.environ.get('CRAWLER_MAX_BYTES', DEFAULT_MAX_BYTES)),
+                timeout=float(os.environ.get('CRAWLER_TIMEOUT', DEFAULT_TIMEOUT)),
+                cache_dir=os.environ.get('CRAWLER_CACHE_DIR', DEFAULT_CACHE_DIR),
+                max_hosts=int(os.environ.get('CRAWLER_MAX_HOSTS', DEFAULT_MAX_HOSTS)),
+                parse_threads=int(os.environ.get('CRAWLER_PARSE_THREADS', DEFAULT_PARSE_THREADS))
+            ))
+        return _service
@@ -0,0 +1,56 @@
+import os
+
+# Felder, die gezielt nachgefragt werden können, mit Beschreibung für den Prompt
+ENRICH_FIELDS = {
+    "phone": "Telefonnummer (bevorzugt Festnetz, international formatiert)",
+    "email": "E-Mail-Adresse (bevorzugt allgemeine Kontakt-E-Mail)",
+    "website": "Website-URL (mit https://)"
+}
+
+# Die Antwort enthält höchstens drei kurze Felder
+ENRICH_MAX_TOKENS = 200
+
+
+def auto_enrich_default():
+    """Standard für das automatische Nachfragen fehlender Felder, überschreibbar pro Anfrage"""
+    return os.environ.get('LOOKUP_AUTO_ENRICH', '').lower() in ('1', 'true', 'yes')
+
+
+def missing_fields(record):
+    """Felder ohne Wert, in fester Reihenfolge"""
+    return [field for field in ENRICH_FIELDS if not record.get(field)]
+
+
+def is_partial(record):
+    """Teilweise gefüllt: mindestens ein Feld bekannt und mindestens eines fehlt"""
+    missing = missing_fields(record)
+    return 0 < len(missing) < len(ENRICH_FIELDS)
+
+
+def enrich_prompt(record, missing, structured=False):
+    """Minimaler Prompt, der nur nach den fehlenden Feldern fragt; bekannte Werte dienen als Kontext"""
+    known = "\n".join(f"{field}: {record[field]}" for field in ENRICH_FIELDS if record.get(field))
+    wanted = "\n".join(f"- {ENRICH_FIELDS[field]}" for field in missing)
+    if structured:
+        output = "Übergib die Werte an das Werkzeug. Wenn du einen Wert nicht finden kannst, setze ihn auf null."
+    else:
+        fields = ", ".join(f'"{field}": "... oder null"' for field in missing)
+        output = f"Gib NUR dieses JSON zurück: {{{fields}}}"
+    return f"""Unternehmen: "{record.get('name')}"
+Bekannt:
+{known or '-'}
+
+Gesucht:
+{wanted}
+
+{output}"""
+
+
+def merge_fields(record, answer, missing):
+    """Übernimmt nur Werte für fehlende Felder; bekannte Werte werden nie überschrieben"""
+    merged = dict(record)
+    for field in missing:
+        value = answer.get(field)
+        if isinstance(value, str) and value.strip():
+            merged[field] = value.strip()
+    return merged
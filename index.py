@@ -1,99 +1,73 @@
 from flask import Flask, render_template, request, jsonify, send_from_directory
 import os
-import anthropic
-import json
+from claude_client import anthropic_client, anthropic_clients, is_retryable_error
+from json_extract import JsonExtractionError, extract_json
+from lookup_cache import get_cache
+from prompts import PROMPT_VARIANTS, TokenUsage, build_system, company_message, prompt_variant_default
+from resilience import get_circuit_breaker, retry_call
 
 app = Flask(__name__)
 
+SYSTEM_PROMPT = "Du bist ein präziser Recherche-Assistent, der Unternehmensinformationen findet. Achte besonders auf die korrekte Telefonnummer, die exakt so wiedergegeben werden soll, wie sie auf der offiziellen Website erscheint."
+
 class ClaudeClient:
-    def __init__(self, api_key):
+    def __init__(self, api_key, prompt_variant=None):
         if not api_key:
             raise ValueError("Anthropic API-Schlüssel ist erforderlich")
         
         self.api_key = api_key
-        self.client = anthropic.Anthropic(api_key=self.api_key)
+        self.cache = get_cache()
+        self.prompt_variant = prompt_variant if prompt_variant in PROMPT_VARIANTS else prompt_variant_default()
+        # Token-Nutzung dieser Anfrage, getrennt nach gecachtem und ungecachtem Input
+        self.usage = TokenUsage()
     
     def get_company_info(self, company_name):
-        prompt = f"""
-        Finde die folgenden Informationen für das Unternehmen "{company_name}":
-        1. Telefonnummer (bevorzugt Festnetz, international formatiert mit Ländercode)
-        2. E-Mail-Adresse (bevorzugt allgemeine Kontakt-E-Mail)
-        3. Website-URL (mit https://)
-
-        Für Telefonnummern:
-        - Suche nach offiziellen Kontaktseiten oder "Kontakt"-Abschnitten auf der Unternehmenswebsite
-        - Achte besonders auf Telefonnummern im Header oder Footer der Website
-        - Suche nach Nummern, die als "Tel:", "Phone:", "Call us:" oder ähnlich gekennzeichnet sind
-        - Stelle sicher, dass die Nummer vollständig ist (mit Ländervorwahl)
-        - Behalte das originale Format der Nummer bei, z.B. (239) 325-5180 oder +1 877.800.1634
-        - Überprüfe die Nummer sorgfältig - sie ist ein kritisches Element
-
-        Für E-Mail-Adressen:
-        - Suche nach allgemeinen Kontakt-E-Mails wie info@unternehmen.com
-        - Überprüfe die E-Mail-Adresse auf Tippfehler
+        # Zuerst im Cache nachsehen, erst danach das Modell befragen
+        cached = self.cache.get(company_name)
+        if cached is not None:
+            return cached
 
-        Für Website-URLs:
-        - Gib die Haupt-URL des Unternehmens an, nicht Unterseiten
-        - Stelle sicher, dass die URL mit http:// oder https:// beginnt
+        result = self._query_company_info(company_name)
+        self.cache.set(company_name, result)
+        return result
 
-        Gib die Informationen im folgenden JSON-Format zurück:
-        {{
-            "name": "Unternehmensname",
-            "phone": "Telefonnummer oder null",
-            "email": "E-Mail-Adresse oder null",
-            "website": "Website-URL oder null"
-        }}
-
-        Wenn du eine Information nicht finden kannst, setze den Wert auf null.
-        Gib NUR das JSON zurück, keine Erklärungen oder zusätzlichen Text.
-        """
-        
+    def _query_company_info(self, company_name):
         try:
-            response = self.client.messages.create(
+            # Vorübergehende Fehler mit Backoff wiederholen, bei Ausfall über den Circuit-Breaker sofort abbrechen
+            response = retry_call(lambda: self._create_message(
                 model="claude-3-haiku-20240307",
                 max_tokens=1500,
                 temperature=0.2,
-                system="Du bist ein präziser Recherche-Assistent, der Unternehmensinformationen findet. Achte besonders auf die korrekte Telefonnummer, die exakt so wiedergegeben werden soll, wie sie auf der offiziellen Website erscheint.",
+                # Die Anweisungen sind für alle Unternehmen gleich und werden als cachebarer Block gesendet
+                system=build_system(SYSTEM_PROMPT, self.prompt_variant),
                 messages=[
-                    {"role": "user", "content": prompt}
+                    {"role": "user", "content": company_message(company_name)}
                 ]
-            )
+            ), is_retryable_error)
+            self.usage.add(response.usage)
             
             # Extrahiere das JSON aus der Antwort
             content = response.content[0].text
             
-            # Bereinige die Antwort, falls sie nicht direkt als JSON formatiert ist
-            if "```json" in content:
-                json_str = content.split("```json")[1].split("```")[0].strip()
-            elif "```" in content:
-                json_str = content.split("```")[1].strip()
-            else:
-                # Versuche, JSON direkt aus dem Text zu extrahieren
-                import re
-                json_pattern = r'\{.*\}'
-                match = re.search(json_pattern, content, re.DOTALL)
-                if match:
-                    json_str = match.group(0)
-                else:
-                    json_str = content.strip()
-            
             # Versuche, das JSON zu parsen
             try:
-                result = json.loads(json_str)
-                # Stelle sicher, dass alle erforderlichen Felder vorhanden sind
-                result["name"] = result.get("name", company_name)
-                result["phone"] = result.get("phone")
-                result["email"] = result.get("email")
-                result["website"] = result.get("website")
-                return result
-            except json.JSONDecodeError:
+                result = extract_json(content, dict)
+            except JsonExtractionError as e:
                 # Fallback, wenn das JSON nicht geparst werden kann
+                print(f"Antwort für {company_name} nicht lesbar ({e})")
                 return {
                     "name": company_name,
                     "phone": None,
                     "email": None,
                     "website": None
                 }
+            
+            # Stelle sicher, dass alle erforderlichen Felder vorhanden sind
+            result["name"] = result.get("name", company_name)
+            result["phone"] = result.get("phone")
+            result["email"] = result.get("email")
+            result["website"] = result.get("website")
+            return result
                 
         except Exception as e:
             print(f"Fehler bei der Anfrage an Claude für {company_name}: {e}")
@@ -104,6 +78,11 @@ class ClaudeClient:
                 "website": None
             }
 
+    def _create_message(self, **kwargs):
+        # Client je Aufruf ausleihen, damit die Registry ihn nicht während der Anfrage schließt
+        with anthropic_client(self.api_key) as client:
+            return client.messages.create(**kwargs)
+
 @app.route('/')
 def index():
     html = """
@@ -249,6 +228,44 @@ def index():
                 background-color: rgba(52, 152, 219, 0.1);
             }
             
+            /* Virtualisierte Ergebnistabelle: feste Zeilenhöhe, nur der sichtbare Ausschnitt steht im DOM */
+            #resultViewport {
+                max-height: 70vh;
+                overflow-y: auto;
+            }
+            
+            #resultViewport .table {
+                table-layout: fixed;
+                overflow: visible;
+            }
+            
+            #resultViewport thead th {
+                position: sticky;
+                top: 0;
+                z-index: 1;
+                cursor: pointer;
+                user-select: none;
+            }
+            
+            #resultViewport thead th[data-direction="asc"]::after {
+                content: " ▲";
+            }
+            
+            #resultViewport thead th[data-direction="desc"]::after {
+                content: " ▼";
+            }
+            
+            .result-row td {
+                white-space: nowrap;
+                overflow: hidden;
+                text-overflow: ellipsis;
+                vertical-align: middle;
+            }
+            
+            .table tbody tr.result-spacer {
+                background-color: transparent;
+            }
+            
             .alert-success {
                 background-color: rgba(46, 204, 113, 0.2);
                 border-color: var(--secondary-color);
@@ -433,14 +450,15 @@ def index():
                 </div>
                 <div class="card-body">
                     <div id="summary" class="alert alert-success"></div>
-                    <div class="table-responsive">
+                    <input type="search" id="resultFilter" class="form-control mb-3" placeholder="Ergebnisse filtern (Name, Telefon, E-Mail, Website)">
+                    <div class="table-responsive" id="resultViewport">
                         <table class="table table-striped" style="width: 100%;">
-                            <thead>
+                            <thead id="resultHead">
                                 <tr>
-                                    <th style="width: 20%;">Unternehmen</th>
-                                    <th style="width: 15%;">Telefon</th>
-                                    <th style="width: 15%;">E-Mail</th>
-                                    <th style="width: 50%;">Website</th>
+                                    <th style="width: 20%;" data-sort="name">Unternehmen</th>
+                                    <th style="width: 15%;" data-sort="phone">Telefon</th>
+                                    <th style="width: 15%;" data-sort="email">E-Mail</th>
+                                    <th style="width: 50%;" data-sort="website">Website</th>
                                 </tr>
                             </thead>
                             <tbody id="resultTable">
@@ -454,7 +472,21 @@ def index():
             </div>
         </div>
 
+        <script src="/static/result_table.js"></script>
         <script>
+            // Alle Ergebnisse liegen im Array der Tabelle, gerendert wird nur der sichtbare Ausschnitt
+            const resultTable = new ResultTable({
+                viewport: document.getElementById('resultViewport'),
+                body: document.getElementById('resultTable'),
+                head: document.getElementById('resultHead')
+            });
+            
+            let filterTimer = null;
+            document.getElementById('resultFilter').addEventListener('input', function() {
+                clearTimeout(filterTimer);
+                filterTimer = setTimeout(() => resultTable.setFilter(this.value), 150);
+            });
+            
             document.getElementById('searchBtn').addEventListener('click', async function() {
                 const companyListText = document.getElementById('companyList').value;
                 if (!companyListText.trim()) {
@@ -511,32 +543,8 @@ def index():
                     // Ergebnisse anzeigen
                     document.getElementById('summary').textContent = data.message;
                     
-                    const resultTable = document.getElementById('resultTable');
-                    resultTable.innerHTML = '';
-                    
-                    data.data.forEach(item => {
-                        const row = document.createElement('tr');
-                        
-                        row.innerHTML = `
-                            <td><strong>${item.name}</strong></td>
-                            <td>${item.phone || '-'}</td>
-                            <td>${item.email || '-'}</td>
-                            <td>
-                                <div class="d-flex align-items-center justify-content-between">
-                                    <a href="${item.website}" target="_blank" class="text-primary me-2 text-truncate" style="max-width: 70%;">${item.website || '-'}</a>
-                                    ${(item.email || item.phone) && item.website ? 
-                                        `<button class="btn btn-sm all-in-one-btn flex-shrink-0" 
-                                            data-phone="${item.phone || ''}" 
-                                            data-email="${item.email || ''}" 
-                                            data-website="${item.website}">
-                                            <i class="bi bi-lightning-fill"></i> Alles auf einmal
-                                        </button>` : ''}
-                                </div>
-                            </td>
-                        `;
-                        
-                        resultTable.appendChild(row);
-                    });
+                    resultTable.clear();
+                    data.data.forEach((item, index) => resultTable.add(index, item));
 
                     document.getElementById('results').style.display = 'block';
                 } catch (error) {
@@ -549,29 +557,8 @@ def index():
             });
 
             document.getElementById('exportBtn').addEventListener('click', function() {
-                const table = document.getElementById('resultTable');
-                const rows = table.querySelectorAll('tr');
-                
-                let csvContent = "Unternehmen,Telefon,E-Mail,Website\\n";
-                
-                rows.forEach(row => {
-                    const cells = row.querySelectorAll('td');
-                    // Nur die ersten 4 Spalten exportieren
-                    const rowData = Array.from(cells).slice(0, 4).map(cell => {
-                        // Wenn es ein Link ist, nehmen wir den href-Wert
-                        const link = cell.querySelector('a');
-                        let value = link ? link.getAttribute('href') : cell.textContent;
-                        
-                        // Anführungszeichen um Werte mit Kommas
-                        if (value.includes(',')) {
-                            value = `"${value}"`;
-                        }
-                        
-                        return value;
-                    });
-                    
-                    csvContent += rowData.join(',') + '\\n';
-                });
+                // Aus dem Ergebnis-Array statt aus dem DOM, dort steht nur der sichtbare Ausschnitt
+                const csvContent = resultTable.toCsv();
                 
                 // CSV-Datei erstellen und herunterladen
                 const blob = new Blob([csvContent], { type: 'text/csv;charset=utf-8;' });
@@ -639,7 +626,7 @@ def search():
     
     # Claude-Client initialisieren
     try:
-        claude = ClaudeClient(api_key=anthropic_key)
+        claude = ClaudeClient(api_key=anthropic_key, prompt_variant=data.get('promptVariant'))
     except ValueError as e:
         return jsonify({'error': str(e)}), 400
     except Exception as e:
@@ -662,7 +649,16 @@ def search():
     
     return jsonify({
         'message': f"{len(results)} Unternehmen erfolgreich verarbeitet",
-        'data': results
+        'data': results,
+        'usage': claude.usage.as_dict()
+    })
+
+@app.route('/stats')
+def stats():
+    return jsonify({
+        'cache': get_cache().stats(),
+        'circuit_breaker': get_circuit_breaker().stats(),
+        'clients': anthropic_clients.stats()
     })
 
 # Für lokale Entwicklung
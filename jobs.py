@@ -0,0 +1,485 @@
+import concurrent.futures
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+from client_registry import key_hash
+from worker_pool import QueueFullError, get_worker_pool
+
+# Standardwerte, überschreibbar über Umgebungsvariablen
+DEFAULT_JOB_DB_PATH = os.path.join(tempfile.gettempdir(), 'company_lookup_jobs.sqlite3')
+
+# Anzahl Ergebnisse, die pro Datenbankabfrage gelesen werden
+READ_CHUNK_SIZE = 500
+
+# Anzahl Einträge, die beim schrittweisen Befüllen eines Jobs gemeinsam gespeichert werden
+APPEND_CHUNK_SIZE = 500
+
+# Wartezeit des Runners, wenn ein Job gerade noch befüllt wird, aber keine offenen Einträge hat
+RECEIVE_POLL_INTERVAL = 0.2
+
+# Versuche je Eintrag; danach bleibt er ohne Ergebnis und zählt als fehlgeschlagen
+DEFAULT_MAX_ATTEMPTS = 3
+
+# So lange gehört ein Job dem Prozess, der ihn abarbeitet; der Runner verlängert die Frist laufend
+DEFAULT_LEASE_SECONDS = 120.0
+
+# Jobs, die so lange (Sekunden) nicht mehr verändert wurden, werden gelöscht (0 = nie)
+DEFAULT_JOB_RETENTION = 7 * 24 * 3600
+# Abstand zwischen zwei Aufräumläufen
+SWEEP_INTERVAL = 600
+
+# Herkunft eines Jobs: nur über /jobs und /upload angelegte werden nach einem Neustart automatisch fortgesetzt,
+# Einträge von /search/stream dienen nur dem Export und laufen ohne Verbindung nicht weiter
+JOB_KINDS = ('job', 'upload', 'stream')
+RESUMABLE_KINDS = ('job', 'upload')
+
+
+class JobStore:
+    def __init__(self, path=DEFAULT_JOB_DB_PATH, max_attempts=DEFAULT_MAX_ATTEMPTS, retention=DEFAULT_JOB_RETENTION):
+        self.path = path
+        self.max_attempts = max_attempts
+        self.retention = retention
+        self._last_sweep = 0.0
+        self._lock = threading.Lock()
+
+        # Eine Verbindung für alle Threads, Zugriffe werden über den Lock serialisiert
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                kind TEXT NOT NULL DEFAULT 'job',
+                key_hash TEXT NOT NULL,
+                total INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL,
+                lease_owner TEXT,
+                lease_until REAL,
+                duplicates INTEGER NOT NULL DEFAULT 0,
+                error TEXT,
+                result_seq INTEGER NOT NULL DEFAULT 0
+            )
+        """)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS job_items (
+                job_id TEXT NOT NULL,
+                idx INTEGER NOT NULL,
+                company TEXT NOT NULL,
+                result TEXT,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                seq INTEGER,
+                PRIMARY KEY (job_id, idx)
+            )
+        """)
+        # Ältere Datenbanken um die später hinzugekommenen Spalten ergänzen
+        self._add_columns('jobs', {
+            'kind': "TEXT NOT NULL DEFAULT 'job'", 'lease_owner': 'TEXT', 'lease_until': 'REAL',
+            'duplicates': 'INTEGER NOT NULL DEFAULT 0', 'error': 'TEXT', 'result_seq': 'INTEGER NOT NULL DEFAULT 0'
+        })
+        self._add_columns('job_items', {'attempts': 'INTEGER NOT NULL DEFAULT 0', 'seq': 'INTEGER'})
+        self._conn.execute("CREATE INDEX IF NOT EXISTS job_items_seq ON job_items (job_id, seq)")
+        self._conn.commit()
+
+    def _add_columns(self, table, columns):
+        existing = {row[1] for row in self._conn.execute(f"PRAGMA table_info({table})")}
+        for name, definition in columns.items():
+            if name not in existing:
+                self._conn.execute(f"ALTER TABLE {table} ADD COLUMN {name} {definition}")
+
+    def create_job(self, companies, api_key, kind='job'):
+        """Legt einen Job an; gespeichert wird nur der Hash des API-Schlüssels"""
+        if kind not in JOB_KINDS:
+            raise ValueError(f"Unbekannte Job-Art: {kind}")
+        self.sweep()
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (id, status, kind, key_hash, total, created_at, updated_at) VALUES (?, 'running', ?, ?, ?, ?, ?)",
+                (job_id, kind, key_hash(api_key), len(companies), now, now)
+            )
+            self._conn.executemany(
+                "INSERT INTO job_items (job_id, idx, company) VALUES (?, ?, ?)",
+                ((job_id, i, company) for i, company in enumerate(companies))
+            )
+            self._conn.commit()
+        return job_id
+
+    def append_items(self, job_id, start, companies):
+        """Hängt Einträge ab Index `start` an einen bestehenden Job an"""
+        with self._lock:
+            self._conn.executemany(
+                "INSERT INTO job_items (job_id, idx, company) VALUES (?, ?, ?)",
+                ((job_id, start + i, company) for i, company in enumerate(companies))
+            )
+            self._conn.execute(
+                "UPDATE jobs SET total = total + ?, updated_at = ? WHERE id = ?", (len(companies), time.time(), job_id)
+            )
+            self._conn.commit()
+
+    def get_job(self, job_id):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id, status, kind, key_hash, total, created_at, updated_at, duplicates, error FROM jobs WHERE id = ?",
+                (job_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            done, failed = self._conn.execute(
+                "SELECT COUNT(result), COUNT(*) - COUNT(result) FROM job_items "
+                "WHERE job_id = ? AND (result IS NOT NULL OR attempts >= ?)",
+                (job_id, self.max_attempts)
+            ).fetchone()
+        return {
+            'id': row[0],
+            'status': row[1],
+            'kind': row[2],
+            'key_hash': row[3],
+            'total': row[4],
+            'done': done,
+            'failed': failed,
+            'created_at': row[5],
+            'updated_at': row[6],
+            'duplicates': row[7],
+            'error': row[8]
+        }
+
+    def set_status(self, job_id, status):
+        with self._lock:
+            self._conn.execute("UPDATE jobs SET status = ?, updated_at = ? WHERE id = ?", (status, time.time(), job_id))
+            self._conn.commit()
+
+    def set_duplicates(self, job_id, duplicates):
+        """Anzahl doppelter Namen, die beim Einlesen übersprungen wurden"""
+        with self._lock:
+            self._conn.execute("UPDATE jobs SET duplicates = ? WHERE id = ?", (duplicates, job_id))
+            self._conn.commit()
+
+    def set_error(self, job_id, error):
+        """Meldung, wenn das Einlesen der Eingabe abgebrochen ist"""
+        with self._lock:
+            self._conn.execute("UPDATE jobs SET error = ?, updated_at = ? WHERE id = ?", (error, time.time(), job_id))
+            self._conn.commit()
+
+    def unfinished_jobs(self, kinds=RESUMABLE_KINDS):
+        """IDs der nicht abgeschlossenen Jobs der angegebenen Arten"""
+        with self._lock:
+            return [row[0] for row in self._conn.execute(
+                f"SELECT id FROM jobs WHERE status != 'done' AND kind IN ({','.join('?' * len(kinds))})", tuple(kinds)
+            )]
+
+    def sweep(self, force=False):
+        """Löscht Jobs, die länger als `retention` Sekunden unverändert sind und gerade nicht laufen.
+
+        Läuft höchstens alle SWEEP_INTERVAL Sekunden; liefert die Zahl der gelöschten Jobs.
+        """
+        now = time.time()
+        if not self.retention or (not force and now - self._last_sweep < SWEEP_INTERVAL):
+            return 0
+        self._last_sweep = now
+        with self._lock:
+            expired = [row[0] for row in self._conn.execute(
+                "SELECT id FROM jobs WHERE updated_at < ? AND (lease_until IS NULL OR lease_until < ?)",
+                (now - self.retention, now)
+            )]
+            for job_id in expired:
+                self._conn.execute("DELETE FROM job_items WHERE job_id = ?", (job_id,))
+                self._conn.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+            self._conn.commit()
+        if expired:
+            print(f"{len(expired)} abgelaufene Jobs gelöscht")
+        return len(expired)
+
+    def pending_items(self, job_id, limit):
+        """Liefert bis zu `limit` noch offene Einträge als (Index, Unternehmen), ohne endgültig fehlgeschlagene"""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT idx, company FROM job_items WHERE job_id = ? AND result IS NULL AND attempts < ? ORDER BY idx LIMIT ?",
+                (job_id, self.max_attempts, limit)
+            ).fetchall()
+
+    def record_failure(self, job_id, idx):
+        """Zählt einen Fehlversuch; der Eintrag bleibt ohne Ergebnis und wird erneut abgefragt"""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE job_items SET attempts = attempts + 1 WHERE job_id = ? AND idx = ?", (job_id, idx)
+            )
+            self._conn.commit()
+
+    def reset_failures(self, job_id):
+        """Gibt endgültig fehlgeschlagenen Einträgen wieder alle Versuche (z.B. beim manuellen Fortsetzen)"""
+        with self._lock:
+            self._conn.execute("UPDATE job_items SET attempts = 0 WHERE job_id = ? AND result IS NULL", (job_id,))
+            self._conn.commit()
+
+    def acquire_lease(self, job_id, owner, seconds):
+        """Übernimmt oder verlängert den Job für `owner`, wenn ihn kein anderer Prozess gerade abarbeitet"""
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET lease_owner = ?, lease_until = ? "
+                "WHERE id = ? AND (lease_owner IS NULL OR lease_owner = ? OR lease_until < ?)",
+                (owner, now + seconds, job_id, owner, now)
+            )
+            self._conn.commit()
+        return cursor.rowcount == 1
+
+    def release_lease(self, job_id, owner):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET lease_owner = NULL, lease_until = NULL WHERE id = ? AND lease_owner = ?", (job_id, owner)
+            )
+            self._conn.commit()
+
+    def is_leased(self, job_id):
+        with self._lock:
+            row = self._conn.execute("SELECT lease_until FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return row is not None and row[0] is not None and row[0] >= time.time()
+
+    def save_result(self, job_id, idx, result):
+        self.save_results(job_id, [(idx, result)])
+
+    def save_results(self, job_id, results):
+        """Speichert mehrere (Index, Ergebnis) in einer Transaktion.
+
+        Jedes Ergebnis bekommt eine im Job fortlaufende Nummer `seq` in der
+        Reihenfolge des Speicherns, über die iter_new_results neue Ergebnisse findet.
+        """
+        with self._lock:
+            for idx, result in results:
+                self._conn.execute("UPDATE jobs SET result_seq = result_seq + 1 WHERE id = ?", (job_id,))
+                self._conn.execute(
+                    "UPDATE job_items SET result = ?, seq = (SELECT result_seq FROM jobs WHERE id = ?) WHERE job_id = ? AND idx = ?",
+                    (json.dumps(result), job_id, job_id, idx)
+                )
+            self._conn.execute("UPDATE jobs SET updated_at = ? WHERE id = ?", (time.time(), job_id))
+            self._conn.commit()
+
+    def iter_results(self, job_id, offset=0, limit=None):
+        """Liefert (Index, Ergebnis) der fertigen Einträge in Eingabereihenfolge, ohne alles in den Speicher zu laden"""
+        last_idx = -1
+        remaining = limit
+        while remaining is None or remaining > 0:
+            chunk = READ_CHUNK_SIZE if remaining is None else min(READ_CHUNK_SIZE, remaining)
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT idx, result FROM job_items WHERE job_id = ? AND idx > ? AND result IS NOT NULL ORDER BY idx LIMIT ? OFFSET ?",
+                    (job_id, last_idx, chunk, offset)
+                ).fetchall()
+            if not rows:
+                return
+            offset = 0
+            for idx, result in rows:
+                yield idx, json.loads(result)
+            last_idx = rows[-1][0]
+            if remaining is not None:
+                remaining -= len(rows)
+
+
+    def iter_new_results(self, job_id, since=0, limit=None):
+        """Liefert (seq, Index, Ergebnis) der nach `since` gespeicherten Ergebnisse in der Reihenfolge des Speicherns"""
+        remaining = limit
+        while remaining is None or remaining > 0:
+            chunk = READ_CHUNK_SIZE if remaining is None else min(READ_CHUNK_SIZE, remaining)
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT seq, idx, result FROM job_items WHERE job_id = ? AND seq > ? ORDER BY seq LIMIT ?",
+                    (job_id, since, chunk)
+                ).fetchall()
+            if not rows:
+                return
+            for seq, idx, result in rows:
+                yield seq, idx, json.loads(result)
+            since = rows[-1][0]
+            if remaining is not None:
+                remaining -= len(rows)
+
+
+class JobRunner:
+    """Arbeitet Jobs im Hintergrund über den gemeinsamen Worker-Pool ab.
+
+    Jeder Job gehört über eine zeitlich begrenzte Sperre in der Datenbank genau
+    einem Runner; laufen mehrere Prozesse (z.B. Gunicorn-Worker) mit derselben
+    Datenbank, arbeitet so trotzdem nur einer einen Job ab.
+    """
+
+    def __init__(self, store, client_factory, pool=None, lease_seconds=DEFAULT_LEASE_SECONDS):
+        self.store = store
+        self.client_factory = client_factory
+        self.pool = pool or get_worker_pool()
+        self.lease_seconds = lease_seconds
+        self.owner = uuid.uuid4().hex
+        self._running = set()
+        # Jobs, deren Einträge gerade noch eingelesen werden
+        self._receiving = set()
+        self._lock = threading.Lock()
+
+    def submit(self, companies, api_key, kind='job'):
+        job_id = self.store.create_job(companies, api_key, kind)
+        self.start(job_id, api_key)
+        return job_id
+
+    def submit_stream(self, companies, api_key, kind='upload', on_finished=None):
+        """Legt einen leeren Job an, startet ihn sofort und liest `companies` in einem eigenen Thread.
+
+        Die Job-ID kommt sofort zurück; die Abfragen beginnen, während die Namen
+        noch gelesen und paketweise angehängt werden, und im Speicher liegt nie
+        mehr als ein Paket. Bricht das Lesen ab (ValueError), bleibt die Meldung
+        im Feld `error` des Jobs, die bis dahin angehängten Namen werden trotzdem
+        abgearbeitet. `on_finished(job_id, count, error)` läuft nach dem Lesen im
+        selben Thread, z.B. zum Aufräumen der Eingabedatei.
+        """
+        job_id = self.store.create_job([], api_key, kind)
+        with self._lock:
+            self._receiving.add(job_id)
+        self.start(job_id, api_key)
+        threading.Thread(
+            target=self._receive, args=(job_id, companies, on_finished), daemon=True, name=f'receive-{job_id[:8]}'
+        ).start()
+        return job_id
+
+    def _receive(self, job_id, companies, on_finished):
+        count = 0
+        error = None
+        try:
+            batch = []
+            for company in companies:
+                batch.append(company)
+                if len(batch) == APPEND_CHUNK_SIZE:
+                    self.store.append_items(job_id, count, batch)
+                    count += len(batch)
+                    batch = []
+            if batch:
+                self.store.append_items(job_id, count, batch)
+                count += len(batch)
+        except ValueError as e:
+            error = f"Datei nicht lesbar: {e}"
+        except Exception as e:
+            print(f"Fehler beim Einlesen von Job {job_id}: {e}")
+            error = "Datei konnte nicht vollständig gelesen werden"
+        finally:
+            try:
+                if error:
+                    self.store.set_error(job_id, error)
+                if on_finished is not None:
+                    on_finished(job_id, count, error)
+            finally:
+                with self._lock:
+                    self._receiving.discard(job_id)
+
+    def start(self, job_id, api_key, retry_failed=False):
+        """Startet (oder setzt fort) die Verarbeitung der noch offenen Einträge eines Jobs.
+
+        Liefert False, wenn der Job schon läuft, in diesem oder einem anderen
+        Prozess. Mit `retry_failed` bekommen endgültig fehlgeschlagene Einträge
+        neue Versuche, aber nur, wenn der Job hier tatsächlich gestartet wird.
+        """
+        with self._lock:
+            if job_id in self._running:
+                return False
+            if not self.store.acquire_lease(job_id, self.owner, self.lease_seconds):
+                return False
+            self._running.add(job_id)
+        if retry_failed:
+            self.store.reset_failures(job_id)
+        self.store.set_status(job_id, 'running')
+        threading.Thread(target=self._run, args=(job_id, api_key), daemon=True, name=f'job-{job_id[:8]}').start()
+        return True
+
+    def resume_all(self, api_key):
+        """Setzt nach einem Neustart alle unfertigen Jobs aus /jobs und /upload fort, die mit diesem Schlüssel angelegt wurden"""
+        self.store.sweep(force=True)
+        if not api_key:
+            return
+        for job_id in self.store.unfinished_jobs():
+            job = self.store.get_job(job_id)
+            if job['key_hash'] == key_hash(api_key):
+                self.start(job_id, api_key)
+            elif not self.store.is_leased(job_id):
+                # Ohne passenden Schlüssel wartet der Job auf POST /jobs/<id>/resume
+                self.store.set_status(job_id, 'interrupted')
+
+    def _run(self, job_id, api_key):
+        try:
+            client = self.client_factory(api_key)
+            while True:
+                if not self.store.acquire_lease(job_id, self.owner, self.lease_seconds):
+                    # Sperre abgelaufen und von einem anderen Prozess übernommen: der macht weiter
+                    print(f"Job {job_id} wird von einem anderen Prozess fortgesetzt")
+                    return
+                # Vor dem Lesen prüfen, damit keine zuletzt angehängten Einträge übersehen werden
+                with self._lock:
+                    receiving = job_id in self._receiving
+                # In kleinen Paketen einreichen, damit interaktive Anfragen im Pool Platz behalten
+                items = self.store.pending_items(job_id, self.pool.max_workers)
+                if not items:
+                    if receiving:
+                        time.sleep(RECEIVE_POLL_INTERVAL)
+                        continue
+                    break
+                try:
+                    futures = self.pool.submit_all((client.get_company_info, company) for _, company in items)
+                except QueueFullError as e:
+                    time.sleep(e.retry_after)
+                    continue
+
+                # Nur echte Ergebnisse speichern; Fehlschläge bleiben offen und werden bis zu max_attempts wiederholt
+                future_to_item = dict(zip(futures, items))
+                pending = set(future_to_item)
+                renewed_at = time.monotonic()
+                failures = 0
+                while pending:
+                    # Auch während langsamer Abfragen regelmäßig verlängern, sonst übernimmt ein anderer Prozess
+                    done, pending = concurrent.futures.wait(
+                        pending, timeout=self.lease_seconds / 3, return_when=concurrent.futures.FIRST_COMPLETED
+                    )
+                    for future in done:
+                        idx, company = future_to_item[future]
+                        try:
+                            result = future.result()
+                        except Exception as e:
+                            print(f"Fehler bei {company} (Job {job_id}): {e}")
+                            self.store.record_failure(job_id, idx)
+                            failures += 1
+                            continue
+                        self.store.save_result(job_id, idx, result)
+                    if pending and time.monotonic() - renewed_at >= self.lease_seconds / 3:
+                        if not self.store.acquire_lease(job_id, self.owner, self.lease_seconds):
+                            print(f"Job {job_id} wird von einem anderen Prozess fortgesetzt")
+                            for future in pending:
+                                future.cancel()
+                            return
+                        renewed_at = time.monotonic()
+                if failures == len(items):
+                    # Alles fehlgeschlagen (z.B. API nicht erreichbar): kurz warten statt die Versuche zu verbrauchen
+                    time.sleep(self.pool.retry_after)
+            self.store.set_status(job_id, 'done')
+        except Exception as e:
+            print(f"Fehler bei der Verarbeitung von Job {job_id}: {e}")
+            self.store.set_status(job_id, 'failed')
+        finally:
+            self.store.release_lease(job_id, self.owner)
+            with self._lock:
+                self._running.discard(job_id)
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_job_store():
+    """Liefert den prozessweit geteilten Job-Speicher, konfiguriert über Umgebungsvariablen"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = JobStore(
+                path=os.environ.get('JOB_DB_PATH', DEFAULT_JOB_DB_PATH),
+                max_attempts=int(os.environ.get('JOB_MAX_ATTEMPTS', DEFAULT_MAX_ATTEMPTS)),
+                retention=int(os.environ.get('JOB_RETENTION', DEFAULT_JOB_RETENTION))
+            )
+        return _store
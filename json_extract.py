@@ -0,0 +1,115 @@
+import json
+import re
+
+_decoder = json.JSONDecoder()
+
+_OPENERS = {dict: '{', list: '['}
+
+# Zeichen, die die Verschachtelung bestimmen; Escapes innerhalb von Zeichenketten werden als Ganzes übersprungen
+_STRUCTURE = re.compile(r'\\.|["{}\[\]]', re.DOTALL)
+
+
+class JsonExtractionError(ValueError):
+    """Die Modellantwort enthält kein verwertbares JSON; `reason` nennt den Grund"""
+
+    def __init__(self, reason, detail=None):
+        super().__init__(f"{reason}: {detail}" if detail else reason)
+        self.reason = reason
+        self.detail = detail
+
+
+def extract_json(text, expected=None):
+    """Liefert das erste vollständige JSON-Objekt bzw. -Array aus einer Modellantwort.
+
+    Codeblöcke (```json ... ```), einleitender Text und nachfolgende Klammern
+    werden übersprungen, ohne den Text vorher zu zerlegen. Mit `expected`
+    (dict oder list) wird nur ein Wert dieses Typs geliefert. Geprüft werden nur
+    Klammern auf oberster Ebene: ein inneres Objekt eines abgeschnittenen oder
+    unpassenden Werts gilt nie als Antwort, und jedes Zeichen wird nur einmal gelesen.
+    """
+    if not text:
+        raise JsonExtractionError('empty_response')
+
+    position = _find_opener(text, '{[', 0)
+    if position == -1 or (expected and text.find(_OPENERS[expected], position) == -1):
+        raise JsonExtractionError('no_json', 'keine öffnende Klammer gefunden')
+
+    last_error = None
+    while position != -1:
+        if expected and text[position] != _OPENERS[expected]:
+            # Wert des anderen Typs samt Inhalt überspringen
+            last_error = JsonExtractionError('unexpected_type', 'list' if text[position] == '[' else 'dict')
+            end = _value_end(text, position)
+        else:
+            try:
+                # raw_decode liest genau einen Wert und ignoriert alles danach
+                value, _ = _decoder.raw_decode(text, position)
+                return value
+            except json.JSONDecodeError as e:
+                last_error = JsonExtractionError('invalid_json', f"{e.msg} (Zeichen {e.pos})")
+                end = _value_end(text, position)
+        position = _find_opener(text, '{[', end)
+
+    raise last_error
+
+
+def _value_end(text, position):
+    # Position hinter der schließenden Klammer zum Öffner an `position` (Zeichenketten beachtet), sonst Textende
+    depth = 0
+    in_string = False
+    for match in _STRUCTURE.finditer(text, position):
+        token = match.group()
+        if in_string:
+            in_string = token != '"'
+        elif token == '"':
+            in_string = True
+        elif token in '{[':
+            depth += 1
+        elif token in '}]':
+            depth -= 1
+            if depth == 0:
+                return match.end()
+    return len(text)
+
+
+def extract_json_items(text):
+    """Liefert die vollständigen Elemente des ersten JSON-Arrays einer Modellantwort.
+
+    Anders als `extract_json` verwirft ein abgeschnittenes Array (z.B. weil die
+    Antwort das Token-Limit erreicht hat) nicht alles: geliefert werden die
+    Elemente bis zum ersten unvollständigen.
+    """
+    if not text:
+        raise JsonExtractionError('empty_response')
+    position = text.find('[')
+    if position == -1:
+        raise JsonExtractionError('no_json', 'keine öffnende Klammer gefunden')
+
+    items = []
+    position = _skip_whitespace(text, position + 1)
+    if text.startswith(']', position):
+        return items
+    while position < len(text):
+        try:
+            item, position = _decoder.raw_decode(text, position)
+        except json.JSONDecodeError:
+            break
+        items.append(item)
+        position = _skip_whitespace(text, position)
+        if not text.startswith(',', position):
+            break
+        position = _skip_whitespace(text, position + 1)
+    return items
+
+
+def _skip_whitespace(text, position):
+    while position < len(text) and text[position] in ' \t\r\n':
+        position += 1
+    return position
+
+
+def _find_opener(text, openers, start):
+    if len(openers) == 1:
+        return text.find(openers, start)
+    positions = [p for p in (text.find(opener, start) for opener in openers) if p != -1]
+    return min(positions) if positions else -1
@@ -0,0 +1,237 @@
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from company_names import normalize_company_name
+from fuzzy_index import BUCKET_VERSION, MAX_BUCKET_SIZE, best_match, buckets, plausible_typo
+
+# Standardwerte, überschreibbar über Umgebungsvariablen
+DEFAULT_CACHE_PATH = os.path.join(tempfile.gettempdir(), 'company_lookup_cache.sqlite3')
+DEFAULT_CACHE_TTL = 7 * 24 * 60 * 60
+# Leere Ergebnisse verfallen schneller, falls das Unternehmen doch noch auffindbar wird
+DEFAULT_NEGATIVE_TTL = 24 * 60 * 60
+# So lange nach Ablauf der TTL wird ein Eintrag noch geliefert und im Hintergrund erneuert
+DEFAULT_STALE_TTL = 7 * 24 * 60 * 60
+DEFAULT_CACHE_MAX_ENTRIES = 10000
+
+RESULT_FIELDS = ('name', 'phone', 'email', 'website')
+
+
+def is_empty_result(result):
+    """Prüft, ob ein Ergebnis keine einzige Kontaktinformation enthält"""
+    return not any(result.get(field) for field in ('phone', 'email', 'website'))
+
+
+class LookupCache:
+    def __init__(self, path=DEFAULT_CACHE_PATH, ttl=DEFAULT_CACHE_TTL, max_entries=DEFAULT_CACHE_MAX_ENTRIES,
+                 negative_ttl=DEFAULT_NEGATIVE_TTL, stale_ttl=DEFAULT_STALE_TTL):
+        self.path = path
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.stale_ttl = stale_ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.negative_hits = 0
+        self.stale_hits = 0
+        self.fuzzy_matches = 0
+        self._lock = threading.Lock()
+
+        # Eine Verbindung für alle Worker-Threads, Zugriffe werden über den Lock serialisiert
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS lookups (
+                key TEXT PRIMARY KEY,
+                result TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_lookups_accessed ON lookups (accessed_at)")
+        # LSH-Buckets der Namen für die unscharfe Suche; verschwinden mit dem Eintrag
+        self._conn.execute("PRAGMA foreign_keys=ON")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS lookup_buckets (
+                bucket INTEGER NOT NULL,
+                key TEXT NOT NULL REFERENCES lookups (key) ON DELETE CASCADE,
+                PRIMARY KEY (bucket, key)
+            ) WITHOUT ROWID
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_lookup_buckets_key ON lookup_buckets (key)")
+        # Einträge aus älteren Cache-Dateien einmalig (neu) in den Index aufnehmen; user_version merkt sich
+        # das Bucket-Schema, nach einer Änderung der Berechnung passen die alten Buckets nicht mehr
+        if self._conn.execute("PRAGMA user_version").fetchone()[0] < BUCKET_VERSION:
+            self._conn.execute("DELETE FROM lookup_buckets")
+            self._index_missing_buckets()
+            self._conn.execute(f"PRAGMA user_version = {BUCKET_VERSION}")
+        self._conn.commit()
+
+    def _index_missing_buckets(self):
+        rows = self._conn.execute("""
+            SELECT key, result FROM lookups WHERE key NOT IN (SELECT key FROM lookup_buckets)
+        """).fetchall()
+        for key, payload in rows:
+            if not is_empty_result(json.loads(payload)):
+                self._insert_buckets(key, buckets(key))
+
+    def _insert_buckets(self, key, key_buckets):
+        # Ein Bucket nimmt höchstens MAX_BUCKET_SIZE + 1 Namen auf; ist er voll, gilt er bei der Suche als
+        # nicht aussagekräftig. So bleibt jede Abfrage klein, auch wenn sehr viele Namen ein Wort teilen.
+        placeholders = ','.join('?' * len(key_buckets))
+        counts = dict(self._conn.execute(
+            f"SELECT bucket, COUNT(*) FROM lookup_buckets WHERE bucket IN ({placeholders}) GROUP BY bucket", key_buckets
+        ).fetchall())
+        self._conn.executemany(
+            "INSERT OR IGNORE INTO lookup_buckets (bucket, key) VALUES (?, ?)",
+            [(bucket, key) for bucket in key_buckets if counts.get(bucket, 0) <= MAX_BUCKET_SIZE]
+        )
+
+    def get(self, company_name):
+        """Liefert das gespeicherte Ergebnis oder None, wenn es fehlt oder abgelaufen ist"""
+        return self.lookup(company_name, allow_stale=False)[0]
+
+    def lookup(self, company_name, allow_stale=True):
+        """Liefert (Ergebnis, veraltet).
+
+        Positive Einträge gelten `ttl` Sekunden als frisch und werden danach noch
+        `stale_ttl` Sekunden als veraltet geliefert, damit der Aufrufer sie im
+        Hintergrund erneuern kann. Leere Ergebnisse gelten nur `negative_ttl`.
+        """
+        key = normalize_company_name(company_name)
+        now = time.time()
+
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT result, created_at FROM lookups WHERE key = ?", (key,)
+            ).fetchone()
+
+            result = json.loads(row[0]) if row is not None else None
+            age = now - row[1] if row is not None else None
+            negative = result is not None and is_empty_result(result)
+            if result is None or age > (self.negative_ttl if negative else self.ttl + self.stale_ttl):
+                if row is not None:
+                    self._conn.execute("DELETE FROM lookups WHERE key = ?", (key,))
+                    self._conn.commit()
+                self.misses += 1
+                return None, False
+
+            stale = not negative and age > self.ttl
+            if stale and not allow_stale:
+                self.misses += 1
+                return None, False
+            self._conn.execute("UPDATE lookups SET accessed_at = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.hits += 1
+            if negative:
+                self.negative_hits += 1
+            if stale:
+                self.stale_hits += 1
+
+        # Der Name der aktuellen Anfrage wird beibehalten
+        result['name'] = company_name
+        return result, stale
+
+    def set(self, company_name, result, negative=False):
+        """Speichert ein Ergebnis.
+
+        Leere Ergebnisse werden nur mit `negative=True` gecacht, also wenn der
+        Aufrufer weiß, dass es eine echte Antwort und kein Fehler war.
+        """
+        if is_empty_result(result) and not negative:
+            return
+
+        key = normalize_company_name(company_name)
+        now = time.time()
+        payload = json.dumps({field: result.get(field) for field in RESULT_FIELDS})
+        # Nur Einträge mit Kontaktdaten kommen in den Index für die unscharfe Suche
+        key_buckets = [] if is_empty_result(result) else buckets(key)
+
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO lookups (key, result, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, payload, now, now)
+            )
+            self._conn.execute("DELETE FROM lookup_buckets WHERE key = ?", (key,))
+            if key_buckets:
+                self._insert_buckets(key, key_buckets)
+            # LRU: die am längsten nicht genutzten Einträge über dem Limit entfernen
+            self._conn.execute("""
+                DELETE FROM lookups WHERE key IN (
+                    SELECT key FROM lookups ORDER BY accessed_at DESC LIMIT -1 OFFSET ?
+                )
+            """, (self.max_entries,))
+            self._conn.commit()
+
+    def fuzzy_lookup(self, company_name, threshold):
+        """Sucht den ähnlichsten bekannten Namen mit Kontaktdaten.
+
+        Liefert (Ergebnis, Ähnlichkeit, Tippfehler) mit dem gespeicherten Namen im
+        Ergebnis oder None, wenn kein Name die Schwelle erreicht. `Tippfehler`
+        sagt, ob sich die Namen nur wie durch einen Tippfehler unterscheiden
+        (siehe plausible_typo). Abgelaufene und leere Einträge werden nie
+        geliefert, veraltete schon.
+        """
+        key = normalize_company_name(company_name)
+        key_buckets = buckets(key)
+        now = time.time()
+
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT bucket, key FROM lookup_buckets WHERE bucket IN ({','.join('?' * len(key_buckets))})", key_buckets
+            ).fetchall()
+            members = {}
+            for bucket, candidate in rows:
+                members.setdefault(bucket, []).append(candidate)
+            # Volle Buckets überspringen
+            candidates = {candidate for names in members.values() if len(names) <= MAX_BUCKET_SIZE for candidate in names}
+
+            match = best_match(key, candidates, threshold)
+            if match is None:
+                return None
+            row = self._conn.execute(
+                "SELECT result, created_at FROM lookups WHERE key = ?", (match[0],)
+            ).fetchone()
+            if row is None or now - row[1] > self.ttl + self.stale_ttl:
+                return None
+            self.fuzzy_matches += 1
+
+        return json.loads(row[0]), match[1], plausible_typo(key, match[0])
+
+    def stats(self):
+        """Liefert Trefferzahlen und Füllstand des Caches"""
+        with self._lock:
+            size = self._conn.execute("SELECT COUNT(*) FROM lookups").fetchone()[0]
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'negative_hits': self.negative_hits,
+                'stale_hits': self.stale_hits,
+                'fuzzy_matches': self.fuzzy_matches,
+                'size': size,
+                'max_entries': self.max_entries,
+                'ttl': self.ttl,
+                'negative_ttl': self.negative_ttl,
+                'stale_ttl': self.stale_ttl
+            }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    """Liefert den prozessweit geteilten Cache, konfiguriert über Umgebungsvariablen"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = LookupCache(
+                path=os.environ.get('LOOKUP_CACHE_PATH', DEFAULT_CACHE_PATH),
+                ttl=int(os.environ.get('LOOKUP_CACHE_TTL', DEFAULT_CACHE_TTL)),
+                max_entries=int(os.environ.get('LOOKUP_CACHE_MAX_ENTRIES', DEFAULT_CACHE_MAX_ENTRIES)),
+                negative_ttl=int(os.environ.get('LOOKUP_CACHE_NEGATIVE_TTL', DEFAULT_NEGATIVE_TTL)),
+                stale_ttl=int(os.environ.get('LOOKUP_CACHE_STALE_TTL', DEFAULT_STALE_TTL))
+            )
+        return _cache
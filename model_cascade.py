@@ -0,0 +1,107 @@
+import os
+import re
+import threading
+from urllib.parse import urlparse
+
+# Standardwerte, überschreibbar über Umgebungsvariablen
+DEFAULT_MODEL_CHAIN = ('claude-3-haiku-20240307',)
+DEFAULT_CONFIDENCE_THRESHOLD = 0.8
+
+PHONE_FORMAT = re.compile(r'^\+?[\d\s()./-]+$')
+EMAIL_FORMAT = re.compile(r'^[\w.+-]+@([\w-]+(?:\.[\w-]+)*\.[a-z]{2,})$', re.IGNORECASE)
+
+# Gewichte des Vertrauenswerts: gültige Felder zählen voll, vorhandene aber
+# ungültige nur wenig; passende E-Mail- und Website-Domain gibt den Rest
+VALID_FIELD_WEIGHT = 0.3
+INVALID_FIELD_WEIGHT = 0.1
+CONSISTENCY_WEIGHT = 0.1
+
+
+def model_chain_default():
+    """Modellkette aus der Umgebung, z.B. "claude-3-haiku-20240307,claude-3-5-sonnet-20240620" """
+    chain = [model.strip() for model in os.environ.get('LOOKUP_MODEL_CHAIN', '').split(',') if model.strip()]
+    return tuple(chain) or DEFAULT_MODEL_CHAIN
+
+
+def confidence_threshold_default():
+    return float(os.environ.get('LOOKUP_CONFIDENCE_THRESHOLD', DEFAULT_CONFIDENCE_THRESHOLD))
+
+
+def _domain(host):
+    # Letzte zwei Labels genügen für den Abgleich (www.firma.de und firma.de)
+    return '.'.join(host.lower().split('.')[-2:])
+
+
+def _valid_phone(phone):
+    return bool(PHONE_FORMAT.match(phone)) and 7 <= sum(c.isdigit() for c in phone) <= 15
+
+
+def _website_host(website):
+    parsed = urlparse(website)
+    if parsed.scheme in ('http', 'https') and '.' in parsed.netloc:
+        return parsed.netloc.split(':')[0]
+    return None
+
+
+def confidence_score(result):
+    """Vertrauenswert zwischen 0 und 1 aus Vollständigkeit, Format und Domain-Abgleich"""
+    score = 0.0
+    phone, email, website = result.get('phone'), result.get('email'), result.get('website')
+    email_match = EMAIL_FORMAT.match(email) if isinstance(email, str) else None
+    host = _website_host(website) if isinstance(website, str) else None
+
+    if isinstance(phone, str) and phone.strip():
+        score += VALID_FIELD_WEIGHT if _valid_phone(phone.strip()) else INVALID_FIELD_WEIGHT
+    if email:
+        score += VALID_FIELD_WEIGHT if email_match else INVALID_FIELD_WEIGHT
+    if website:
+        score += VALID_FIELD_WEIGHT if host else INVALID_FIELD_WEIGHT
+    if email_match and host and _domain(email_match.group(1)) == _domain(host):
+        score += CONSISTENCY_WEIGHT
+    return round(score, 2)
+
+
+class ModelStats:
+    """Aufrufe, Latenz, Token-Nutzung und Eskalationen je Modell der Kette"""
+
+    def __init__(self):
+        self._models = {}
+        self._lock = threading.Lock()
+
+    def _entry(self, model):
+        return self._models.setdefault(model, {
+            'calls': 0,
+            'seconds': 0.0,
+            'input_tokens': 0,
+            'output_tokens': 0,
+            'resolved': 0,
+            'escalated': 0
+        })
+
+    def record_call(self, model, seconds, usage):
+        with self._lock:
+            entry = self._entry(model)
+            entry['calls'] += 1
+            entry['seconds'] += seconds
+            entry['input_tokens'] += getattr(usage, 'input_tokens', 0) or 0
+            entry['output_tokens'] += getattr(usage, 'output_tokens', 0) or 0
+
+    def record_outcome(self, model, escalated):
+        with self._lock:
+            self._entry(model)['escalated' if escalated else 'resolved'] += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                model: dict(entry, avg_latency=round(entry['seconds'] / entry['calls'], 3) if entry['calls'] else None,
+                            seconds=round(entry['seconds'], 3))
+                for model, entry in self._models.items()
+            }
+
+
+_model_stats = ModelStats()
+
+
+def get_model_stats():
+    """Liefert die prozessweit geteilten Modellstatistiken"""
+    return _model_stats
@@ -0,0 +1,101 @@
+import os
+import threading
+from structured_output import COMPANY_INFO_TOOL
+
+# Statischer Teil des Prompts: für jedes Unternehmen identisch und daher cachebar.
+# Nur der Unternehmensname wird pro Anfrage als Nutzer-Nachricht gesendet.
+FULL_INSTRUCTIONS = """Finde die folgenden Informationen für das in der Nachricht genannte Unternehmen:
+1. Telefonnummer (bevorzugt Festnetz, international formatiert mit Ländercode)
+2. E-Mail-Adresse (bevorzugt allgemeine Kontakt-E-Mail)
+3. Website-URL (mit https://)
+
+Für Telefonnummern:
+- Suche nach offiziellen Kontaktseiten oder "Kontakt"-Abschnitten auf der Unternehmenswebsite
+- Achte besonders auf Telefonnummern im Header oder Footer der Website
+- Suche nach Nummern, die als "Tel:", "Phone:", "Call us:" oder ähnlich gekennzeichnet sind
+- Stelle sicher, dass die Nummer vollständig ist (mit Ländervorwahl)
+- Behalte das originale Format der Nummer bei, z.B. (239) 325-5180 oder +1 877.800.1634
+- Überprüfe die Nummer sorgfältig - sie ist ein kritisches Element
+
+Für E-Mail-Adressen:
+- Suche nach allgemeinen Kontakt-E-Mails wie info@unternehmen.com
+- Überprüfe die E-Mail-Adresse auf Tippfehler
+
+Für Website-URLs:
+- Gib die Haupt-URL des Unternehmens an, nicht Unterseiten
+- Stelle sicher, dass die URL mit http:// oder https:// beginnt"""
+
+COMPACT_INSTRUCTIONS = """Finde für das in der Nachricht genannte Unternehmen:
+1. Telefonnummer (Festnetz, vollständig mit Ländercode, im Format der offiziellen Website)
+2. Allgemeine Kontakt-E-Mail-Adresse
+3. Haupt-URL der Website (mit https://)"""
+
+JSON_OUTPUT_FORMAT = """Gib die Informationen im folgenden JSON-Format zurück:
+{
+    "name": "Unternehmensname",
+    "phone": "Telefonnummer oder null",
+    "email": "E-Mail-Adresse oder null",
+    "website": "Website-URL oder null"
+}
+
+Wenn du eine Information nicht finden kannst, setze den Wert auf null.
+Gib NUR das JSON zurück, keine Erklärungen oder zusätzlichen Text."""
+
+TOOL_OUTPUT_FORMAT = f"""Übergib die Informationen an das Werkzeug {COMPANY_INFO_TOOL["name"]}.
+Wenn du eine Information nicht finden kannst, setze den Wert auf null."""
+
+PROMPT_VARIANTS = {
+    'full': FULL_INSTRUCTIONS,
+    'compact': COMPACT_INSTRUCTIONS
+}
+
+
+def prompt_variant_default():
+    """Prompt-Variante aus der Umgebung ('full' oder 'compact')"""
+    variant = os.environ.get('LOOKUP_PROMPT_VARIANT', 'full')
+    return variant if variant in PROMPT_VARIANTS else 'full'
+
+
+def build_system(system_prompt, variant='full', structured=False):
+    """Baut den System-Prompt als einen Block mit Cache-Markierung für Prompt-Caching"""
+    output_format = TOOL_OUTPUT_FORMAT if structured else JSON_OUTPUT_FORMAT
+    return [{
+        "type": "text",
+        "text": f"{system_prompt}\n\n{PROMPT_VARIANTS[variant]}\n\n{output_format}",
+        "cache_control": {"type": "ephemeral"}
+    }]
+
+
+def company_message(company_name):
+    return f'Unternehmen: "{company_name}"'
+
+
+class TokenUsage:
+    """Summiert die Token-Nutzung einer Anfrage, getrennt nach gecachtem und ungecachtem Input"""
+
+    def __init__(self):
+        self.input_tokens = 0
+        self.cached_input_tokens = 0
+        self.cache_write_tokens = 0
+        self.output_tokens = 0
+        self._lock = threading.Lock()
+
+    def add(self, usage):
+        # usage ist entweder das Objekt des SDK oder das rohe JSON der Messages API
+        if usage is None:
+            return
+        get = usage.get if isinstance(usage, dict) else (lambda name: getattr(usage, name, None))
+        with self._lock:
+            self.input_tokens += get('input_tokens') or 0
+            self.cached_input_tokens += get('cache_read_input_tokens') or 0
+            self.cache_write_tokens += get('cache_creation_input_tokens') or 0
+            self.output_tokens += get('output_tokens') or 0
+
+    def as_dict(self):
+        with self._lock:
+            return {
+                'uncached_input_tokens': self.input_tokens,
+                'cached_input_tokens': self.cached_input_tokens,
+                'cache_write_tokens': self.cache_write_tokens,
+                'output_tokens': self.output_tokens
+            }
@@ -0,0 +1,110 @@
+import os
+import threading
+import time
+
+# Standardwerte, überschreibbar über Umgebungsvariablen
+DEFAULT_REQUESTS_PER_MINUTE = 50
+DEFAULT_TOKENS_PER_MINUTE = 50000
+# Pause, wenn die API drosselt, aber keinen retry-after-Header mitschickt
+DEFAULT_THROTTLE_PAUSE = 5.0
+
+
+class TokenBucket:
+    def __init__(self, per_minute):
+        self.capacity = per_minute
+        self.rate = per_minute / 60.0
+        self.level = float(per_minute)
+
+    def refill(self, elapsed):
+        self.level = min(self.capacity, self.level + elapsed * self.rate)
+
+    def wait_time(self, amount):
+        """Sekunden, bis `amount` verfügbar ist"""
+        return max(0.0, (amount - self.level) / self.rate)
+
+
+class RateLimiter:
+    """Gemeinsames Token-Bucket-Limit für Anfragen und Tokens aller Worker-Threads"""
+
+    def __init__(self, requests_per_minute=DEFAULT_REQUESTS_PER_MINUTE, tokens_per_minute=DEFAULT_TOKENS_PER_MINUTE):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.throttled = 0
+        self._paused_until = 0.0
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        elapsed = now - self._updated_at
+        self._updated_at = now
+        self.requests.refill(elapsed)
+        self.tokens.refill(elapsed)
+
+    def acquire(self, tokens):
+        """Blockiert, bis eine Anfrage mit `tokens` geschätzten Tokens gesendet werden darf"""
+        tokens = min(tokens, self.tokens.capacity)
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if now < self._paused_until:
+                    wait = self._paused_until - now
+                else:
+                    wait = max(self.requests.wait_time(1), self.tokens.wait_time(tokens))
+                    if wait == 0:
+                        self.requests.level -= 1
+                        self.tokens.level -= tokens
+                        return
+            time.sleep(max(wait, 0.01))
+
+    def record_usage(self, reserved, used):
+        """Gleicht die reservierte Schätzung mit dem tatsächlichen Verbrauch ab"""
+        with self._lock:
+            self.tokens.level = min(self.tokens.capacity, self.tokens.level + reserved - used)
+
+    def throttle(self, retry_after=None):
+        """Hält alle Threads sofort an, nachdem die API mit 429/529 geantwortet hat"""
+        pause = retry_after if retry_after is not None else DEFAULT_THROTTLE_PAUSE
+        with self._lock:
+            self.throttled += 1
+            self._paused_until = max(self._paused_until, time.monotonic() + pause)
+            # Nach der Pause langsam wieder anlaufen statt mit vollen Buckets
+            self.requests.level = 0.0
+            self.tokens.level = 0.0
+
+    def stats(self):
+        """Liefert verfügbare Budgets und Anzahl der Drosselungen"""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            return {
+                'requests_available': round(self.requests.level, 2),
+                'tokens_available': round(self.tokens.level),
+                'throttled': self.throttled,
+                'paused_for': round(max(0.0, self._paused_until - now), 2)
+            }
+
+
+def parse_retry_after(headers):
+    """Liest den retry-after-Header (Sekunden) aus einer API-Antwort"""
+    value = headers.get('retry-after') if headers is not None else None
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        return None
+
+
+_limiter = None
+_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter():
+    """Liefert den prozessweit geteilten Rate-Limiter, konfiguriert über Umgebungsvariablen"""
+    global _limiter
+    with _limiter_lock:
+        if _limiter is None:
+            _limiter = RateLimiter(
+                requests_per_minute=int(os.environ.get('ANTHROPIC_REQUESTS_PER_MINUTE', DEFAULT_REQUESTS_PER_MINUTE)),
+                tokens_per_minute=int(os.environ.get('ANTHROPIC_TOKENS_PER_MINUTE', DEFAULT_TOKENS_PER_MINUTE))
+            )
+        return _limiter
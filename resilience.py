@@ -0,0 +1,219 @@
+import asyncio
+import os
+import random
+import threading
+import time
+
+# Standardwerte, überschreibbar über Umgebungsvariablen
+DEFAULT_RETRY_ATTEMPTS = 3
+DEFAULT_RETRY_BASE_DELAY = 0.5
+DEFAULT_RETRY_MAX_DELAY = 10.0
+DEFAULT_FAILURE_THRESHOLD = 5
+DEFAULT_RESET_TIMEOUT = 30.0
+
+# HTTP-Status, bei denen sich ein erneuter Versuch lohnt (529 = API überlastet)
+RETRYABLE_STATUS_CODES = {408, 429, 500, 502, 503, 504, 529}
+
+# Drosselung: wird nach retry-after wiederholt, zählt aber nicht als Ausfall für den Circuit-Breaker
+THROTTLED_STATUS_CODES = {429}
+
+
+def is_retryable_status(status_code):
+    return status_code in RETRYABLE_STATUS_CODES
+
+
+class RetryableStatusError(Exception):
+    """Vorübergehender Fehlerstatus einer HTTP-Antwort"""
+
+    def __init__(self, status_code, text, retry_after=None):
+        super().__init__(f"{status_code} - {text}")
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class CircuitOpenError(Exception):
+    def __init__(self):
+        super().__init__("Die Anthropic API ist derzeit nicht erreichbar, Anfrage wird übersprungen")
+
+
+class RetryPolicy:
+    def __init__(self, max_attempts=DEFAULT_RETRY_ATTEMPTS, base_delay=DEFAULT_RETRY_BASE_DELAY, max_delay=DEFAULT_RETRY_MAX_DELAY):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def delay(self, attempt, retry_after=None):
+        """Wartezeit nach dem `attempt`-ten Fehlversuch oder None, wenn keine Versuche mehr übrig sind"""
+        if attempt >= self.max_attempts:
+            return None
+        # Exponentielles Backoff mit vollem Jitter, damit die Threads nicht gleichzeitig wiederholen
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+        return max(delay, retry_after or 0)
+
+
+class CircuitBreaker:
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold=DEFAULT_FAILURE_THRESHOLD, reset_timeout=DEFAULT_RESET_TIMEOUT):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.rejected = 0
+        self.throttled = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        """Wirft CircuitOpenError, solange der Breaker offen ist; lässt nach Ablauf genau einen Testaufruf zu"""
+        with self._lock:
+            if self.state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                self._probe_in_flight = False
+
+            if self.state == self.CLOSED:
+                return
+            if self.state == self.HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return
+
+            self.rejected += 1
+            raise CircuitOpenError()
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self._probe_in_flight = False
+
+    def release_probe(self):
+        """Der Aufruf endete ohne Aussage über die API (z.B. Programmfehler): Zustand bleibt, ein Testaufruf wird wieder frei"""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def record_throttled(self):
+        """Gedrosselt (429): die API antwortet, der Fehlerzähler bleibt unverändert"""
+        with self._lock:
+            self.throttled += 1
+            if self.state == self.HALF_OPEN:
+                self.state = self.CLOSED
+                self.failures = 0
+                self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self._opened_at = time.monotonic()
+                self._probe_in_flight = False
+
+    def stats(self):
+        """Liefert Zustand und Fehlerzähler des Breakers"""
+        with self._lock:
+            return {
+                'state': self.state,
+                'failures': self.failures,
+                'rejected': self.rejected,
+                'throttled': self.throttled,
+                'failure_threshold': self.failure_threshold,
+                'reset_timeout': self.reset_timeout
+            }
+
+
+def _retry_after(error):
+    # RetryableStatusError bringt den Wert mit, SDK-Fehler nur die Antwort mit dem Header
+    if getattr(error, 'retry_after', None) is not None:
+        return error.retry_after
+    response = getattr(error, 'response', None)
+    try:
+        return max(0.0, float(response.headers.get('retry-after')))
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+
+def _next_delay(error, attempt, is_retryable, retry_policy, circuit_breaker):
+    # Nicht wiederholbare Fehler (400/401, aber auch TypeError o.ä. im eigenen Code) sagen nichts über die
+    # Verfügbarkeit der API und lassen den Breaker unverändert; nur ein belegter Testaufruf wird freigegeben
+    if not is_retryable(error):
+        circuit_breaker.release_probe()
+        return None
+    # Als Ausfall zählen nur 5xx/529, 408 und Verbindungsfehler bzw. Timeouts, nicht die Drosselung
+    if getattr(error, 'status_code', None) in THROTTLED_STATUS_CODES:
+        circuit_breaker.record_throttled()
+    else:
+        circuit_breaker.record_failure()
+    return retry_policy.delay(attempt, _retry_after(error))
+
+
+def retry_call(fn, is_retryable, retry_policy=None, circuit_breaker=None):
+    """Führt `fn` mit Backoff-Wiederholungen hinter dem Circuit-Breaker aus"""
+    retry_policy = retry_policy or get_retry_policy()
+    circuit_breaker = circuit_breaker or get_circuit_breaker()
+    attempt = 0
+    while True:
+        circuit_breaker.before_call()
+        try:
+            result = fn()
+        except Exception as e:
+            attempt += 1
+            delay = _next_delay(e, attempt, is_retryable, retry_policy, circuit_breaker)
+            if delay is None:
+                raise
+            time.sleep(delay)
+            continue
+        circuit_breaker.record_success()
+        return result
+
+
+async def retry_call_async(fn, is_retryable, retry_policy=None, circuit_breaker=None):
+    """Wie retry_call, für Coroutine-Funktionen"""
+    retry_policy = retry_policy or get_retry_policy()
+    circuit_breaker = circuit_breaker or get_circuit_breaker()
+    attempt = 0
+    while True:
+        circuit_breaker.before_call()
+        try:
+            result = await fn()
+        except Exception as e:
+            attempt += 1
+            delay = _next_delay(e, attempt, is_retryable, retry_policy, circuit_breaker)
+            if delay is None:
+                raise
+            await asyncio.sleep(delay)
+            continue
+        circuit_breaker.record_success()
+        return result
+
+
+_retry_policy = None
+_circuit_breaker = None
+_lock = threading.Lock()
+
+
+def get_retry_policy():
+    """Liefert die prozessweite Wiederholungsstrategie, konfiguriert über Umgebungsvariablen"""
+    global _retry_policy
+    with _lock:
+        if _retry_policy is None:
+            _retry_policy = RetryPolicy(
+                max_attempts=int(os.environ.get('LOOKUP_RETRY_ATTEMPTS', DEFAULT_RETRY_ATTEMPTS)),
+                base_delay=float(os.environ.get('LOOKUP_RETRY_BASE_DELAY', DEFAULT_RETRY_BASE_DELAY)),
+                max_delay=float(os.environ.get('LOOKUP_RETRY_MAX_DELAY', DEFAULT_RETRY_MAX_DELAY))
+            )
+        return _retry_policy
+
+
+def get_circuit_breaker():
+    """Liefert den prozessweit geteilten Circuit-Breaker, konfiguriert über Umgebungsvariablen"""
+    global _circuit_breaker
+    with _lock:
+        if _circuit_breaker is None:
+            _circuit_breaker = CircuitBreaker(
+                failure_threshold=int(os.environ.get('CIRCUIT_FAILURE_THRESHOLD', DEFAULT_FAILURE_THRESHOLD)),
+                reset_timeout=float(os.environ.get('CIRCUIT_RESET_TIMEOUT', DEFAULT_RESET_TIMEOUT))
+            )
+        return _circuit_breaker
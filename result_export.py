@@ -0,0 +1,115 @@
+import csv
+import io
+import zipfile
+from xml.sax.saxutils import escape
+
+EXPORT_HEADER = ('Unternehmen', 'Telefon', 'E-Mail', 'Website')
+EXPORT_FIELDS = ('name', 'phone', 'email', 'website')
+
+# So viele Zeilen werden gesammelt, bevor ein Stück an den Client geht
+EXPORT_CHUNK_ROWS = 200
+
+CSV_MIMETYPE = 'text/csv; charset=utf-8'
+XLSX_MIMETYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+
+def export_rows(results):
+    """Kopfzeile und je Ergebnis eine Zeile mit den exportierten Feldern"""
+    yield EXPORT_HEADER
+    for result in results:
+        yield tuple(result.get(field) or '' for field in EXPORT_FIELDS)
+
+
+def iter_csv(rows):
+    """Streamt Zeilen als CSV; Felder mit Trennzeichen, Anführungszeichen oder Umbrüchen werden korrekt gequotet"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    # BOM, damit Excel Umlaute als UTF-8 erkennt
+    buffer.write('\ufeff')
+    for count, row in enumerate(rows, 1):
+        writer.writerow(row)
+        if count % EXPORT_CHUNK_ROWS == 0:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode('utf-8')
+
+
+class _ChunkSink(io.RawIOBase):
+    # Nicht durchsuchbares Ziel für zipfile; geschriebene Bytes werden stückweise abgeholt
+    def __init__(self):
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def take(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+_XLSX_PARTS = {
+    '[Content_Types].xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '</Types>'
+    ),
+    '_rels/.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Target="xl/workbook.xml" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument"/>'
+        '</Relationships>'
+    ),
+    'xl/workbook.xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        '<sheets><sheet name="Unternehmen" sheetId="1" r:id="rId1"/></sheets></workbook>'
+    ),
+    'xl/_rels/workbook.xml.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Target="worksheets/sheet1.xml" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet"/>'
+        '</Relationships>'
+    )
+}
+
+
+def _xlsx_cell(value):
+    # Steuerzeichen sind in XML nicht erlaubt
+    text = ''.join(char for char in str(value) if char >= ' ' or char in '\t\n')
+    return f'<c t="inlineStr"><is><t xml:space="preserve">{escape(text)}</t></is></c>'
+
+
+def iter_xlsx(rows):
+    """Streamt Zeilen als XLSX-Datei (eine Tabelle, Inline-Strings) ohne zusätzliche Abhängigkeit.
+
+    zipfile schreibt auf nicht durchsuchbare Ziele mit Data Descriptors, die
+    Datei entsteht also Stück für Stück und liegt nie ganz im Speicher.
+    """
+    sink = _ChunkSink()
+    with zipfile.ZipFile(sink, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        for name, content in _XLSX_PARTS.items():
+            archive.writestr(name, content)
+        with archive.open('xl/worksheets/sheet1.xml', 'w') as sheet:
+            sheet.write(b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                        b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>')
+            for count, row in enumerate(rows, 1):
+                sheet.write(('<row>' + ''.join(_xlsx_cell(value) for value in row) + '</row>').encode('utf-8'))
+                if count % EXPORT_CHUNK_ROWS == 0:
+                    yield sink.take()
+            sheet.write(b'</sheetData></worksheet>')
+    yield sink.take()
@@ -0,0 +1,72 @@
+import threading
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Fasst gleichzeitige Aufrufe mit demselben Schlüssel zu einem zusammen.
+
+    Der erste Aufrufer führt die Funktion aus, alle weiteren warten auf dessen
+    Ergebnis (oder Fehler) statt selbst eine Anfrage zu starten.
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.executed = 0
+        self.coalesced = 0
+        self.max_waiters = 0
+
+    def do(self, key, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.executed += 1
+            else:
+                call.waiters += 1
+                self.coalesced += 1
+                self.max_waiters = max(self.max_waiters, call.waiters)
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+    def stats(self):
+        """Ausgeführte und zusammengefasste Aufrufe sowie aktuell wartende Aufrufer"""
+        with self._lock:
+            return {
+                'executed': self.executed,
+                'coalesced_waiters': self.coalesced,
+                'max_waiters': self.max_waiters,
+                'in_flight': len(self._calls),
+                'waiting': sum(call.waiters for call in self._calls.values())
+            }
+
+
+_single_flight = SingleFlight()
+
+
+def get_single_flight():
+    """Liefert die prozessweit geteilte Single-Flight-Gruppe für Unternehmensabfragen"""
+    return _single_flight
@@ -0,0 +1,126 @@
+import os
+import re
+import threading
+import time
+from urllib.parse import urlparse
+from company_names import normalize_company_name
+from contact_extract import ContactExtractor
+from crawler import get_crawler
+
+# Strikte Grenzen, damit der Vorab-Scan nie länger dauert als ein Modellaufruf;
+# Byte-Limit, Verbindungen und Pausen je Host regelt der Crawler
+COMPANY_TIME_BUDGET = 10
+MAX_CONTACT_PAGES = 2
+
+# Top-Level-Domains, die für geratene Websites ausprobiert werden
+GUESS_TLDS = ('com', 'de')
+
+
+def scrape_first_default():
+    """Standard für den Website-Vorab-Scan, überschreibbar pro Anfrage"""
+    return os.environ.get('LOOKUP_SCRAPE_FIRST', '').lower() in ('1', 'true', 'yes')
+
+
+def guess_websites(company_name):
+    """Rät Website-URLs aus dem normalisierten Namen, z.B. "Anyline Inc." -> https://www.anyline.com"""
+    slug = ''.join(normalize_company_name(company_name).split())
+    if not re.fullmatch(r'[a-z0-9-]{2,63}', slug):
+        return []
+    return [f"https://www.{slug}.{tld}" for tld in GUESS_TLDS]
+
+
+def _site_url(website):
+    # Bekannte Websites stehen oft ohne Schema im Datensatz ("www.alpha.de")
+    website = website.strip()
+    return website if re.match(r'https?://', website, re.IGNORECASE) else f"https://{website}"
+
+
+class SiteScraper:
+    def __init__(self, crawler=None):
+        self.crawler = crawler or get_crawler()
+        self.pages_fetched = 0
+        self.companies_scraped = 0
+        self.complete = 0
+        self.partial = 0
+        self._lock = threading.Lock()
+
+    def fetch(self, url, deadline, name_token=None):
+        """Lädt eine HTML-Seite über den Crawler innerhalb des Zeitbudgets und extrahiert
+        die Kontaktdaten schon während des Downloads; liefert das Ergebnis oder None"""
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return None
+        extractor = ContactExtractor(name_token)
+        page = self.crawler.fetch(url, timeout=remaining, on_chunk=extractor.feed)
+        if page is None or page.status != 200 or 'html' not in page.content_type:
+            return None
+        extractor.close()
+        with self._lock:
+            self.pages_fetched += 1
+        return extractor.result(page.url)
+
+    def scrape(self, company_name, websites=None):
+        """Sucht Kontaktdaten direkt auf der (bekannten oder geratenen) Website.
+
+        `websites` sind bereits bekannte Kandidaten (z.B. aus dem Cache); sie werden
+        vor den geratenen Domains versucht. Liefert ein Ergebnis-Dict mit den
+        gefundenen Feldern oder None, wenn keine passende Website erreichbar war.
+        """
+        deadline = time.monotonic() + COMPANY_TIME_BUDGET
+        # Die Seite muss den Namen enthalten, sonst gehört die geratene Domain vermutlich jemand anderem
+        name_token = max(normalize_company_name(company_name).split() or [''], key=len)
+
+        candidates = [_site_url(website) for website in websites or [] if website]
+        candidates += [website for website in guess_websites(company_name) if website not in candidates]
+        for website in candidates:
+            found = self.fetch(website, deadline, name_token)
+            if found is None or not found['name_found']:
+                continue
+
+            parsed = urlparse(found['base_url'])
+            result = {
+                'name': company_name,
+                'phone': found['phone'],
+                'email': found['email'],
+                'website': f"{parsed.scheme}://{parsed.netloc}"
+            }
+            for contact_url in found['contact_links'][:MAX_CONTACT_PAGES]:
+                if result['phone'] and result['email']:
+                    break
+                contact = self.fetch(contact_url, deadline)
+                if contact is None:
+                    continue
+                result['phone'] = result['phone'] or contact['phone']
+                result['email'] = result['email'] or contact['email']
+
+            with self._lock:
+                self.companies_scraped += 1
+                if result['phone'] and result['email']:
+                    self.complete += 1
+                else:
+                    self.partial += 1
+            return result
+        return None
+
+    def stats(self):
+        """Liefert Seitenabrufe und wie viele Modellaufrufe der Vorab-Scan ersetzt hat"""
+        with self._lock:
+            return {
+                'pages_fetched': self.pages_fetched,
+                'companies_scraped': self.companies_scraped,
+                'model_calls_avoided': self.complete,
+                'partial': self.partial
+            }
+
+
+_scraper = None
+_scraper_lock = threading.Lock()
+
+
+def get_site_scraper():
+    """Liefert den prozessweit geteilten Scraper"""
+    global _scraper
+    with _scraper_lock:
+        if _scraper is None:
+            _scraper = SiteScraper()
+        return _scraper
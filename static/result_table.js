@@ -0,0 +1,228 @@
+// Virtualisierte Ergebnistabelle: alle Ergebnisse liegen in einem Array, im DOM
+// stehen nur die sichtbaren Zeilen (plus etwas Vorlauf). Neue Ergebnisse werden
+// gesammelt und höchstens einmal pro Frame einsortiert.
+class ResultTable {
+    constructor({ viewport, body, head, rowHeight = 49, overscan = 8 }) {
+        this.viewport = viewport;
+        this.body = body;
+        this.head = head;
+        this.rowHeight = rowHeight;
+        this.overscan = overscan;
+        this.collator = new Intl.Collator('de', { sensitivity: 'base', numeric: true });
+        this.sortField = 'index';
+        this.sortDirection = 1;
+        this.filterText = '';
+        this.clear();
+
+        this.viewport.addEventListener('scroll', () => this.scheduleRender(), { passive: true });
+        window.addEventListener('resize', () => this.scheduleRender());
+        if (this.head) {
+            this.head.addEventListener('click', (e) => {
+                const th = e.target.closest('th[data-sort]');
+                if (th) this.setSort(th.dataset.sort);
+            });
+        }
+    }
+
+    clear() {
+        this.rows = [];
+        this.view = [];
+        this.pending = [];
+        this.viewport.scrollTop = 0;
+        this.rendered = null;
+        this.scheduleRender();
+    }
+
+    get size() {
+        return this.rows.length;
+    }
+
+    // Nimmt ein Ergebnis mit seinem Eingabeindex auf; angezeigt wird es im nächsten Frame
+    add(index, item) {
+        const row = {
+            index: index,
+            name: item.name || '',
+            phone: item.phone || '',
+            email: item.email || '',
+            website: item.website || ''
+        };
+        row.search = `${row.name}\n${row.phone}\n${row.email}\n${row.website}`.toLowerCase();
+        this.rows.push(row);
+        this.pending.push(row);
+        this.scheduleRender();
+    }
+
+    setFilter(text) {
+        this.filterText = text.trim().toLowerCase();
+        this.rebuildView();
+    }
+
+    // Klicks auf dieselbe Spalte wechseln aufsteigend → absteigend → Eingabereihenfolge
+    setSort(field) {
+        if (field !== this.sortField) {
+            this.sortDirection = 1;
+        } else if (this.sortDirection > 0) {
+            this.sortDirection = -1;
+        } else {
+            field = 'index';
+            this.sortDirection = 1;
+        }
+        this.sortField = field;
+        if (this.head) {
+            this.head.querySelectorAll('th[data-sort]').forEach(th => {
+                th.dataset.direction = th.dataset.sort === field ? (this.sortDirection > 0 ? 'asc' : 'desc') : '';
+            });
+        }
+        this.rebuildView();
+    }
+
+    compare(a, b) {
+        const field = this.sortField;
+        let result = field === 'index' ? a.index - b.index : this.collator.compare(a[field], b[field]);
+        // Leere Werte immer ans Ende, gleiche Werte in Eingabereihenfolge
+        if (field !== 'index' && (!a[field] || !b[field]) && a[field] !== b[field]) {
+            return a[field] ? -1 : 1;
+        }
+        if (result === 0) result = a.index - b.index;
+        return result * this.sortDirection;
+    }
+
+    matches(row) {
+        return !this.filterText || row.search.includes(this.filterText);
+    }
+
+    rebuildView() {
+        this.pending = [];
+        this.view = this.rows.filter(row => this.matches(row));
+        this.view.sort((a, b) => this.compare(a, b));
+        this.viewport.scrollTop = 0;
+        this.rendered = null;
+        this.scheduleRender();
+    }
+
+    // Neue Zeilen sortieren und in die bereits sortierte Ansicht einfädeln (linear statt alles neu zu sortieren)
+    mergePending() {
+        const incoming = this.pending.filter(row => this.matches(row));
+        this.pending = [];
+        if (!incoming.length) return;
+        incoming.sort((a, b) => this.compare(a, b));
+
+        const merged = new Array(this.view.length + incoming.length);
+        let i = 0, j = 0, k = 0;
+        while (i < this.view.length && j < incoming.length) {
+            merged[k++] = this.compare(this.view[i], incoming[j]) <= 0 ? this.view[i++] : incoming[j++];
+        }
+        while (i < this.view.length) merged[k++] = this.view[i++];
+        while (j < incoming.length) merged[k++] = incoming[j++];
+        this.view = merged;
+    }
+
+    scheduleRender() {
+        if (this.frame) return;
+        this.frame = requestAnimationFrame(() => {
+            this.frame = null;
+            this.render();
+        });
+    }
+
+    render() {
+        if (this.pending.length) this.mergePending();
+
+        const total = this.view.length;
+        const visible = Math.ceil(this.viewport.clientHeight / this.rowHeight) || 20;
+        // Erste Zeile immer mit geradem Index, damit die Streifen (nth-child) beim Scrollen nicht springen
+        let first = Math.max(0, Math.floor(this.viewport.scrollTop / this.rowHeight) - this.overscan);
+        first -= first % 2;
+        const last = Math.min(total, first + visible + 2 * this.overscan);
+
+        // Unveränderten Ausschnitt nicht neu aufbauen (z.B. wenn neue Ergebnisse außerhalb des Sichtbereichs landen),
+        // sonst gingen Klicks auf gerade ersetzte Zeilen verloren
+        const slice = this.view.slice(first, last);
+        if (this.rendered && this.renderedTotal === total && this.rendered.length === slice.length &&
+                this.rendered.every((row, i) => row === slice[i]) && this.renderedFirst === first) {
+            return;
+        }
+        this.rendered = slice;
+        this.renderedFirst = first;
+        this.renderedTotal = total;
+
+        const fragment = document.createDocumentFragment();
+        fragment.appendChild(this.spacer(first * this.rowHeight));
+        for (const row of slice) {
+            fragment.appendChild(this.renderRow(row));
+        }
+        fragment.appendChild(this.spacer((total - last) * this.rowHeight));
+        this.body.replaceChildren(fragment);
+
+        // Tatsächliche Zeilenhöhe übernehmen (abhängig von Schrift und Bootstrap-Version)
+        const sample = this.body.querySelector('.result-row');
+        if (sample && Math.abs(sample.offsetHeight - this.rowHeight) > 1) {
+            this.rowHeight = sample.offsetHeight;
+            this.rendered = null;
+            this.scheduleRender();
+        }
+    }
+
+    spacer(height) {
+        const tr = document.createElement('tr');
+        tr.className = 'result-spacer';
+        tr.style.height = `${height}px`;
+        return tr;
+    }
+
+    // Zellen über textContent füllen, damit Werte aus Modellantworten nie als HTML interpretiert werden
+    renderRow(row) {
+        const tr = document.createElement('tr');
+        tr.className = 'result-row';
+        tr.style.height = `${this.rowHeight}px`;
+
+        const name = document.createElement('strong');
+        name.textContent = row.name;
+        tr.appendChild(this.cell(name, row.name));
+        tr.appendChild(this.cell(null, row.phone || '-'));
+        tr.appendChild(this.cell(null, row.email || '-'));
+
+        const wrapper = document.createElement('div');
+        wrapper.className = 'd-flex align-items-center justify-content-between';
+        const link = document.createElement('a');
+        link.className = 'text-primary me-2 text-truncate';
+        link.style.maxWidth = '70%';
+        link.target = '_blank';
+        link.textContent = row.website || '-';
+        if (/^https?:\/\//i.test(row.website)) link.href = row.website;
+        wrapper.appendChild(link);
+
+        if ((row.email || row.phone) && row.website) {
+            const button = document.createElement('button');
+            button.className = 'btn btn-sm all-in-one-btn flex-shrink-0';
+            button.dataset.phone = row.phone;
+            button.dataset.email = row.email;
+            button.dataset.website = row.website;
+            button.innerHTML = '<i class="bi bi-lightning-fill"></i> Alles auf einmal';
+            wrapper.appendChild(button);
+        }
+        tr.appendChild(this.cell(wrapper, row.website));
+        return tr;
+    }
+
+    cell(content, text) {
+        const td = document.createElement('td');
+        td.title = text;
+        if (content) {
+            td.appendChild(content);
+        } else {
+            td.textContent = text;
+        }
+        return td;
+    }
+
+    // CSV aller Ergebnisse in Eingabereihenfolge, unabhängig von Filter und Sortierung der Ansicht, korrekt gequotet
+    toCsv() {
+        const quote = value => /[",\n\r]/.test(value) ? `"${value.replace(/"/g, '""')}"` : value;
+        const lines = ['Unternehmen,Telefon,E-Mail,Website'];
+        for (const row of [...this.rows].sort((a, b) => a.index - b.index)) {
+            lines.push([row.name, row.phone, row.email, row.website].map(quote).join(','));
+        }
+        return lines.join('\n') + '\n';
+    }
+}
@@ -0,0 +1,57 @@
+import os
+
+# Werkzeug-Schema für strukturierte Antworten: das Modell muss es aufrufen,
+# die Argumente sind direkt das Ergebnis, ohne JSON aus Freitext zu lesen
+COMPANY_INFO_TOOL = {
+    "name": "record_company_info",
+    "description": "Speichert die gefundenen Kontaktdaten eines Unternehmens.",
+    "input_schema": {
+        "type": "object",
+        "properties": {
+            "name": {"type": "string", "description": "Unternehmensname"},
+            "phone": {"type": ["string", "null"], "description": "Telefonnummer, international formatiert, oder null"},
+            "email": {"type": ["string", "null"], "description": "Allgemeine Kontakt-E-Mail-Adresse oder null"},
+            "website": {"type": ["string", "null"], "description": "Haupt-URL der Website mit https:// oder null"}
+        },
+        "required": ["name", "phone", "email", "website"]
+    }
+}
+
+COMPANY_INFO_TOOL_CHOICE = {"type": "tool", "name": COMPANY_INFO_TOOL["name"]}
+
+# Der Werkzeugaufruf ist klein, eine lange Antwort wird nie benötigt
+STRUCTURED_MAX_TOKENS = 300
+
+
+def partial_tool(fields):
+    """Werkzeug nur für die angegebenen Felder, für gezieltes Nachfragen fehlender Werte"""
+    properties = COMPANY_INFO_TOOL["input_schema"]["properties"]
+    return {
+        "name": "record_missing_fields",
+        "description": "Speichert die fehlenden Kontaktdaten eines Unternehmens.",
+        "input_schema": {
+            "type": "object",
+            "properties": {field: properties[field] for field in fields},
+            "required": list(fields)
+        }
+    }
+
+
+def structured_output_default():
+    """Standard für den strukturierten Modus, überschreibbar pro Anfrage"""
+    return os.environ.get('LOOKUP_STRUCTURED_OUTPUT', '').lower() in ('1', 'true', 'yes')
+
+
+def tool_input(content, tool_name=COMPANY_INFO_TOOL["name"]):
+    """Liefert die Argumente des Werkzeugaufrufs aus den Content-Blöcken oder None.
+
+    Funktioniert mit den Objekten des SDK ebenso wie mit dem rohen JSON der Messages API.
+    """
+    for block in content or []:
+        if isinstance(block, dict):
+            block_type, name, arguments = block.get("type"), block.get("name"), block.get("input")
+        else:
+            block_type, name, arguments = getattr(block, "type", None), getattr(block, "name", None), getattr(block, "input", None)
+        if block_type == "tool_use" and name == tool_name and isinstance(arguments, dict):
+            return arguments
+    return None
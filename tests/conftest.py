@@ -0,0 +1,57 @@
+import http.server
+import os
+import sys
+import tempfile
+import threading
+
+import pytest
+
+# Module liegen flach im Projektverzeichnis
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Prozessweite Speicher (Cache, Jobs) der Tests nicht im gemeinsamen Temp-Verzeichnis anlegen
+_data_dir = tempfile.mkdtemp(prefix='company-lookup-tests-')
+os.environ.setdefault('LOOKUP_CACHE_PATH', os.path.join(_data_dir, 'cache.sqlite3'))
+os.environ.setdefault('JOB_DB_PATH', os.path.join(_data_dir, 'jobs.sqlite3'))
+
+
+class StubSite:
+    """Kleiner lokaler HTTP-Server; `pages` ordnet Pfaden (Status, Content-Type, Body, weitere Header) zu"""
+
+    def __init__(self):
+        self.pages = {}
+        self.requests = []
+        site = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def do_GET(self):
+                site.requests.append(self.path)
+                status, content_type, body, headers = site.pages.get(self.path, (404, 'text/plain', b'nicht gefunden', {}))
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f'http://127.0.0.1:{self.server.server_address[1]}'
+        threading.Thread(target=self.server.serve_forever, args=(0.05,), daemon=True).start()
+
+    def page(self, path, body, status=200, content_type='text/html; charset=utf-8', headers=None):
+        self.pages[path] = (status, content_type, body.encode('utf-8') if isinstance(body, str) else body, headers or {})
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def stub_site():
+    site = StubSite()
+    yield site
+    site.close()
@@ -0,0 +1,67 @@
+import json
+
+from batch_lookup import ResultWriter, completed_indices, read_companies, run
+from claude_client import LookupFailedError
+from worker_pool import WorkerPool
+
+
+class FakeClient:
+    def __init__(self, failing=()):
+        self.failing = set(failing)
+        self.calls = []
+
+    def get_company_info(self, company):
+        self.calls.append(company)
+        if company in self.failing:
+            raise LookupFailedError(company)
+        return {'name': company, 'phone': None, 'email': f'info@{company.lower()}.de', 'website': None}
+
+
+def lookup(input_path, output_path, client):
+    done = completed_indices(str(output_path), 'jsonl')
+    writer = ResultWriter(str(output_path), 'jsonl')
+    try:
+        return run(read_companies(str(input_path), 'csv'), client, WorkerPool(2, 2), writer, done, progress_every=0)
+    finally:
+        writer.close()
+
+
+def output_rows(path):
+    return sorted((row['index'], row['name']) for row in map(json.loads, path.read_text(encoding='utf-8').splitlines()))
+
+
+def test_indices_are_input_row_numbers(tmp_path):
+    source = tmp_path / 'firmen.csv'
+    source.write_text('Firma\nAlpha\n\nBeta\n', encoding='utf-8')
+    assert list(read_companies(str(source), 'csv')) == [(0, 'Alpha'), (2, 'Beta')]
+
+
+def test_failed_lookups_are_not_written_and_retried(tmp_path):
+    source = tmp_path / 'firmen.csv'
+    source.write_text('Firma\nAlpha\n\nBeta\nGamma\n', encoding='utf-8')
+    output = tmp_path / 'ergebnisse.jsonl'
+
+    assert lookup(source, output, FakeClient(failing={'Beta'})) == (2, 0, 1)
+    assert output_rows(output) == [(0, 'Alpha'), (3, 'Gamma')]
+
+    client = FakeClient()
+    assert lookup(source, output, client) == (1, 2, 0)
+    assert client.calls == ['Beta']
+    assert output_rows(output) == [(0, 'Alpha'), (2, 'Beta'), (3, 'Gamma')]
+
+
+def test_partial_last_line_is_truncated(tmp_path):
+    output = tmp_path / 'ergebnisse.jsonl'
+    output.write_text('{"index": 0, "name": "Alpha"}\n{"index": 1, "na', encoding='utf-8')
+    assert completed_indices(str(output), 'jsonl') == {0}
+    assert output.read_text(encoding='utf-8') == '{"index": 0, "name": "Alpha"}\n'
+
+
+def test_csv_output_resume(tmp_path):
+    source = tmp_path / 'firmen.jsonl'
+    source.write_text('"Alpha"\n{"company": "Beta"}\n', encoding='utf-8')
+    output = tmp_path / 'ergebnisse.csv'
+    writer = ResultWriter(str(output), 'csv')
+    run(read_companies(str(source), 'jsonl'), FakeClient(failing={'Alpha'}), WorkerPool(1, 1), writer, set(), 0)
+    writer.close()
+    assert completed_indices(str(output), 'csv') == {1}
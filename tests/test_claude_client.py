@@ -0,0 +1,158 @@
+import contextlib
+import json
+
+import anthropic
+import httpx
+import pytest
+
+import claude_client
+import site_scraper
+from claude_client import MAX_BATCH_SIZE, ClaudeClient, LookupFailedError
+from crawler import Crawler, CrawlerService
+from lookup_cache import LookupCache
+from rate_limiter import RateLimiter
+from site_scraper import SiteScraper
+
+
+class Text:
+    def __init__(self, text):
+        self.text = text
+
+
+class Response:
+    def __init__(self, text):
+        self.content = [Text(text)]
+
+
+@pytest.fixture
+def client(tmp_path, stub_site, monkeypatch):
+    client = ClaudeClient(api_key='test-key', structured_output=False, scrape_first=True, auto_enrich=False)
+    client.cache = LookupCache(path=str(tmp_path / 'cache.sqlite3'))
+    client.scraper = SiteScraper(CrawlerService(Crawler(host_delay=0, cache_dir=str(tmp_path / 'pages'))))
+    monkeypatch.setattr(site_scraper, 'guess_websites', lambda name: [stub_site.url + '/'])
+    client.prompts = []
+    client.answer = '{}'
+
+    def create_message(**kwargs):
+        client.prompts.append(kwargs['messages'][0]['content'])
+        # Eine Liste liefert bei jedem Aufruf die nächste Antwort
+        answer = client.answer.pop(0) if isinstance(client.answer, list) else client.answer
+        if isinstance(answer, Exception):
+            raise answer
+        return Response(answer)
+
+    client._create_message = create_message
+    return client
+
+
+def test_complete_scrape_needs_no_model_call(client, stub_site):
+    stub_site.page('/', '<html><title>Alpha GmbH</title>Tel. +49 30 1234567 '
+                        '<a href="mailto:info@alpha.de">Mail</a></html>')
+    result = client.get_company_info('Alpha GmbH')
+    assert result['phone'] == '+49 30 1234567' and result['email'] == 'info@alpha.de'
+    assert client.prompts == []
+    assert client.model_calls_avoided == 1
+
+
+def test_partial_scrape_asks_only_for_missing_fields(client, stub_site):
+    stub_site.page('/', '<html><title>Alpha GmbH</title>Tel. +49 30 1234567</html>')
+    client.answer = json.dumps({'email': 'kontakt@alpha.de'})
+
+    result = client.get_company_info('Alpha GmbH')
+    assert result['phone'] == '+49 30 1234567'
+    assert result['email'] == 'kontakt@alpha.de'
+    assert result['website'] == stub_site.url
+
+    prompt, = client.prompts
+    # Kurzer Nachfrage-Prompt: bekannte Werte als Kontext, gefragt nur nach der E-Mail-Adresse
+    assert 'Gesucht:\n- E-Mail-Adresse' in prompt
+    assert 'Telefonnummer (bevorzugt' not in prompt
+    assert '+49 30 1234567' in prompt
+
+
+def test_partial_scrape_survives_failed_follow_up(client, stub_site):
+    stub_site.page('/', '<html><title>Alpha GmbH</title>Tel. +49 30 1234567</html>')
+    client.answer = RuntimeError('API nicht erreichbar')
+    result = client.get_company_info('Alpha GmbH')
+    assert result['phone'] == '+49 30 1234567' and result['email'] is None
+
+
+def test_failed_lookup_raises_and_is_not_cached(client):
+    client.answer = RuntimeError('API nicht erreichbar')
+    with pytest.raises(LookupFailedError):
+        client.get_company_info('Unbekannt AG')
+    assert client.cache.get('Unbekannt AG') is None
+
+
+def batch_item(index, name):
+    return {'index': index, 'name': name, 'phone': None, 'email': f'info@{name.lower()}.de', 'website': None}
+
+
+def test_batch_keeps_complete_items_of_truncated_array(client):
+    complete = json.dumps([batch_item(0, 'Alpha'), batch_item(1, 'Beta')])
+    client.answer = [complete[:-1] + ', {"index": 2, "name": "Gam', json.dumps([batch_item(0, 'Gamma')])]
+
+    results = client.get_company_info_batch(['Alpha', 'Beta', 'Gamma'])
+
+    assert [result['email'] for result in results] == ['info@alpha.de', 'info@beta.de', 'info@gamma.de']
+    # Nur der abgeschnittene Eintrag wird erneut angefragt
+    assert '0: Gamma' in client.prompts[1] and 'Alpha' not in client.prompts[1]
+
+
+def test_batch_skips_invalid_items(client):
+    client.answer = [json.dumps([batch_item(0, 'Alpha'), {'index': 7}, 'kaputt', {'index': 1, 'phone': 5}]),
+                     json.dumps([batch_item(0, 'Beta')])]
+
+    results = client.get_company_info_batch(['Alpha', 'Beta'])
+
+    assert [result['email'] for result in results] == ['info@alpha.de', 'info@beta.de']
+    assert len(client.prompts) == 2
+
+
+def test_large_batch_is_split_to_fit_token_limit(client):
+    names = [f'Firma {i}' for i in range(MAX_BATCH_SIZE + 5)]
+    client.answer = [
+        json.dumps([batch_item(i, name) for i, name in enumerate(names[:MAX_BATCH_SIZE])]),
+        json.dumps([batch_item(i, name) for i, name in enumerate(names[MAX_BATCH_SIZE:])])
+    ]
+
+    results = client.get_company_info_batch(names)
+
+    assert len(client.prompts) == 2
+    assert [result['name'] for result in results] == names
+
+
+def test_scrape_uses_website_of_similar_known_company(client, stub_site, monkeypatch):
+    monkeypatch.setattr(site_scraper, 'guess_websites', lambda name: [])
+    client.cache.set('Alphabet Elektrotechnik', {'name': 'Alphabet Elektrotechnik', 'phone': '+49 30 1',
+                                                'email': None, 'website': stub_site.url})
+    stub_site.page('/', '<html><title>Alphabet Elektrotechnik Süd</title>Tel. +49 89 7654321 '
+                        '<a href="mailto:sued@alphabet.de">Mail</a></html>')
+
+    result = client.get_company_info('Alphabet Elektrotechnik Süd')
+
+    assert result['email'] == 'sued@alphabet.de' and result['website'] == stub_site.url
+    assert client.prompts == []
+    assert '/' in stub_site.requests
+
+
+def test_throttling_is_retried_in_one_layer_only(monkeypatch):
+    request = httpx.Request('POST', 'https://api.anthropic.com/v1/messages')
+    attempts = []
+
+    class Messages:
+        def create(self, **kwargs):
+            attempts.append(kwargs['model'])
+            raise anthropic.RateLimitError(
+                'gedrosselt', response=httpx.Response(429, headers={'retry-after': '0'}, request=request), body=None)
+
+    class FakeAnthropic:
+        messages = Messages()
+
+    monkeypatch.setattr(claude_client, 'anthropic_client', lambda api_key: contextlib.nullcontext(FakeAnthropic()))
+    client = ClaudeClient(api_key='test-key', structured_output=False, scrape_first=False, auto_enrich=False)
+    client.rate_limiter = RateLimiter(requests_per_minute=10000, tokens_per_minute=10 ** 7)
+
+    with pytest.raises(anthropic.RateLimitError):
+        client._create_message(model='m', max_tokens=10, system='', messages=[{'role': 'user', 'content': 'x'}])
+    assert len(attempts) == claude_client.MAX_THROTTLE_RETRIES + 1
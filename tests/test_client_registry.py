@@ -0,0 +1,40 @@
+from client_registry import ClientRegistry
+
+
+class FakeClient:
+    def __init__(self, api_key):
+        self.api_key = api_key
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+def test_lease_reuses_client_per_key():
+    registry = ClientRegistry(FakeClient, max_clients=4, idle_timeout=60)
+    with registry.lease('a') as first:
+        pass
+    with registry.lease('a') as second:
+        assert second is first
+    stats = registry.stats()
+    assert (stats['created'], stats['reused'], stats['in_use']) == (1, 1, 0)
+    assert 'pool_size' not in stats
+
+
+def test_evicted_client_is_closed_after_last_lease():
+    registry = ClientRegistry(FakeClient, max_clients=1, idle_timeout=60)
+    with registry.lease('a') as busy:
+        # Verdrängt 'a', während es noch benutzt wird
+        with registry.lease('b'):
+            pass
+        assert registry.stats()['evicted'] == 1
+        assert not busy.closed
+    assert busy.closed
+
+
+def test_idle_client_is_closed_immediately():
+    registry = ClientRegistry(FakeClient, max_clients=1, idle_timeout=60)
+    with registry.lease('a') as idle:
+        pass
+    with registry.lease('b'):
+        assert idle.closed
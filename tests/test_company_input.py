@@ -0,0 +1,96 @@
+import io
+import zipfile
+
+import pytest
+
+import company_input
+from company_input import iter_csv_companies, iter_jsonl_companies, iter_xlsx_companies
+from result_export import iter_xlsx
+
+
+def xlsx_bytes(rows):
+    return b''.join(iter_xlsx(rows))
+
+
+def test_csv_header_and_delimiter_detection():
+    lines = io.StringIO('Nr;Firma;Ort\n1;Alpha GmbH;Berlin\n2;;Köln\n3;Beta AG;Bonn\n', newline='')
+    assert list(iter_csv_companies(lines)) == ['Alpha GmbH', 'Beta AG']
+
+
+def test_csv_without_header_uses_first_column():
+    assert list(iter_csv_companies(['Alpha,Berlin\n', 'Beta,Bonn\n'])) == ['Alpha', 'Beta']
+
+
+def test_csv_unknown_column():
+    with pytest.raises(ValueError):
+        list(iter_csv_companies(['Firma\n', 'Alpha\n'], column='Name'))
+
+
+def test_csv_error_becomes_value_error():
+    huge = 'x' * 200_000
+    with pytest.raises(ValueError, match='CSV-Zeile'):
+        list(iter_csv_companies(['Firma\n', f'"{huge}"\n']))
+
+
+def test_jsonl_numbered():
+    lines = ['"Alpha"\n', '\n', '{"firma": "Beta"}\n']
+    assert list(iter_jsonl_companies(lines, numbered=True)) == [(0, 'Alpha'), (2, 'Beta')]
+
+
+def test_xlsx_round_trip():
+    data = xlsx_bytes([('Unternehmen', 'Telefon'), ('Alpha GmbH', '+49'), ('', ''), ('Beta AG', '')])
+    assert list(iter_xlsx_companies(io.BytesIO(data))) == ['Alpha GmbH', 'Beta AG']
+
+
+def test_xlsx_not_a_zip():
+    with pytest.raises(ValueError):
+        list(iter_xlsx_companies(io.BytesIO(b'PK\x03\x04 kein zip')))
+
+
+def test_xlsx_broken_workbook_xml():
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as archive:
+        archive.writestr('xl/workbook.xml', '<workbook')
+        archive.writestr('xl/_rels/workbook.xml.rels', '<Relationships/>')
+    with pytest.raises(ValueError, match='Arbeitsmappe'):
+        list(iter_xlsx_companies(io.BytesIO(buffer.getvalue())))
+
+
+def test_xlsx_corrupt_member_data():
+    data = bytearray(xlsx_bytes([('Firma',)] + [(f'Unternehmen {i}',) for i in range(2000)]))
+    # Mitten in den komprimierten Daten der Tabelle Bytes verfälschen
+    offset = data.index(b'xl/worksheets/sheet1.xml') + 200
+    data[offset:offset + 64] = bytes(64)
+    with pytest.raises(ValueError):
+        list(iter_xlsx_companies(io.BytesIO(bytes(data))))
+
+
+def xlsx_with_sheet(sheet, shared=None):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as archive:
+        ns = 'xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"'
+        archive.writestr('xl/worksheets/sheet1.xml', f'<worksheet {ns}><sheetData>{sheet}</sheetData></worksheet>')
+        if shared is not None:
+            items = ''.join(f'<si><t>{text}</t></si>' for text in shared)
+            archive.writestr('xl/sharedStrings.xml', f'<sst {ns}>{items}</sst>')
+    return io.BytesIO(buffer.getvalue())
+
+
+def test_xlsx_cell_reference_positions_value():
+    file = xlsx_with_sheet('<row><c r="C1" t="inlineStr"><is><t>Firma</t></is></c></row>'
+                           '<row><c r="XFD2" t="inlineStr"><is><t>weit rechts</t></is></c>'
+                           '<c r="C2" t="s"><v>0</v></c></row>', shared=['Alpha GmbH'])
+    assert list(iter_xlsx_companies(file)) == ['Alpha GmbH']
+
+
+def test_xlsx_cell_reference_beyond_last_column():
+    file = xlsx_with_sheet('<row><c r="ZZZZZZ1" t="inlineStr"><is><t>Firma</t></is></c></row>')
+    with pytest.raises(ValueError, match='außerhalb'):
+        list(iter_xlsx_companies(file))
+
+
+def test_xlsx_shared_strings_limit(monkeypatch):
+    monkeypatch.setattr(company_input, 'XLSX_MAX_SHARED_CHARS', 10)
+    file = xlsx_with_sheet('<row><c r="A1" t="s"><v>0</v></c></row>', shared=['Firma', 'Alpha GmbH'])
+    with pytest.raises(ValueError, match='zu groß'):
+        list(iter_xlsx_companies(file))
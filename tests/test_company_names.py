@@ -0,0 +1,13 @@
+from company_names import CompanyDeduper, dedupe_companies, normalize_company_name
+
+
+def test_normalize_strips_legal_form_and_accents():
+    assert normalize_company_name('Müller & Söhne GmbH & Co. KG') == 'muller sohne'
+
+
+def test_deduper_matches_dedupe_companies():
+    names = ['Alpha GmbH', 'alpha', 'Beta AG', 'BETA', 'Gamma', 'Alpha GmbH']
+    unique, _ = dedupe_companies(names)
+    deduper = CompanyDeduper()
+    assert list(deduper.filter(names)) == unique
+    assert deduper.duplicates == len(names) - len(unique)
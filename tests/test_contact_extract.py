@@ -0,0 +1,36 @@
+from contact_extract import ContactExtractor, extract_contacts
+
+BASE_URL = 'https://www.firma.de/'
+
+
+def test_script_spanning_chunks_is_not_visible_text():
+    script = '<script>' + 'var a = 1; ' * 3000 + 'var e="support@tracker.io";</script>'
+    page = f'<html><body>{script}<p>Willkommen</p></body></html>'
+
+    assert len(script) > 16384
+    assert extract_contacts(page, BASE_URL)['email'] is None
+
+
+def test_text_after_long_script_is_scanned():
+    page = ('<script>' + 'if (a > b) { c(); } ' * 2000 + '</script>'
+            '<p>E-Mail: info@firma.de</p>')
+
+    assert extract_contacts(page, BASE_URL, chunk_size=4096)['email'] == 'info@firma.de'
+
+
+def test_comment_and_style_spanning_chunks_are_skipped():
+    extractor = ContactExtractor()
+    for chunk in (b'<p>Hallo</p><!-- alt: ', b'alt@firma.de > neu -->', b'<style>a > b {}', b' x@y.de </style>'):
+        extractor.feed(chunk)
+    extractor.close()
+
+    assert extractor.email is None
+
+
+def test_mailto_link_wins_over_text():
+    page = '<p>info@firma.de</p><a href="mailto:kontakt@firma.de">Kontakt</a><a href="/impressum">Impressum</a>'
+
+    found = extract_contacts(page, BASE_URL)
+
+    assert found['email'] == 'kontakt@firma.de'
+    assert found['contact_links'] == ['https://www.firma.de/impressum']
@@ -0,0 +1,162 @@
+import asyncio
+import threading
+
+import pytest
+
+from contact_extract import ContactExtractor
+from crawler import Crawler
+
+
+@pytest.fixture
+def crawler(tmp_path):
+    return Crawler(host_delay=0, cache_dir=str(tmp_path / 'pages'))
+
+
+def fetch(crawler, *urls):
+    async def run():
+        try:
+            return [await crawler.fetch(url) for url in urls]
+        finally:
+            await crawler._client.aclose()
+    return asyncio.run(run())
+
+
+def test_missing_robots_allows_everything(crawler, stub_site):
+    stub_site.page('/', '<p>Kontakt</p>')
+
+    page, = fetch(crawler, stub_site.url + '/')
+
+    assert page.status == 200
+    assert stub_site.requests == ['/robots.txt', '/']
+
+
+def test_forbidden_robots_blocks_host(crawler, stub_site):
+    stub_site.page('/robots.txt', 'gesperrt', status=403, content_type='text/plain')
+    stub_site.page('/', '<p>Kontakt</p>')
+
+    assert fetch(crawler, stub_site.url + '/') == [None]
+    assert crawler.stats()['robots_blocked'] == 1
+
+
+def test_server_error_on_robots_blocks_until_retry(crawler, stub_site):
+    stub_site.page('/robots.txt', 'kaputt', status=503, content_type='text/plain')
+    stub_site.page('/', '<p>Kontakt</p>')
+    crawler.robots_error_ttl = 0.2
+
+    async def run():
+        try:
+            blocked = await crawler.fetch(stub_site.url + '/')
+            stub_site.page('/robots.txt', 'User-agent: *\nAllow: /\n', content_type='text/plain')
+            still_blocked = await crawler.fetch(stub_site.url + '/')
+            await asyncio.sleep(0.3)
+            return blocked, still_blocked, await crawler.fetch(stub_site.url + '/')
+        finally:
+            await crawler._client.aclose()
+
+    blocked, still_blocked, page = asyncio.run(run())
+
+    assert blocked is None and still_blocked is None
+    assert page.status == 200
+    assert stub_site.requests == ['/robots.txt', '/robots.txt', '/']
+
+
+def test_unreachable_robots_blocks_host(crawler):
+    # Auf Port 9 (discard) lauscht lokal niemand
+    assert fetch(crawler, 'http://127.0.0.1:9/') == [None]
+    assert crawler.stats()['robots_blocked'] == 1
+
+
+def test_least_recently_used_hosts_are_forgotten(crawler, stub_site):
+    stub_site.page('/', '<p>Kontakt</p>')
+    crawler.max_hosts = 1
+    port = stub_site.url.rsplit(':', 1)[1]
+
+    fetch(crawler, stub_site.url + '/', f'http://localhost:{port}/')
+
+    assert crawler.stats()['hosts'] == 1
+    assert list(crawler._hosts) == [f'localhost:{port}']
+
+
+def test_hosts_in_use_are_not_evicted(crawler):
+    crawler.max_hosts = 1
+    busy = crawler._host('http://a.example/')
+    busy.users += 1
+
+    crawler._host('http://b.example/')
+    assert list(crawler._hosts) == ['a.example', 'b.example']
+
+    busy.users -= 1
+    crawler._host('http://c.example/')
+    assert list(crawler._hosts) == ['c.example']
+
+
+def test_chunk_at_size_limit_is_still_parsed(tmp_path, stub_site):
+    crawler = Crawler(host_delay=0, max_bytes=1000, cache_dir=str(tmp_path / 'pages'))
+    stub_site.page('/', 'x' * 900 + '<a href="mailto:info@firma.de">Mail</a>' + 'x' * 5000)
+    extractor = ContactExtractor()
+    threads = []
+
+    def feed(chunk, encoding):
+        threads.append(threading.current_thread().name)
+        return extractor.feed(chunk, encoding)
+
+    async def run():
+        try:
+            return await crawler.fetch(stub_site.url + '/', on_chunk=feed)
+        finally:
+            await crawler._client.aclose()
+
+    page = asyncio.run(run())
+    extractor.close()
+
+    assert len(page.text) == 1000
+    assert crawler.stats()['truncated'] == 1
+    assert extractor.email == 'info@firma.de'
+    assert extractor.bytes_scanned == 1000
+    assert threads and all(name.startswith('crawler-parse') for name in threads)
+
+
+def test_truncated_page_is_not_cached(tmp_path, stub_site):
+    crawler = Crawler(host_delay=0, max_bytes=100, cache_dir=str(tmp_path / 'pages'))
+    stub_site.page('/', 'x' * 500, headers={'ETag': '"v1"'})
+
+    page, = fetch(crawler, stub_site.url + '/')
+
+    assert not page.complete
+    assert crawler.cache.get(stub_site.url + '/') is None
+
+
+def test_revalidated_page_comes_from_cache(crawler, stub_site):
+    stub_site.page('/', '<p>Kontakt</p>', headers={'ETag': '"v1"'})
+
+    first, = fetch(crawler, stub_site.url + '/')
+    stub_site.page('/', '', status=304)
+    crawler._client = None
+    second, = fetch(crawler, stub_site.url + '/')
+
+    assert not first.from_cache
+    assert second.from_cache and second.text == '<p>Kontakt</p>'
+
+
+def test_redirect_target_is_checked_against_its_robots_txt(crawler, stub_site):
+    port = stub_site.url.rsplit(':', 1)[1]
+    target = f'http://localhost:{port}/kontakt'
+    stub_site.page('/', '', status=301, headers={'Location': target})
+    stub_site.page('/kontakt', '<p>Kontakt</p>')
+
+    page, = fetch(crawler, stub_site.url + '/')
+    assert page.url == target and page.status == 200
+    assert set(crawler._hosts) == {f'127.0.0.1:{port}', f'localhost:{port}'}
+
+    # Verbietet robots.txt das Ziel, wird die Weiterleitung nicht verfolgt
+    blocked = Crawler(host_delay=0, cache_dir=crawler.cache.directory)
+    stub_site.page('/robots.txt', 'User-agent: *\nDisallow: /kontakt\n', content_type='text/plain')
+    assert fetch(blocked, stub_site.url + '/') == [None]
+    assert blocked.stats()['robots_blocked'] == 1
+
+
+def test_redirect_loop_gives_up(crawler, stub_site):
+    stub_site.page('/', '', status=302, headers={'Location': '/'})
+
+    assert fetch(crawler, stub_site.url + '/') == [None]
+    assert crawler.stats()['redirects'] == 6
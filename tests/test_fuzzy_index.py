@@ -0,0 +1,64 @@
+import sqlite3
+
+import pytest
+
+from fuzzy_index import BUCKET_VERSION, best_match, buckets, plausible_typo
+from lookup_cache import LookupCache
+
+
+def test_buckets_are_stable_across_processes_and_platforms():
+    # Gespeicherte Buckets müssen überall gleich berechnet werden; der Wert darf sich nur mit BUCKET_VERSION ändern
+    assert buckets('alpha')[:2] == [1576323213414757412, 8910816420128831744]
+    assert all(-2 ** 63 <= bucket < 2 ** 63 for bucket in buckets('müller maschinenbau'))
+
+
+def test_similar_names_share_a_bucket():
+    assert set(buckets('mueller maschinenbau')) & set(buckets('mueler maschinenbau'))
+
+
+@pytest.mark.parametrize('key, candidate, expected', [
+    ('mueler maschinenbau', 'mueller maschinenbau', True),
+    ('muellre maschinenbau', 'mueller maschinenbau', True),
+    ('mueller maschinenbau', 'mueller maschinenbau', True),
+    ('bauer elektro 2', 'bauer elektro 3', False),
+    ('abc consulting', 'abd consulting', False),
+    ('mueler maschinenbau nord', 'mueller maschinenbau', False),
+    ('mueler maschinnbau', 'mueller maschinenbau', False),
+    ('mueller', 'muellerei', False),
+])
+def test_plausible_typo(key, candidate, expected):
+    assert plausible_typo(key, candidate) is expected
+
+
+def test_best_match_threshold():
+    assert best_match('mueler maschinenbau', ['mueller maschinenbau', 'meyer bau'], 0.6)[0] == 'mueller maschinenbau'
+    assert best_match('voellig anders', ['mueller maschinenbau'], 0.6) is None
+
+
+def test_fuzzy_lookup_flags_typos(tmp_path):
+    cache = LookupCache(path=str(tmp_path / 'cache.sqlite3'))
+    cache.set('Müller Maschinenbau GmbH', {'name': 'Müller Maschinenbau GmbH', 'website': 'https://mueller.de'})
+    cache.set('Bauer Elektro 2', {'name': 'Bauer Elektro 2', 'phone': '+49 30 1234567'})
+
+    record, similarity, typo = cache.fuzzy_lookup('Muller Maschienbau', 0.5)
+    assert record['website'] == 'https://mueller.de' and typo
+    record, similarity, typo = cache.fuzzy_lookup('Bauer Elektro 3', 0.5)
+    assert record['name'] == 'Bauer Elektro 2' and not typo
+
+
+def test_old_bucket_scheme_is_reindexed(tmp_path):
+    path = str(tmp_path / 'cache.sqlite3')
+    cache = LookupCache(path=path)
+    cache.set('Müller Maschinenbau GmbH', {'name': 'Müller Maschinenbau GmbH', 'website': 'https://mueller.de'})
+    cache._conn.close()
+
+    # Datei mit Buckets aus einem älteren Schema vortäuschen
+    conn = sqlite3.connect(path)
+    conn.execute("UPDATE lookup_buckets SET bucket = bucket + 1")
+    conn.execute("PRAGMA user_version = 1")
+    conn.commit()
+    conn.close()
+
+    cache = LookupCache(path=path)
+    assert cache._conn.execute("PRAGMA user_version").fetchone()[0] == BUCKET_VERSION
+    assert cache.fuzzy_lookup('Muller Maschienbau', 0.5) is not None
@@ -0,0 +1,80 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+import app as app_module
+from jobs import JobRunner, JobStore
+from worker_pool import WorkerPool
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class FakeClient:
+    def __init__(self, api_key):
+        pass
+
+    def get_company_info(self, company):
+        return {'name': company, 'phone': None, 'email': None, 'website': None}
+
+
+@pytest.fixture
+def runner(tmp_path, monkeypatch):
+    runner = JobRunner(JobStore(path=str(tmp_path / 'jobs.sqlite3')), FakeClient, pool=WorkerPool(2, 10, retry_after=0))
+    monkeypatch.setattr(app_module, 'job_runner', runner)
+    return runner
+
+
+@pytest.fixture
+def client():
+    return app_module.app.test_client()
+
+
+def test_resume_of_job_running_elsewhere_is_refused(client, runner):
+    store = runner.store
+    job_id = store.create_job(['Alpha'], 'test-key')
+    for _ in range(store.max_attempts):
+        store.record_failure(job_id, 0)
+    assert store.acquire_lease(job_id, 'other-process', 60)
+
+    response = client.post(f'/jobs/{job_id}/resume', json={'anthropicKey': 'test-key'})
+
+    assert response.status_code == 409
+    # Die Fehlversuche bleiben, bis der Job tatsächlich neu gestartet wird
+    assert store.get_job(job_id)['failed'] == 1
+
+
+def test_importing_app_does_not_resume_jobs(tmp_path):
+    path = str(tmp_path / 'jobs.sqlite3')
+    store = JobStore(path=path)
+    job_id = store.create_job(['Alpha'], 'test-key')
+    store.set_status(job_id, 'interrupted')
+
+    env = dict(os.environ, JOB_DB_PATH=path, ANTHROPIC_API_KEY='test-key')
+    subprocess.run([sys.executable, '-c', 'import app'], cwd=ROOT, env=env, check=True, timeout=60)
+
+    job = JobStore(path=path).get_job(job_id)
+    assert job['status'] == 'interrupted' and job['done'] == 0
+
+
+def test_results_since_cursor_returns_only_new_rows_in_completion_order(client, runner):
+    store = runner.store
+    job_id = store.create_job(['Alpha', 'Beta', 'Gamma'], 'test-key')
+    store.save_result(job_id, 2, {'name': 'Gamma'})
+    store.save_result(job_id, 0, {'name': 'Alpha'})
+
+    lines = [json.loads(line) for line in client.get(f'/jobs/{job_id}/results?since=0&limit=1').text.splitlines()]
+    assert [(line['index'], line['seq']) for line in lines] == [(2, 1)]
+    lines = [json.loads(line) for line in client.get(f'/jobs/{job_id}/results?since=1').text.splitlines()]
+    assert [(line['index'], line['seq']) for line in lines] == [(0, 2)]
+
+    # Später fertig gewordene Einträge mit kleinerem Index werden nicht übersehen
+    store.save_result(job_id, 1, {'name': 'Beta'})
+    lines = [json.loads(line) for line in client.get(f'/jobs/{job_id}/results?since=2').text.splitlines()]
+    assert [(line['index'], line['data']['name']) for line in lines] == [(1, 'Beta')]
+
+    # Ohne Zeiger wie bisher alles in Eingabereihenfolge
+    lines = [json.loads(line) for line in client.get(f'/jobs/{job_id}/results').text.splitlines()]
+    assert [line['index'] for line in lines] == [0, 1, 2]
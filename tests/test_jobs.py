@@ -0,0 +1,192 @@
+import sqlite3
+import threading
+import time
+
+import pytest
+
+from jobs import JobRunner, JobStore
+from worker_pool import WorkerPool
+
+
+class FakeClient:
+    """Liefert Ergebnisse sofort; Namen in `failures` schlagen so oft fehl wie angegeben"""
+
+    calls = []
+    failures = {}
+
+    def __init__(self, api_key):
+        self.api_key = api_key
+
+    def get_company_info(self, company):
+        FakeClient.calls.append(company)
+        if FakeClient.failures.get(company, 0) > 0:
+            FakeClient.failures[company] -= 1
+            raise RuntimeError('API nicht erreichbar')
+        return {'name': company, 'phone': '+49 30 123456', 'email': None, 'website': None}
+
+
+@pytest.fixture(autouse=True)
+def reset_client():
+    FakeClient.calls = []
+    FakeClient.failures = {}
+
+
+@pytest.fixture
+def store(tmp_path):
+    return JobStore(path=str(tmp_path / 'jobs.sqlite3'), max_attempts=3)
+
+
+@pytest.fixture
+def pool():
+    return WorkerPool(max_workers=2, queue_size=10, retry_after=0)
+
+
+def wait_until_finished(store, job_id, timeout=5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = store.get_job(job_id)
+        if job['status'] != 'running':
+            return job
+        time.sleep(0.02)
+    raise AssertionError(f'Job {job_id} nicht fertig geworden')
+
+
+def test_failed_items_are_retried_and_not_saved_as_results(store, pool):
+    FakeClient.failures = {'Beta': 1, 'Gamma': 10}
+    runner = JobRunner(store, FakeClient, pool=pool)
+    job_id = runner.submit(['Alpha', 'Beta', 'Gamma'], 'key')
+
+    job = wait_until_finished(store, job_id)
+    assert job['status'] == 'done'
+    assert (job['done'], job['failed']) == (2, 1)
+    assert [i for i, _ in store.iter_results(job_id)] == [0, 1]
+    # Gamma wurde genau max_attempts-mal versucht
+    assert FakeClient.calls.count('Gamma') == 3
+
+
+def test_resume_retries_exhausted_items(store, pool):
+    FakeClient.failures = {'Gamma': 3}
+    runner = JobRunner(store, FakeClient, pool=pool)
+    job_id = runner.submit(['Gamma'], 'key')
+    assert wait_until_finished(store, job_id)['failed'] == 1
+
+    assert runner.start(job_id, 'key', retry_failed=True) is True
+    job = wait_until_finished(store, job_id)
+    assert (job['done'], job['failed']) == (1, 0)
+
+
+def test_resume_all_continues_only_pending_items(store, pool):
+    job_id = store.create_job(['Alpha', 'Beta'], 'key')
+    store.save_result(job_id, 0, {'name': 'Alpha'})
+    store.set_status(job_id, 'interrupted')
+
+    JobRunner(store, FakeClient, pool=pool).resume_all('key')
+    assert wait_until_finished(store, job_id)['done'] == 2
+    assert FakeClient.calls == ['Beta']
+
+
+def test_resume_all_marks_foreign_jobs_interrupted(store, pool):
+    job_id = store.create_job(['Alpha'], 'other-key')
+    JobRunner(store, FakeClient, pool=pool).resume_all('key')
+    assert store.get_job(job_id)['status'] == 'interrupted'
+    assert FakeClient.calls == []
+
+
+def test_lease_keeps_second_runner_out(store, pool):
+    job_id = store.create_job(['Alpha'], 'key')
+    # Ein anderer Prozess hält die Sperre
+    assert store.acquire_lease(job_id, 'other-process', 60)
+
+    runner = JobRunner(store, FakeClient, pool=pool)
+    assert runner.start(job_id, 'key') is False
+    runner.resume_all('key')
+    time.sleep(0.1)
+    assert FakeClient.calls == []
+    assert store.get_job(job_id)['status'] == 'running'
+
+
+def test_expired_lease_is_taken_over(store, pool):
+    job_id = store.create_job(['Alpha'], 'key')
+    assert store.acquire_lease(job_id, 'crashed-process', -1)
+
+    assert JobRunner(store, FakeClient, pool=pool).start(job_id, 'key') is True
+    assert wait_until_finished(store, job_id)['done'] == 1
+    assert not store.is_leased(job_id)
+
+
+def test_old_database_is_migrated(tmp_path):
+    path = str(tmp_path / 'old.sqlite3')
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE jobs (id TEXT PRIMARY KEY, status TEXT NOT NULL, key_hash TEXT NOT NULL, "
+                 "total INTEGER NOT NULL, created_at REAL NOT NULL, updated_at REAL NOT NULL)")
+    conn.execute("CREATE TABLE job_items (job_id TEXT NOT NULL, idx INTEGER NOT NULL, company TEXT NOT NULL, "
+                 "result TEXT, PRIMARY KEY (job_id, idx))")
+    conn.execute("INSERT INTO jobs VALUES ('old', 'interrupted', 'hash', 1, 0, 0)")
+    conn.execute("INSERT INTO job_items VALUES ('old', 0, 'Alpha', NULL)")
+    conn.commit()
+    conn.close()
+
+    store = JobStore(path=path)
+    assert store.pending_items('old', 10) == [(0, 'Alpha')]
+    assert store.get_job('old')['failed'] == 0
+
+
+def test_stream_jobs_are_not_resumed(store, pool):
+    stream_id = store.create_job(['Alpha'], 'key', kind='stream')
+    store.set_status(stream_id, 'interrupted')
+    upload_id = store.create_job(['Beta'], 'key', kind='upload')
+    store.set_status(upload_id, 'interrupted')
+
+    JobRunner(store, FakeClient, pool=pool).resume_all('key')
+    assert wait_until_finished(store, upload_id)['status'] == 'done'
+    assert store.get_job(stream_id)['status'] == 'interrupted'
+    assert FakeClient.calls == ['Beta']
+
+
+def test_sweep_deletes_only_expired_idle_jobs(tmp_path):
+    store = JobStore(path=str(tmp_path / 'jobs.sqlite3'), retention=3600)
+    old_id = store.create_job(['Alpha'], 'key')
+    running_id = store.create_job(['Beta'], 'key')
+    fresh_id = store.create_job(['Gamma'], 'key')
+    with store._lock:
+        store._conn.execute("UPDATE jobs SET updated_at = 0 WHERE id IN (?, ?)", (old_id, running_id))
+        store._conn.commit()
+    store.acquire_lease(running_id, 'runner', 60)
+
+    assert store.sweep(force=True) == 1
+    assert store.get_job(old_id) is None
+    assert store.pending_items(old_id, 10) == []
+    assert store.get_job(running_id) is not None
+    assert store.get_job(fresh_id) is not None
+
+
+def test_lease_is_renewed_while_slow_lookups_run(store):
+    class SlowClient(FakeClient):
+        def get_company_info(self, company):
+            time.sleep(0.5)
+            return super().get_company_info(company)
+
+    pool = WorkerPool(max_workers=1, queue_size=10, retry_after=0)
+    runner = JobRunner(store, SlowClient, pool=pool, lease_seconds=0.2)
+    job_id = runner.submit(['Alpha'], 'key')
+
+    time.sleep(0.35)
+    # Ohne Verlängerung wäre die Sperre jetzt abgelaufen und ein zweiter Prozess könnte übernehmen
+    assert not store.acquire_lease(job_id, 'other-process', 60)
+    assert wait_until_finished(store, job_id)['done'] == 1
+    assert FakeClient.calls == ['Alpha']
+
+
+def test_start_refuses_running_job(store, pool):
+    release = threading.Event()
+
+    class BlockingClient(FakeClient):
+        def get_company_info(self, company):
+            release.wait(5)
+            return super().get_company_info(company)
+
+    runner = JobRunner(store, BlockingClient, pool=pool)
+    job_id = runner.submit(['Alpha'], 'key')
+    assert runner.start(job_id, 'key') is False
+    release.set()
+    assert wait_until_finished(store, job_id)['done'] == 1
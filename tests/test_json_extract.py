@@ -0,0 +1,42 @@
+import pytest
+
+from json_extract import JsonExtractionError, extract_json, extract_json_items
+
+
+def test_code_block_and_surrounding_text():
+    text = 'Hier das Ergebnis:\n```json\n{"name": "Alpha", "phone": null}\n```\nViel Erfolg {'
+    assert extract_json(text, dict) == {'name': 'Alpha', 'phone': None}
+
+
+def test_truncated_object_does_not_return_nested_object():
+    text = '{"name": "Alpha", "address": {"city": "Berlin"}, "phone": "+49 30'
+    with pytest.raises(JsonExtractionError) as error:
+        extract_json(text, dict)
+    assert error.value.reason == 'invalid_json'
+
+
+def test_object_after_broken_one_is_found():
+    text = '{name: kaputt, "x": {"y": 1}} danach {"name": "Beta"}'
+    assert extract_json(text, dict) == {'name': 'Beta'}
+
+
+def test_nested_value_of_wrong_type_is_skipped():
+    # Gesucht ist ein Array; das Array innerhalb des Objekts gehört nicht dazu
+    text = '{"items": [1, 2]} [{"index": 0}]'
+    assert extract_json(text, list) == [{'index': 0}]
+
+
+def test_missing_json():
+    with pytest.raises(JsonExtractionError) as error:
+        extract_json('Keine Angaben gefunden.', dict)
+    assert error.value.reason == 'no_json'
+
+
+def test_items_of_truncated_array():
+    text = '[{"index": 0}, {"index": 1, "tags": ["a"]}, {"index": 2, "na'
+    assert extract_json_items(text) == [{'index': 0}, {'index': 1, 'tags': ['a']}]
+
+
+def test_items_of_empty_and_complete_array():
+    assert extract_json_items('```json\n[ ]\n```') == []
+    assert extract_json_items('[1, 2]') == [1, 2]
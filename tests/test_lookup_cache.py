@@ -0,0 +1,93 @@
+import threading
+import time
+
+import pytest
+
+from claude_client import ClaudeClient
+from lookup_cache import LookupCache
+
+EMPTY = {'name': 'Alpha', 'phone': None, 'email': None, 'website': None}
+FOUND = {'name': 'Alpha', 'phone': '+49 30 123456', 'email': 'info@alpha.de', 'website': 'https://alpha.de'}
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return LookupCache(path=str(tmp_path / 'cache.sqlite3'), ttl=100, negative_ttl=10, stale_ttl=50)
+
+
+def age(cache, company_key, seconds):
+    # Eintrag künstlich altern lassen, statt die Uhr zu verstellen
+    with cache._lock:
+        cache._conn.execute("UPDATE lookups SET created_at = created_at - ? WHERE key = ?", (seconds, company_key))
+        cache._conn.commit()
+
+
+def test_empty_result_is_cached_only_when_negative(cache):
+    cache.set('Alpha', EMPTY)
+    assert cache.lookup('Alpha') == (None, False)
+    cache.set('Alpha', EMPTY, negative=True)
+    assert cache.lookup('Alpha') == (EMPTY, False)
+
+
+def test_negative_entry_expires_after_its_ttl(cache):
+    cache.set('Alpha', EMPTY, negative=True)
+    age(cache, 'alpha', 9)
+    assert cache.lookup('Alpha') == (EMPTY, False)
+    assert cache.stats()['negative_hits'] == 1
+
+    age(cache, 'alpha', 2)
+    assert cache.lookup('Alpha') == (None, False)
+    # Abgelaufene Einträge werden gelöscht, nicht nur übersprungen
+    assert cache._conn.execute("SELECT COUNT(*) FROM lookups").fetchone()[0] == 0
+
+
+def test_positive_entry_goes_stale_then_expires(cache):
+    cache.set('Alpha', FOUND)
+    assert cache.lookup('Alpha') == (FOUND, False)
+
+    age(cache, 'alpha', 120)
+    assert cache.lookup('Alpha') == (FOUND, True)
+    # get() liefert nur frische Einträge
+    assert cache.get('Alpha') is None
+
+    age(cache, 'alpha', 40)
+    assert cache.lookup('Alpha') == (None, False)
+
+
+class Text:
+    def __init__(self, text):
+        self.text = text
+
+
+class Response:
+    def __init__(self, text):
+        self.content = [Text(text)]
+
+
+def test_stale_entry_is_served_while_one_background_refresh_runs(cache):
+    client = ClaudeClient(api_key='test-key', structured_output=False, scrape_first=False, auto_enrich=False)
+    client.cache = cache
+    cache.set('Alpha', FOUND)
+    age(cache, 'alpha', 120)
+
+    release = threading.Event()
+    calls = []
+
+    def create_message(**kwargs):
+        calls.append(kwargs['messages'][0]['content'])
+        release.wait(5)
+        return Response('{"name": "Alpha", "phone": "+49 30 999", "email": "neu@alpha.de", "website": null}')
+
+    client._create_message = create_message
+
+    # Beide Anfragen bekommen sofort den veralteten Eintrag, erneuert wird nur einmal
+    assert client.get_company_info('Alpha')['email'] == 'info@alpha.de'
+    assert client.get_company_info('Alpha')['email'] == 'info@alpha.de'
+    release.set()
+
+    deadline = time.monotonic() + 5
+    while cache.lookup('Alpha')[1] and time.monotonic() < deadline:
+        time.sleep(0.02)
+    assert cache.lookup('Alpha') == ({'name': 'Alpha', 'phone': '+49 30 999', 'email': 'neu@alpha.de',
+                                      'website': None}, False)
+    assert len(calls) == 1
@@ -0,0 +1,83 @@
+import pytest
+
+import rate_limiter
+from rate_limiter import RateLimiter, TokenBucket, parse_retry_after
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(rate_limiter.time, 'monotonic', clock.monotonic)
+    monkeypatch.setattr(rate_limiter.time, 'sleep', clock.sleep)
+    return clock
+
+
+def test_bucket_refills_up_to_capacity():
+    bucket = TokenBucket(60)
+    bucket.level = 0.0
+    bucket.refill(10)
+    assert bucket.level == 10
+    assert bucket.wait_time(15) == 5
+    bucket.refill(120)
+    assert bucket.level == 60
+
+
+def test_acquire_reserves_requests_and_tokens(clock):
+    limiter = RateLimiter(requests_per_minute=60, tokens_per_minute=6000)
+    limiter.acquire(1000)
+    stats = limiter.stats()
+    assert stats['requests_available'] == 59 and stats['tokens_available'] == 5000
+    assert clock.sleeps == []
+
+
+def test_acquire_waits_for_refill(clock):
+    limiter = RateLimiter(requests_per_minute=60, tokens_per_minute=6000)
+    limiter.acquire(6000)
+    # Der Token-Bucket ist leer; 3000 Tokens kommen bei 100 pro Sekunde nach 30 s wieder
+    limiter.acquire(3000)
+    assert sum(clock.sleeps) == pytest.approx(30)
+
+
+def test_oversized_reservation_is_capped_to_capacity(clock):
+    limiter = RateLimiter(requests_per_minute=60, tokens_per_minute=1000)
+    limiter.acquire(5000)
+    assert clock.sleeps == []
+    assert limiter.stats()['tokens_available'] == 0
+
+
+def test_record_usage_returns_unused_reservation(clock):
+    limiter = RateLimiter(requests_per_minute=60, tokens_per_minute=6000)
+    limiter.acquire(2000)
+    limiter.record_usage(2000, 500)
+    assert limiter.stats()['tokens_available'] == 5500
+
+
+def test_throttle_pauses_all_callers_and_restarts_empty(clock):
+    limiter = RateLimiter(requests_per_minute=60, tokens_per_minute=6000)
+    limiter.throttle(retry_after=10)
+    assert limiter.stats()['paused_for'] == 10
+    limiter.acquire(100)
+    assert sum(clock.sleeps) == pytest.approx(10)
+    # Nach der Pause steht nur bereit, was währenddessen nachgefüllt wurde, nicht das volle Budget
+    stats = limiter.stats()
+    assert stats['requests_available'] == 9 and stats['tokens_available'] == 900
+    assert stats['throttled'] == 1
+
+
+def test_parse_retry_after():
+    assert parse_retry_after({'retry-after': '2.5'}) == 2.5
+    assert parse_retry_after({'retry-after': 'Wed, 21 Oct 2026 07:28:00 GMT'}) is None
+    assert parse_retry_after(None) is None
@@ -0,0 +1,100 @@
+import pytest
+
+import resilience
+from resilience import CircuitBreaker, CircuitOpenError, RetryPolicy, RetryableStatusError, retry_call
+
+
+@pytest.fixture(autouse=True)
+def no_sleep(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(resilience.time, 'sleep', sleeps.append)
+    return sleeps
+
+
+def failing(*errors):
+    errors = list(errors)
+
+    def call():
+        if errors:
+            raise errors.pop(0)
+        return 'ok'
+    return call
+
+
+def is_retryable(error):
+    return isinstance(error, RetryableStatusError)
+
+
+def test_breaker_opens_after_threshold_and_rejects():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+    policy = RetryPolicy(max_attempts=2, base_delay=0)
+    with pytest.raises(RetryableStatusError):
+        retry_call(failing(*[RetryableStatusError(503, 'down')] * 2), is_retryable, policy, breaker)
+    assert breaker.state == CircuitBreaker.OPEN
+    with pytest.raises(CircuitOpenError):
+        retry_call(failing(), is_retryable, policy, breaker)
+    assert breaker.stats()['rejected'] == 1
+
+
+def test_half_open_probe_closes_on_success(monkeypatch):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    monkeypatch.setattr(resilience.time, 'monotonic', lambda: breaker._opened_at + 31)
+    assert retry_call(failing(), is_retryable, RetryPolicy(), breaker) == 'ok'
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_throttling_is_retried_without_opening_breaker(no_sleep):
+    breaker = CircuitBreaker(failure_threshold=2)
+    policy = RetryPolicy(max_attempts=5, base_delay=0)
+    call = failing(*[RetryableStatusError(429, 'slow down', retry_after=4)] * 4)
+    assert retry_call(call, is_retryable, policy, breaker) == 'ok'
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.stats()['throttled'] == 4
+    # retry-after wird eingehalten
+    assert no_sleep == [4, 4, 4, 4]
+
+
+def test_retry_after_from_response_headers(no_sleep):
+    class SdkError(Exception):
+        status_code = 429
+
+        class response:
+            headers = {'retry-after': '2.5'}
+
+    breaker = CircuitBreaker(failure_threshold=1)
+    retry_call(failing(SdkError()), lambda e: isinstance(e, SdkError), RetryPolicy(base_delay=0), breaker)
+    assert no_sleep == [2.5]
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_non_retryable_error_is_not_retried():
+    breaker = CircuitBreaker(failure_threshold=1)
+    with pytest.raises(ValueError):
+        retry_call(failing(ValueError('bad request')), is_retryable, RetryPolicy(), breaker)
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_programming_error_leaves_breaker_state_alone():
+    breaker = CircuitBreaker(failure_threshold=3)
+    breaker.record_failure()
+    breaker.record_failure()
+    with pytest.raises(TypeError):
+        retry_call(failing(TypeError('falsches Argument')), is_retryable, RetryPolicy(), breaker)
+    assert breaker.failures == 2
+    # Der nächste Ausfall öffnet den Breaker wie ohne den Programmfehler dazwischen
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+
+
+def test_error_during_probe_keeps_breaker_half_open(monkeypatch):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+    breaker.record_failure()
+    monkeypatch.setattr(resilience.time, 'monotonic', lambda: breaker._opened_at + 31)
+    with pytest.raises(KeyError):
+        retry_call(failing(KeyError('name')), is_retryable, RetryPolicy(), breaker)
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    # Ein neuer Testaufruf ist erlaubt und schließt den Breaker erst bei Erfolg
+    assert retry_call(failing(), is_retryable, RetryPolicy(), breaker) == 'ok'
+    assert breaker.state == CircuitBreaker.CLOSED
@@ -0,0 +1,47 @@
+import pytest
+
+import app as app_module
+from claude_client import MAX_BATCH_SIZE
+
+
+class FakeClient:
+    batches = []
+    model_calls_avoided = 0
+    enriched = 0
+
+    def __init__(self, api_key=None, **options):
+        pass
+
+    def get_company_info(self, company):
+        return {'name': company, 'phone': None, 'email': None, 'website': None}
+
+    def get_company_info_batch(self, companies):
+        self.batches.append(len(companies))
+        return [self.get_company_info(company) for company in companies]
+
+
+@pytest.fixture
+def client(monkeypatch):
+    FakeClient.batches = []
+    monkeypatch.setattr(app_module, 'ClaudeClient', FakeClient)
+    return app_module.app.test_client()
+
+
+def search(client, companies, **options):
+    return client.post('/search', json=dict({'companies': companies, 'anthropicKey': 'test-key'}, **options))
+
+
+def test_batch_size_must_be_an_integer(client):
+    response = search(client, ['Alpha'], batchSize='viele')
+    assert response.status_code == 400
+    assert FakeClient.batches == []
+
+
+def test_batch_size_is_capped(client):
+    companies = [f'Firma {i}' for i in range(MAX_BATCH_SIZE * 2)]
+
+    response = search(client, companies, batchSize=1000)
+
+    assert response.status_code == 200
+    assert FakeClient.batches == [MAX_BATCH_SIZE, MAX_BATCH_SIZE]
+    assert [row['name'] for row in response.json['data']] == companies
@@ -0,0 +1,118 @@
+import threading
+import time
+
+import pytest
+
+from claude_client import ClaudeClient, LookupFailedError
+from lookup_cache import LookupCache
+from single_flight import SingleFlight
+
+
+def run_concurrently(*calls):
+    results = [None] * len(calls)
+
+    def run(i, call):
+        try:
+            results[i] = call()
+        except Exception as e:
+            results[i] = e
+
+    threads = [threading.Thread(target=run, args=(i, call)) for i, call in enumerate(calls)]
+    for thread in threads:
+        thread.start()
+        # Der erste Aufruf soll sicher der ausführende sein
+        time.sleep(0.05)
+    for thread in threads:
+        thread.join(5)
+    return results
+
+
+def test_concurrent_calls_share_one_execution():
+    flight = SingleFlight()
+    release = threading.Event()
+    calls = []
+
+    def slow():
+        calls.append(1)
+        release.wait(5)
+        return 'ergebnis'
+
+    def waiter():
+        return flight.do('alpha', slow)
+
+    threading.Timer(0.3, release.set).start()
+    assert run_concurrently(waiter, waiter, waiter) == ['ergebnis'] * 3
+    assert len(calls) == 1
+    assert flight.stats()['coalesced_waiters'] == 2 and flight.stats()['in_flight'] == 0
+
+
+def test_error_reaches_all_waiters_and_is_not_remembered():
+    flight = SingleFlight()
+    release = threading.Event()
+
+    def failing():
+        release.wait(5)
+        raise RuntimeError('kaputt')
+
+    threading.Timer(0.2, release.set).start()
+    results = run_concurrently(lambda: flight.do('alpha', failing), lambda: flight.do('alpha', failing))
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert flight.do('alpha', lambda: 'neu') == 'neu'
+
+
+@pytest.fixture
+def clients(tmp_path, monkeypatch):
+    flight = SingleFlight()
+    cache = LookupCache(path=str(tmp_path / 'cache.sqlite3'))
+    release = threading.Event()
+    calls = []
+
+    def make(api_key, **options):
+        client = ClaudeClient(api_key=api_key, scrape_first=False, auto_enrich=False, **options)
+        client.cache = cache
+        client.single_flight = flight
+
+        def resolve(company_name, refresh=False, hint=None):
+            calls.append(api_key)
+            release.wait(5)
+            if api_key == 'ungueltig':
+                raise LookupFailedError(company_name)
+            return {'name': company_name, 'phone': None, 'email': f'{api_key}@alpha.de', 'website': None}
+
+        client._resolve_company_info = resolve
+        return client
+
+    threading.Timer(0.3, release.set).start()
+    return make, calls
+
+
+def test_same_key_and_options_are_coalesced(clients):
+    make, calls = clients
+    first, second = make('schluessel-a'), make('schluessel-a')
+
+    results = run_concurrently(lambda: first.get_company_info('Alpha GmbH'),
+                               lambda: second.get_company_info('alpha gmbh'))
+
+    assert [result['email'] for result in results] == ['schluessel-a@alpha.de'] * 2
+    assert calls == ['schluessel-a']
+
+
+def test_other_api_key_does_not_get_foreign_failure(clients):
+    make, calls = clients
+    invalid, valid = make('ungueltig'), make('schluessel-b')
+
+    results = run_concurrently(lambda: invalid.get_company_info('Alpha GmbH'),
+                               lambda: valid.get_company_info('Alpha GmbH'))
+
+    assert isinstance(results[0], LookupFailedError)
+    assert results[1]['email'] == 'schluessel-b@alpha.de'
+    assert sorted(calls) == ['schluessel-b', 'ungueltig']
+
+
+def test_other_options_are_not_coalesced(clients):
+    make, calls = clients
+    plain, structured = make('schluessel-a', structured_output=False), make('schluessel-a', structured_output=True)
+
+    run_concurrently(lambda: plain.get_company_info('Alpha GmbH'), lambda: structured.get_company_info('Alpha GmbH'))
+
+    assert len(calls) == 2
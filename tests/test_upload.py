@@ -0,0 +1,96 @@
+import io
+import time
+
+import pytest
+
+import app as app_module
+from jobs import JobRunner, JobStore
+from result_export import iter_xlsx
+from worker_pool import WorkerPool
+
+
+class FakeClient:
+    def __init__(self, api_key):
+        pass
+
+    def get_company_info(self, company):
+        return {'name': company, 'phone': None, 'email': None, 'website': f'https://{company.lower()}.de'}
+
+
+@pytest.fixture
+def runner(tmp_path, monkeypatch):
+    runner = JobRunner(JobStore(path=str(tmp_path / 'jobs.sqlite3')), FakeClient, pool=WorkerPool(2, 10, retry_after=0))
+    monkeypatch.setattr(app_module, 'job_runner', runner)
+    return runner
+
+
+@pytest.fixture
+def client():
+    return app_module.app.test_client()
+
+
+def upload(client, data, filename='firmen.csv', **form):
+    form = dict({'anthropicKey': 'test-key'}, **form)
+    form['file'] = (io.BytesIO(data), filename)
+    return client.post('/upload', data=form, content_type='multipart/form-data')
+
+
+def finished_job(client, job_id, timeout=5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = client.get(f'/jobs/{job_id}?limit=0').get_json()
+        if job['status'] != 'running':
+            return job
+        time.sleep(0.02)
+    raise AssertionError('Job nicht fertig geworden')
+
+
+def test_csv_upload_runs_in_background(client, runner):
+    response = upload(client, 'Firma\nAlpha\nBeta\nalpha\n'.encode('utf-8'))
+    assert response.status_code == 202
+    job = finished_job(client, response.get_json()['id'])
+    assert (job['total'], job['done'], job['duplicates'], job['error']) == (2, 2, 1, None)
+    assert job['kind'] == 'upload'
+
+
+def test_xlsx_upload(client, runner):
+    data = b''.join(iter_xlsx([('Unternehmen',), ('Alpha',), ('Beta',)]))
+    response = upload(client, data, filename='firmen.xlsx')
+    assert response.status_code == 202
+    assert finished_job(client, response.get_json()['id'])['done'] == 2
+
+
+@pytest.mark.parametrize('data, form', [
+    (b'PK\x03\x04 kaputt', {}),
+    (b'Firma\nAlpha\n', {'column': 'Name'}),
+    ('Firma\n"{}"\n'.format('x' * 200_000).encode('utf-8'), {}),
+    (b'Firma\n\xff\xfe\n', {}),
+])
+def test_unreadable_upload_is_rejected_without_job(client, runner, data, form):
+    response = upload(client, data, **form)
+    assert response.status_code == 400
+    assert 'Datei nicht lesbar' in response.get_json()['error']
+    assert runner.store.unfinished_jobs() == []
+
+
+def test_unknown_encoding(client, runner):
+    response = upload(client, b'Firma\nAlpha\n', encoding='gibt-es-nicht')
+    assert response.status_code == 400
+    assert runner.store.unfinished_jobs() == []
+
+
+def test_empty_file_leaves_no_job(client, runner):
+    response = upload(client, b'Firma\n\n')
+    assert response.status_code == 400
+    assert runner.store.unfinished_jobs() == []
+
+
+def test_late_parse_error_is_reported_on_the_job(client, runner):
+    # Der Fehler liegt weit hinter dem ersten Lesepuffer, fällt also erst beim Einlesen im Hintergrund auf
+    names = ''.join(f'Unternehmen {i}\n' for i in range(1000))
+    data = f'Firma\n{names}'.encode('utf-8') + b'\xff\xfe\n'
+    response = upload(client, data, encoding='utf-8')
+    assert response.status_code == 202
+    job = finished_job(client, response.get_json()['id'], timeout=20)
+    assert job['done'] == job['total'] > 0
+    assert job['error'].startswith('Datei nicht lesbar')
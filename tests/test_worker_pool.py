@@ -0,0 +1,45 @@
+import threading
+
+import pytest
+
+from worker_pool import QueueFullError, RequestTooLargeError, WorkerPool
+
+
+def test_submit_all_runs_calls():
+    pool = WorkerPool(max_workers=2, queue_size=2)
+    futures = pool.submit_all([(pow, 2, 3), (pow, 3, 2)])
+    assert [future.result() for future in futures] == [8, 9]
+    assert pool.stats()['queue_depth'] == 0
+
+
+def test_oversized_request_is_rejected_permanently():
+    pool = WorkerPool(max_workers=2, queue_size=3)
+    with pytest.raises(RequestTooLargeError) as info:
+        pool.submit_all([(pow, 1, 1)] * 6)
+    assert info.value.limit == 5
+    # Nichts eingereiht
+    assert pool.stats()['queue_depth'] == 0
+
+
+def test_full_queue_is_retryable():
+    pool = WorkerPool(max_workers=1, queue_size=1, retry_after=7)
+    release = threading.Event()
+    futures = pool.submit_all([(release.wait,), (release.wait,)])
+    try:
+        with pytest.raises(QueueFullError) as info:
+            pool.submit_all([(pow, 1, 1)])
+        assert info.value.retry_after == 7
+    finally:
+        release.set()
+    assert all(future.result() for future in futures)
+
+
+def test_cancelled_calls_free_their_slot():
+    pool = WorkerPool(max_workers=1, queue_size=1)
+    release = threading.Event()
+    running, queued = pool.submit_all([(release.wait,), (release.wait,)])
+    assert queued.cancel()
+    release.set()
+    running.result()
+    assert pool.stats()['queue_depth'] == 0
+    assert pool.submit_all([(pow, 2, 2), (pow, 3, 2)])[1].result() == 9
@@ -0,0 +1,95 @@
+import concurrent.futures
+import os
+import threading
+
+# Standardwerte, überschreibbar über Umgebungsvariablen
+DEFAULT_WORKERS = 5
+DEFAULT_QUEUE_SIZE = 1000
+DEFAULT_RETRY_AFTER = 10
+
+
+class QueueFullError(Exception):
+    def __init__(self, retry_after):
+        super().__init__("Die Warteschlange ist voll, bitte später erneut versuchen")
+        self.retry_after = retry_after
+
+
+class RequestTooLargeError(Exception):
+    """Mehr Aufrufe in einer Anfrage, als der Pool überhaupt aufnehmen kann; ein erneuter Versuch hilft nicht"""
+
+    def __init__(self, limit):
+        super().__init__(f"Zu viele Unternehmen in einer Anfrage (höchstens {limit}); größere Listen bitte über /jobs oder /upload")
+        self.limit = limit
+
+
+class WorkerPool:
+    def __init__(self, max_workers=DEFAULT_WORKERS, queue_size=DEFAULT_QUEUE_SIZE, retry_after=DEFAULT_RETRY_AFTER):
+        self.max_workers = max_workers
+        self.queue_size = queue_size
+        self.retry_after = retry_after
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='lookup')
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._active = 0
+
+    @property
+    def capacity(self):
+        return self.max_workers + self.queue_size
+
+    def submit_all(self, calls):
+        """Reicht alle Aufrufe (fn, args) gemeinsam ein oder keinen, wenn die Warteschlange voll ist"""
+        calls = list(calls)
+        if len(calls) > self.capacity:
+            raise RequestTooLargeError(self.capacity)
+        with self._lock:
+            if self._pending + len(calls) > self.capacity:
+                raise QueueFullError(self.retry_after)
+            self._pending += len(calls)
+
+        futures = [self._executor.submit(self._run, fn, *args) for fn, *args in calls]
+        for future in futures:
+            future.add_done_callback(self._release_cancelled)
+        return futures
+
+    def _release_cancelled(self, future):
+        # Abgebrochene Aufrufe laufen nie über _run und geben ihren Platz hier frei
+        if future.cancelled():
+            with self._lock:
+                self._pending -= 1
+
+    def _run(self, fn, *args):
+        with self._lock:
+            self._active += 1
+        try:
+            return fn(*args)
+        finally:
+            with self._lock:
+                self._active -= 1
+                self._pending -= 1
+
+    def stats(self):
+        """Liefert Auslastung und Länge der Warteschlange"""
+        with self._lock:
+            return {
+                'active_workers': self._active,
+                'queue_depth': self._pending - self._active,
+                'max_workers': self.max_workers,
+                'queue_size': self.queue_size
+            }
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_worker_pool():
+    """Liefert den prozessweit geteilten Worker-Pool, konfiguriert über Umgebungsvariablen"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = WorkerPool(
+                max_workers=int(os.environ.get('LOOKUP_WORKERS', DEFAULT_WORKERS)),
+                queue_size=int(os.environ.get('LOOKUP_QUEUE_SIZE', DEFAULT_QUEUE_SIZE)),
+                retry_after=int(os.environ.get('LOOKUP_RETRY_AFTER', DEFAULT_RETRY_AFTER))
+            )
+        return _pool
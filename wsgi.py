@@ -1,4 +1,7 @@
-from app import app
+from app import app, resume_jobs
+
+# Einstiegspunkt des Servers (z.B. gunicorn wsgi:app): erst hier, nicht beim Import von app, werden Jobs fortgesetzt
+resume_jobs()
 
 if __name__ == "__main__":
     app.run() 
\ No newline at end of file